@@ -19,6 +19,7 @@ from app.models.user import User
 from app.models.vessel import Vessel
 from app.models.defect import Defect
 from app.models.tasks import Task, Notification # <--- IMPORT NEW MODELS
+from app.models.outbox import EmailOutbox, EmailDigestEntry
 # ----------------------
 
 # this is the Alembic Config object, which provides
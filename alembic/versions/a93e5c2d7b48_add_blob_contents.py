@@ -0,0 +1,45 @@
+"""Add content-addressed blob index and attachment content hash
+
+Revision ID: a93e5c2d7b48
+Revises: f2b7d4e9a613
+Create Date: 2026-10-18 12:41:53.118620
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93e5c2d7b48'
+down_revision: Union[str, Sequence[str], None] = 'f2b7d4e9a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('blob_contents',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('blob_path', sa.String(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('verified', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    op.add_column('attachments', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_attachments_content_sha256'), 'attachments', ['content_sha256'], unique=False)
+    op.create_foreign_key(None, 'attachments', 'blob_contents', ['content_sha256'], ['sha256'])
+    op.add_column('upload_sessions', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('upload_sessions', 'content_sha256')
+    op.drop_constraint('attachments_content_sha256_fkey', 'attachments', type_='foreignkey')
+    op.drop_index(op.f('ix_attachments_content_sha256'), table_name='attachments')
+    op.drop_column('attachments', 'content_sha256')
+    op.drop_table('blob_contents')
@@ -0,0 +1,28 @@
+"""Add composite index for thread keyset pagination
+
+Revision ID: b58f1e7c3a92
+Revises: a93e5c2d7b48
+Create Date: 2026-10-18 13:27:40.552913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58f1e7c3a92'
+down_revision: Union[str, Sequence[str], None] = 'a93e5c2d7b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_threads_defect_created', 'threads', ['defect_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_threads_defect_created', table_name='threads')
@@ -0,0 +1,42 @@
+"""Coalesce notifications per user and defect
+
+Revision ID: b7c2e91d4f10
+Revises: 4a8f003a6574
+Create Date: 2026-10-18 09:12:44.120931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7c2e91d4f10'
+down_revision: Union[str, Sequence[str], None] = '4a8f003a6574'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notifications', sa.Column('defect_id', sa.UUID(), nullable=True))
+    op.add_column('notifications', sa.Column('event_count', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('notifications', sa.Column('coalesce_bucket', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_notifications_defect_id', 'notifications', 'defects',
+        ['defect_id'], ['id'], ondelete='CASCADE'
+    )
+    op.create_index(
+        'uq_notifications_coalesce', 'notifications',
+        ['user_id', 'defect_id', 'coalesce_bucket'], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_notifications_coalesce', table_name='notifications')
+    op.drop_constraint('fk_notifications_defect_id', 'notifications', type_='foreignkey')
+    op.drop_column('notifications', 'coalesce_bucket')
+    op.drop_column('notifications', 'event_count')
+    op.drop_column('notifications', 'defect_id')
@@ -0,0 +1,42 @@
+"""Track delivery attempts on email digest entries
+
+Revision ID: c3e9a1f47d20
+Revises: b58f1e7c3a92
+Create Date: 2026-10-18 16:05:12.418306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a1f47d20'
+down_revision: Union[str, Sequence[str], None] = 'b58f1e7c3a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('email_digest_entries', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('email_digest_entries', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('email_digest_entries', sa.Column('failed_at', sa.DateTime(), nullable=True))
+    op.drop_index('ix_email_digest_pending', table_name='email_digest_entries')
+    op.create_index(
+        'ix_email_digest_pending', 'email_digest_entries', ['recipient', 'due_at'],
+        unique=False, postgresql_where=sa.text('sent_at IS NULL AND failed_at IS NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_email_digest_pending', table_name='email_digest_entries')
+    op.create_index(
+        'ix_email_digest_pending', 'email_digest_entries', ['recipient', 'due_at'],
+        unique=False, postgresql_where=sa.text('sent_at IS NULL')
+    )
+    op.drop_column('email_digest_entries', 'failed_at')
+    op.drop_column('email_digest_entries', 'last_error')
+    op.drop_column('email_digest_entries', 'attempts')
@@ -0,0 +1,47 @@
+"""Add email digest entries and per-user digest interval
+
+Revision ID: d5e0f3a8b912
+Revises: c41d8a07e2b5
+Create Date: 2026-10-18 10:48:02.301177
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e0f3a8b912'
+down_revision: Union[str, Sequence[str], None] = 'c41d8a07e2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('email_digest_minutes', sa.Integer(), nullable=True))
+    op.create_table('email_digest_entries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('recipient', sa.String(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('event_type', sa.String(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('due_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_email_digest_pending', 'email_digest_entries', ['recipient', 'due_at'],
+        unique=False, postgresql_where=sa.text('sent_at IS NULL')
+    )
+    op.create_index('uq_email_digest_event_recipient', 'email_digest_entries', ['event_id', 'recipient'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_email_digest_event_recipient', table_name='email_digest_entries')
+    op.drop_index('ix_email_digest_pending', table_name='email_digest_entries')
+    op.drop_table('email_digest_entries')
+    op.drop_column('users', 'email_digest_minutes')
@@ -0,0 +1,28 @@
+"""Record rendered derivatives of defect image fields
+
+Revision ID: d9b4e2c61a58
+Revises: c3e9a1f47d20
+Create Date: 2026-10-18 16:32:47.109284
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b4e2c61a58'
+down_revision: Union[str, Sequence[str], None] = 'c3e9a1f47d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('defects', sa.Column('image_derivatives', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('defects', 'image_derivatives')
@@ -0,0 +1,28 @@
+"""Flag content whose stored bytes failed hash verification
+
+Revision ID: e6f1a9d3b274
+Revises: d9b4e2c61a58
+Create Date: 2026-10-18 17:04:19.552031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f1a9d3b274'
+down_revision: Union[str, Sequence[str], None] = 'd9b4e2c61a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('blob_contents', sa.Column('hash_mismatch', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('blob_contents', 'hash_mismatch')
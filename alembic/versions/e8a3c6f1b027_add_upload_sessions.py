@@ -0,0 +1,49 @@
+"""Add upload sessions for resumable block uploads
+
+Revision ID: e8a3c6f1b027
+Revises: d5e0f3a8b912
+Create Date: 2026-10-18 11:32:47.915204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a3c6f1b027'
+down_revision: Union[str, Sequence[str], None] = 'd5e0f3a8b912'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('upload_sessions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('attachment_id', sa.UUID(), nullable=False),
+    sa.Column('thread_id', sa.UUID(), nullable=False),
+    sa.Column('created_by_id', sa.UUID(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('blob_path', sa.String(), nullable=False),
+    sa.Column('block_size', sa.Integer(), nullable=False),
+    sa.Column('block_count', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('committed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['thread_id'], ['threads.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('attachment_id')
+    )
+    op.create_index(op.f('ix_upload_sessions_thread_id'), 'upload_sessions', ['thread_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_upload_sessions_thread_id'), table_name='upload_sessions')
+    op.drop_table('upload_sessions')
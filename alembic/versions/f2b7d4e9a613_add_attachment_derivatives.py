@@ -0,0 +1,30 @@
+"""Add thumbnail and preview paths to attachments
+
+Revision ID: f2b7d4e9a613
+Revises: e8a3c6f1b027
+Create Date: 2026-10-18 12:05:19.402871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7d4e9a613'
+down_revision: Union[str, Sequence[str], None] = 'e8a3c6f1b027'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('attachments', sa.Column('thumbnail_path', sa.String(), nullable=True))
+    op.add_column('attachments', sa.Column('preview_path', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('attachments', 'preview_path')
+    op.drop_column('attachments', 'thumbnail_path')
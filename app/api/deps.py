@@ -1,3 +1,5 @@
+import logging
+from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -9,6 +11,10 @@ from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.core.config import settings
 from app.models.user import User
+from app.models.defect import Defect
+from app.models.enums import UserRole
+
+logger = logging.getLogger(__name__)
 
 # This tells FastAPI where the client gets the token (for Swagger UI)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"/api/v1/login/access-token")
@@ -21,7 +27,6 @@ async def get_current_user(
     Validates the JWT Token and retrieves the User from the Database.
     """
     try:
-        print(f"DEBUG: Received Token: {token[:10]}...")
         # 1. Decode the Token
         payload = jwt.decode(
             token, 
@@ -31,17 +36,16 @@ async def get_current_user(
         
         # 2. Extract User ID ("sub" holds the ID)
         token_data = payload.get("sub")
-        print(f"DEBUG: Decoded Token Data (sub): {token_data}")
 
         if token_data is None:
-            print("DEBUG: Token is valid but 'sub' field is missing!")
+            logger.debug("Token is valid but 'sub' field is missing")
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Could not validate credentials",
             )
 
     except (JWTError, ValidationError) as e:
-        print(f"DEBUG: JWT Decode Error: {str(e)}")
+        logger.debug("JWT decode error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
@@ -53,12 +57,35 @@ async def get_current_user(
     user = result.scalars().first()
 
     if not user:
-        print(f"DEBUG: User ID {token_data} not found in database!")
+        logger.debug("User ID %s not found in database", token_data)
         raise HTTPException(status_code=404, detail="User not found")
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
     # 4. Return the Real Database User Object
-    print(f"DEBUG: Successfully authenticated user: {user.email}")
-    return user
\ No newline at end of file
+    logger.debug("Authenticated user %s", user.id)
+    return user
+
+def ensure_vessel_access(current_user: User, vessel_imo: str):
+    """Vessel users may only touch their assigned vessels; shore/admin see all."""
+    if current_user.role == UserRole.VESSEL:
+        authorized_imos = [v.imo for v in current_user.vessels]
+        if vessel_imo not in authorized_imos:
+            raise HTTPException(status_code=403, detail="Not authorized for this vessel")
+
+async def get_accessible_defect(
+    defect_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Defect:
+    """
+    Loads a defect the current user may see: vessel users only get defects
+    on their assigned vessels, shore/admin users get every vessel.
+    """
+    defect = await db.get(Defect, defect_id)
+    if not defect or defect.is_deleted:
+        raise HTTPException(status_code=404, detail="Defect not found")
+
+    ensure_vessel_access(current_user, defect.vessel_imo)
+    return defect
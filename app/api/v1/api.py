@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, defects, vessels, users,attachments   
+from app.api.v1.endpoints import auth, defects, vessels, users,attachments, reports
 
 api_router = APIRouter()
 
@@ -15,4 +15,6 @@ api_router.include_router(
     attachments.router, 
     prefix="/attachments", 
     tags=["Attachments"]
-)
\ No newline at end of file
+)
+
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
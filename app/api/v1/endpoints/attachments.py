@@ -1,8 +1,29 @@
 # app/api/v1/endpoints/attachments.py
-from fastapi import APIRouter, HTTPException , Query
+from fastapi import APIRouter, Depends, HTTPException , Query, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional
-from app.core.blob_storage import generate_read_sas_url, generate_write_sas_url
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.blob_storage import generate_read_sas_url, generate_write_sas_url, get_sas_signer, get_blob_properties
+from app.api.deps import get_accessible_defect, get_current_user, ensure_vessel_access
+from app.models.defect import Defect, Thread, Attachment, UploadSession, BlobContent
+from app.models.user import User
+from app.schemas.defect import AttachmentResponse
+from app.services.resumable_upload import (
+    block_count, encoded_block_id, list_uploaded_blocks, missing_blocks, commit_blocks, upload_blob_path
+)
+from app.services.image_derivatives import (
+    is_image, derived_blob_path, process_attachment_image, sign_attachments, VARIANTS,
+    DEFECT_IMAGE_FIELDS, defect_derivative_path
+)
+from app.services.blob_dedup import (
+    normalize_sha256, cas_blob_path, find_verified_content, add_reference, attach_content,
+    copy_derivatives, verify_content
+)
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,12 +32,99 @@ router = APIRouter()
 
 class AttachmentUrlRequest(BaseModel):
     blob_path: str
+    variant: Optional[str] = None  # "thumb" / "preview" for image derivatives
 
 class AttachmentUrlResponse(BaseModel):
     url: str
     blob_path: str
     expiry_hours: int
 
+class ScopedSasResponse(BaseModel):
+    defect_id: UUID
+    prefix: str          # e.g. "defects/<id>/"
+    base_url: str        # Blob URL = f"{base_url}/{path under prefix}?{sas_token}"
+    sas_token: str
+    permissions: str
+    expires_at: datetime
+    # Read scope only: blob_path -> read URL for the defect's blobs the token can't
+    # reach, i.e. de-duplicated content under cas/ (shared across defects)
+    signed_urls: dict[str, str] = {}
+
+class UploadSessionCreate(BaseModel):
+    attachment_id: UUID
+    thread_id: UUID
+    file_name: str
+    file_size: int  # The server picks blob_path (returned in the response)
+    content_type: Optional[str] = None
+    content_sha256: Optional[str] = None
+
+class UploadSessionResponse(BaseModel):
+    session_id: UUID
+    attachment_id: UUID
+    blob_path: str
+    status: str
+    file_size: int
+    block_size: int
+    block_count: int
+    block_ids: list[str]       # base64 ids for ?comp=block&blockid=..., index = position
+    missing_blocks: list[int]  # indexes still to PUT (all of them on a new session)
+    upload_url: str            # Fresh write SAS, re-issued on every status call
+    expires_at: datetime
+
+class DedupCheckRequest(BaseModel):
+    attachment_id: UUID
+    thread_id: UUID
+    file_name: str
+    file_size: int
+    content_sha256: str
+    content_type: Optional[str] = None
+
+class DedupCheckResponse(BaseModel):
+    duplicate: bool
+    blob_path: str                                 # Existing path, or where to upload (cas/... or private)
+    attachment: Optional[AttachmentResponse] = None  # Set when duplicate: nothing to upload
+    upload_url: Optional[str] = None                 # Set when new content (create-only on cas/ paths)
+
+def defect_blob_prefix(defect_id) -> str:
+    """All blobs of a defect live under this directory."""
+    return f"defects/{defect_id}"
+
+def paths_outside_scope(prefix: str, paths) -> list[str]:
+    """Distinct, non-empty paths a directory SAS on `prefix` does not cover."""
+    scope = f"{prefix.rstrip('/')}/"
+    return sorted({p for p in paths if p and not p.startswith(scope)})
+
+async def _defect_blob_paths(db: AsyncSession, defect: Defect) -> list[str]:
+    """Every blob the defect shows: its images (+ derivatives) and all attachment files."""
+    paths = []
+    for field in DEFECT_IMAGE_FIELDS:
+        path = getattr(defect, field)
+        paths.append(path)
+        paths += [defect_derivative_path(defect, path, variant) for variant in VARIANTS]
+    result = await db.execute(
+        select(Attachment.blob_path, Attachment.thumbnail_path, Attachment.preview_path)
+        .join(Thread, Attachment.thread_id == Thread.id)
+        .where(Thread.defect_id == defect.id)
+    )
+    for row in result.all():
+        paths += row
+    return paths
+
+def _resolve_variant(blob_path: str, variant: Optional[str]) -> str:
+    """Maps an original image path to its derivative path when a variant is asked for."""
+    if not variant:
+        return blob_path
+    if variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant '{variant}' (expected one of {', '.join(VARIANTS)})")
+    return derived_blob_path(blob_path, variant) if is_image(blob_path) else blob_path
+
+def _require_hns():
+    if not settings.AZURE_STORAGE_HNS_ENABLED:
+        raise HTTPException(
+            status_code=501,
+            detail="Directory-scoped SAS requires a hierarchical-namespace storage account"
+        )
+
 @router.post("/signed-url", response_model=AttachmentUrlResponse)
 async def get_attachment_signed_url(request: AttachmentUrlRequest):
     """
@@ -33,19 +141,22 @@ async def get_attachment_signed_url(request: AttachmentUrlRequest):
         if not request.blob_path:
             raise HTTPException(status_code=400, detail="blob_path is required")
         
-        logger.info(f"Generating signed URL for: {request.blob_path}")
+        blob_path = _resolve_variant(request.blob_path, request.variant)
+        logger.debug("Generating signed URL for: %s", blob_path)
         
         # Generate fresh 24-hour SAS URL
-        signed_url = generate_read_sas_url(request.blob_path)
+        signed_url = generate_read_sas_url(blob_path)
         
-        logger.info(f"✅ Signed URL generated successfully")
+        logger.debug("✅ Signed URL generated")
         
         return AttachmentUrlResponse(
             url=signed_url,
-            blob_path=request.blob_path,
+            blob_path=blob_path,
             expiry_hours=24
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Failed to generate signed URL: {str(e)}")
         raise HTTPException(
@@ -54,17 +165,23 @@ async def get_attachment_signed_url(request: AttachmentUrlRequest):
         )
 
 @router.post("/batch-signed-urls")
-async def get_batch_attachment_urls(blob_paths: list[str]):
+async def get_batch_attachment_urls(
+    blob_paths: list[str],
+    variant: Optional[str] = Query(None, description="thumb / preview: sign image derivatives instead of originals")
+):
     """
     Generate signed URLs for multiple attachments at once.
     Useful for loading entire thread conversations efficiently.
+    With ?variant=thumb list views fetch a few KB per image.
     """
+    if variant and variant not in VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Unknown variant '{variant}' (expected one of {', '.join(VARIANTS)})")
     try:
         signed_urls = []
         
         for blob_path in blob_paths:
             try:
-                url = generate_read_sas_url(blob_path)
+                url = generate_read_sas_url(_resolve_variant(blob_path, variant))
                 signed_urls.append({
                     "blob_path": blob_path,
                     "url": url,
@@ -96,12 +213,12 @@ async def get_upload_sas_url(blobName: str = Query(..., description="Path where
         if not blobName:
             raise HTTPException(status_code=400, detail="blobName parameter is required")
         
-        logger.info(f"Generating upload URL for: {blobName}")
+        logger.debug("Generating upload URL for: %s", blobName)
         
         # Generate upload URL with write permissions
         upload_url = generate_write_sas_url(blobName)
         
-        logger.info(f"✅ Upload URL generated successfully")
+        logger.debug("✅ Upload URL generated")
         
         return {
             "url": upload_url,
@@ -110,4 +227,325 @@ async def get_upload_sas_url(blobName: str = Query(..., description="Path where
     
     except Exception as e:
         logger.error(f"❌ Failed to generate upload URL: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate upload URL: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to generate upload URL: {str(e)}")
+
+# --- DIRECTORY-SCOPED SAS (one token per defect) ---
+@router.get("/defects/{defect_id}/read-scope", response_model=ScopedSasResponse)
+async def get_defect_read_scope(
+    defect: Defect = Depends(get_accessible_defect),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    One read-only SAS (sr=d) covering every blob under defects/{id}/,
+    instead of signing each attachment path. De-duplicated content lives
+    under cas/, outside that directory: those blobs come back in
+    signed_urls, one read URL each. Only issued for defects on vessels the
+    caller is authorized for.
+    """
+    _require_hns()
+    try:
+        signer = get_sas_signer()
+        prefix = defect_blob_prefix(defect.id)
+        token, expiry = signer.read_scope(prefix)
+        outside = paths_outside_scope(prefix, await _defect_blob_paths(db, defect))
+        return ScopedSasResponse(
+            defect_id=defect.id,
+            prefix=f"{prefix}/",
+            base_url=signer.blob_url(prefix),
+            sas_token=token,
+            permissions="r",
+            expires_at=expiry,
+            signed_urls={path: signer.read_url(path) for path in outside}
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to generate read scope for defect {defect.id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate read scope: {str(e)}")
+
+@router.get("/defects/{defect_id}/upload-scope", response_model=ScopedSasResponse)
+async def get_defect_upload_scope(defect: Defect = Depends(get_accessible_defect)):
+    """
+    One write SAS (sr=d) for uploading any number of files under
+    defects/{id}/ - replaces one /upload-url call per file.
+    """
+    _require_hns()
+    try:
+        signer = get_sas_signer()
+        prefix = defect_blob_prefix(defect.id)
+        token, expiry = signer.upload_scope(prefix)
+        return ScopedSasResponse(
+            defect_id=defect.id,
+            prefix=f"{prefix}/",
+            base_url=signer.blob_url(prefix),
+            sas_token=token,
+            permissions="rcw",
+            expires_at=expiry
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to generate upload scope for defect {defect.id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate upload scope: {str(e)}")
+
+async def _ensure_thread_access(db: AsyncSession, thread_id: UUID, current_user: User) -> Thread:
+    thread = await db.get(Thread, thread_id)
+    defect = await db.get(Defect, thread.defect_id) if thread else None
+    if not defect or defect.is_deleted:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    ensure_vessel_access(current_user, defect.vessel_imo)
+    return thread
+
+# --- CONTENT-ADDRESSED DEDUP ---
+@router.post("/dedup-check", response_model=DedupCheckResponse)
+async def check_duplicate_attachment(
+    request: DedupCheckRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Call before uploading, with the file's SHA-256. If identical verified
+    content is already stored the attachment is recorded against the
+    existing blob (metadata-only, no upload). Otherwise the client uploads
+    to the returned path and creates the attachment with content_sha256:
+    a fresh cas/ path (create-only SAS), or a private path under the
+    defect when the cas/ path is already taken by unverified content.
+    """
+    try:
+        sha256 = normalize_sha256(request.content_sha256)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    thread = await _ensure_thread_access(db, request.thread_id, current_user)
+
+    existing = await db.get(Attachment, request.attachment_id)
+    if existing:
+        sign_attachments([existing])
+        return DedupCheckResponse(duplicate=True, blob_path=existing.blob_path, attachment=existing)
+
+    try:
+        content = await find_verified_content(db, sha256, request.file_size)
+        if not content:
+            registered = await db.get(BlobContent, sha256)
+            await db.rollback()
+            blob_path = cas_blob_path(sha256, request.file_name)
+            if registered is None and await get_blob_properties(blob_path) is None:
+                # Create-only: a racing upload to the same path cannot overwrite it
+                return DedupCheckResponse(
+                    duplicate=False,
+                    blob_path=blob_path,
+                    upload_url=get_sas_signer().create_url(blob_path)
+                )
+            # Shared path already holds content nobody has verified: never hand out write access to it
+            blob_path = upload_blob_path(defect_blob_prefix(thread.defect_id), request.attachment_id, request.file_name)
+            return DedupCheckResponse(
+                duplicate=False,
+                blob_path=blob_path,
+                upload_url=generate_write_sas_url(blob_path)
+            )
+
+        await add_reference(db, sha256, content.blob_path, content.size, content.content_type)
+        attachment = Attachment(
+            id=request.attachment_id,
+            thread_id=request.thread_id,
+            file_name=request.file_name,
+            file_size=content.size,
+            content_type=request.content_type or content.content_type,
+            blob_path=content.blob_path,
+            content_sha256=sha256
+        )
+        await copy_derivatives(db, attachment)
+        db.add(attachment)
+        await db.commit()
+        await db.refresh(attachment)
+
+        if not attachment.thumbnail_path and is_image(attachment.blob_path, attachment.content_type):
+            background_tasks.add_task(process_attachment_image, attachment.id)
+
+        logger.info(f"♻️ Duplicate content {sha256[:12]}: {attachment.file_name} stored without upload")
+        sign_attachments([attachment])
+        return DedupCheckResponse(duplicate=True, blob_path=attachment.blob_path, attachment=attachment)
+    except Exception as e:
+        logger.error(f"❌ Error during dedup check: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- RESUMABLE UPLOADS (Put Block / Put Block List) ---
+def _session_response(session: UploadSession, missing: list[int]) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        session_id=session.id,
+        attachment_id=session.attachment_id,
+        blob_path=session.blob_path,
+        status=session.status,
+        file_size=session.file_size,
+        block_size=session.block_size,
+        block_count=session.block_count,
+        block_ids=[encoded_block_id(i) for i in range(session.block_count)],
+        missing_blocks=missing,
+        upload_url=get_sas_signer().write_url(session.blob_path),
+        expires_at=session.expires_at
+    )
+
+def _ensure_session_path(session: UploadSession, thread: Thread):
+    # Sessions only ever write inside their own defect's directory
+    if not session.blob_path.startswith(f"{defect_blob_prefix(thread.defect_id)}/attachments/"):
+        raise HTTPException(status_code=409, detail="Upload session has an invalid blob path, start a new one")
+
+async def _get_owned_session(session_id: UUID, db: AsyncSession, current_user: User) -> UploadSession:
+    session = await db.get(UploadSession, session_id)
+    if not session or session.created_by_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    thread = await _ensure_thread_access(db, session.thread_id, current_user)
+    _ensure_session_path(session, thread)
+    if session.status == "OPEN" and session.expires_at < datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Upload session expired, start a new one")
+    return session
+
+@router.post("/uploads", response_model=UploadSessionResponse)
+async def create_upload_session(
+    session_in: UploadSessionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Starts (or resumes) a block upload into a server-chosen blob_path
+    under the defect's directory. The client PUTs each block to
+    `upload_url` + `&comp=block&blockid=<block_ids[i]>` - in parallel, in
+    any order - then calls /uploads/{id}/finalize. Calling this again with
+    the same attachment_id returns the existing session.
+    """
+    max_bytes = settings.MAX_RESUMABLE_UPLOAD_MB * 1024 * 1024
+    if session_in.file_size <= 0 or session_in.file_size > max_bytes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File '{session_in.file_name}' must be between 1 byte and {settings.MAX_RESUMABLE_UPLOAD_MB}MB"
+        )
+
+    thread = await _ensure_thread_access(db, session_in.thread_id, current_user)
+    content_sha256 = None
+    if session_in.content_sha256:
+        try:
+            content_sha256 = normalize_sha256(session_in.content_sha256)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if await db.get(Attachment, session_in.attachment_id):
+        raise HTTPException(status_code=409, detail="Attachment already exists")
+
+    result = await db.execute(select(UploadSession).where(UploadSession.attachment_id == session_in.attachment_id))
+    session = result.scalars().first()
+    if session:
+        # Client lost our reply (or restarted): hand back the same session
+        if session.created_by_id != current_user.id or session.thread_id != session_in.thread_id:
+            raise HTTPException(status_code=409, detail="Attachment id already in use")
+        _ensure_session_path(session, thread)
+        uploaded = await list_uploaded_blocks(session.blob_path)
+        return _session_response(session, missing_blocks(uploaded, session.file_size, session.block_size))
+
+    try:
+        block_size = settings.UPLOAD_BLOCK_SIZE_BYTES
+        session = UploadSession(
+            attachment_id=session_in.attachment_id,
+            thread_id=session_in.thread_id,
+            created_by_id=current_user.id,
+            file_name=session_in.file_name,
+            file_size=session_in.file_size,
+            content_type=session_in.content_type,
+            content_sha256=content_sha256,
+            blob_path=upload_blob_path(
+                defect_blob_prefix(thread.defect_id), session_in.attachment_id, session_in.file_name
+            ),
+            block_size=block_size,
+            block_count=block_count(session_in.file_size, block_size),
+            status="OPEN",
+            expires_at=datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        )
+        db.add(session)
+        await db.commit()
+        await db.refresh(session)
+
+        logger.info(f"📤 Upload session {session.id}: {session.file_name} in {session.block_count} blocks")
+        return _session_response(session, list(range(session.block_count)))
+    except Exception as e:
+        logger.error(f"❌ Error creating upload session: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/uploads/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Resume point after a dropout: lists the blocks Azure has not received
+    yet (read from the blob's uncommitted block list) and a fresh SAS.
+    """
+    session = await _get_owned_session(session_id, db, current_user)
+    if session.status != "OPEN":
+        return _session_response(session, [])
+    uploaded = await list_uploaded_blocks(session.blob_path)
+    return _session_response(session, missing_blocks(uploaded, session.file_size, session.block_size))
+
+@router.post("/uploads/{session_id}/finalize", response_model=AttachmentResponse)
+async def finalize_upload_session(
+    session_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Commits the block list and records the Attachment row. Safe to retry:
+    a committed session returns its attachment.
+    """
+    session = await _get_owned_session(session_id, db, current_user)
+    if session.status == "COMMITTED":
+        attachment = await db.get(Attachment, session.attachment_id)
+        sign_attachments([attachment] if attachment else [])
+        return attachment
+
+    uploaded = await list_uploaded_blocks(session.blob_path)
+    missing = missing_blocks(uploaded, session.file_size, session.block_size)
+    if missing:
+        # Retry after a commit whose DB write failed: the blob is already whole
+        props = await get_blob_properties(session.blob_path) if not uploaded else None
+        if not props or props.size != session.file_size:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Upload incomplete", "missing_blocks": missing}
+            )
+    else:
+        try:
+            await commit_blocks(session.blob_path, session.block_count, session.content_type)
+        except Exception as e:
+            logger.error(f"❌ Failed to commit blocks for session {session.id}: {str(e)}")
+            raise HTTPException(status_code=502, detail=f"Failed to commit upload: {str(e)}")
+
+    try:
+        # Hash already registered at another path: this blob stays private to the attachment
+        content_sha256 = await attach_content(
+            db, session.content_sha256, session.blob_path, session.file_size, session.content_type
+        )
+        attachment = Attachment(
+            id=session.attachment_id,
+            thread_id=session.thread_id,
+            file_name=session.file_name,
+            file_size=session.file_size,
+            content_type=session.content_type,
+            blob_path=session.blob_path,
+            content_sha256=content_sha256
+        )
+        db.add(attachment)
+        session.status = "COMMITTED"
+        session.committed_at = datetime.now(timezone.utc)
+        await db.commit()
+        await db.refresh(attachment)
+
+        logger.info(f"✅ Upload finalized: {attachment.file_name} ({attachment.file_size} bytes)")
+
+        if attachment.content_sha256:
+            background_tasks.add_task(verify_content, attachment.content_sha256)
+        if is_image(attachment.blob_path, attachment.content_type):
+            background_tasks.add_task(process_attachment_image, attachment.id)
+        sign_attachments([attachment])
+        return attachment
+    except Exception as e:
+        logger.error(f"❌ Error finalizing upload session {session.id}: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
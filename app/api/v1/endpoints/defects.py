@@ -1,12 +1,15 @@
 import uuid
 from uuid import UUID
+from typing import Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload 
 import logging
 
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.defect import Defect, Thread, Attachment, PrEntry
 from app.models.user import User
@@ -15,13 +18,25 @@ from app.models.vessel import Vessel
 from app.schemas.defect import (
     DefectCreate, DefectUpdate, DefectResponse, 
     ThreadCreate, ThreadResponse, AttachmentResponse, AttachmentBase,
-    DefectCloseRequest, VesselUserResponse,
+    DefectCloseRequest, VesselUserResponse, MentionableUserResponse, DefectDetailResponse,
+    ThreadSyncRequest, ThreadSyncResponse,
     PrEntryCreate, PrEntryResponse
 )
-from app.core.blob_storage import generate_write_sas_url, generate_read_sas_url
-from app.api.deps import get_current_user 
-from app.services.email_service import send_defect_email 
+from app.core.blob_storage import generate_write_sas_url, generate_read_sas_url, generate_read_sas_url_or_none, delete_blobs
+from app.api.deps import get_current_user, ensure_vessel_access, get_accessible_defect
+from app.services.email_outbox import enqueue_defect_email
 from app.services.notification_service import notify_vessel_users, create_task_for_mentions
+from app.services.image_derivatives import (
+    is_image, derived_blob_path, process_attachment_image, process_defect_images, VARIANTS,
+    sign_defects, sign_attachments
+)
+from app.services.thread_pages import fetch_thread_page, InvalidCursor
+from app.services.thread_sync import sync_threads, CREATED
+from app.services.fleet_registry import fleet_registry
+from app.services.attachment_zip import stream_zip, safe_arcname, unique_arcnames
+from app.services.blob_dedup import (
+    normalize_sha256, attach_content, release_reference, verify_content, purge_content, ContentPathMismatch
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(redirect_slashes=False)
@@ -69,6 +84,7 @@ async def get_defects(
     
     for defect in defects:
         defect.vessel_name = defect.vessel.name if defect.vessel else None
+    sign_defects(defects)
     
     return defects
 
@@ -89,22 +105,22 @@ async def get_upload_sas(blobName: str, current_user: User = Depends(get_current
 @router.post("/", response_model=DefectResponse)
 async def create_defect(
     defect_in: DefectCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Create a new defect with comprehensive error handling"""
     try:
-        logger.info(f"📝 Creating defect: {defect_in.id}")
-        logger.info(f"   Vessel IMO: {defect_in.vessel_imo}")
-        logger.info(f"   Equipment: {defect_in.equipment}")
-        logger.info(f"   Defect Source: {defect_in.defect_source}")
+        logger.debug("📝 Creating defect: %s", defect_in.id)
+        logger.debug("   Vessel IMO: %s", defect_in.vessel_imo)
+        logger.debug("   Equipment: %s", defect_in.equipment)
+        logger.debug("   Defect Source: %s", defect_in.defect_source)
         
         # Check if defect already exists
         existing = await db.get(Defect, defect_in.id)
         if existing:
             logger.info(f"⚠️ Defect {defect_in.id} already exists, returning existing")
             await db.refresh(existing, attribute_names=["pr_entries"])
+            sign_defects([existing])
             return existing
 
         # Validate vessel authorization
@@ -117,7 +133,7 @@ async def create_defect(
         # Parse priority with fallback
         try:
             priority_enum = DefectPriority(defect_in.priority.upper())
-            logger.info(f"   Priority: {priority_enum}")
+            logger.debug("   Priority: %s", priority_enum)
         except ValueError as e:
             logger.warning(f"⚠️ Invalid priority '{defect_in.priority}', using NORMAL. Error: {e}")
             priority_enum = DefectPriority.NORMAL
@@ -125,7 +141,7 @@ async def create_defect(
         # Parse status with fallback
         try:
             status_enum = DefectStatus(defect_in.status.upper())
-            logger.info(f"   Status: {status_enum}")
+            logger.debug("   Status: %s", status_enum)
         except ValueError as e:
             logger.warning(f"⚠️ Invalid status '{defect_in.status}', using OPEN. Error: {e}")
             status_enum = DefectStatus.OPEN
@@ -133,7 +149,7 @@ async def create_defect(
         # ✅ Parse Defect Source with fallback
         try:
             defect_source_enum = DefectSource(defect_in.defect_source)
-            logger.info(f"   Defect Source: {defect_source_enum}")
+            logger.debug("   Defect Source: %s", defect_source_enum)
         except ValueError as e:
             logger.warning(f"⚠️ Invalid defect source '{defect_in.defect_source}', using INTERNAL_AUDIT. Error: {e}")
             defect_source_enum = DefectSource.INTERNAL_AUDIT
@@ -143,7 +159,7 @@ async def create_defect(
         if defect_in.date:
             try:
                 date_id = datetime.strptime(defect_in.date, '%Y-%m-%d')
-                logger.info(f"   Date Identified: {date_id}")
+                logger.debug("   Date Identified: %s", date_id)
             except ValueError as e:
                 logger.error(f"❌ Invalid date format '{defect_in.date}': {e}")
                 try:
@@ -157,7 +173,7 @@ async def create_defect(
         if defect_in.target_close_date:
             try:
                 target_date = datetime.strptime(defect_in.target_close_date, '%Y-%m-%d')
-                logger.info(f"   Target Close Date: {target_date}")
+                logger.debug("   Target Close Date: %s", target_date)
             except ValueError as e:
                 logger.error(f"❌ Invalid target date format '{defect_in.target_close_date}': {e}")
                 try:
@@ -182,23 +198,27 @@ async def create_defect(
             target_close_date=target_date
         )
         
-        logger.info("💾 Adding defect to database...")
+        logger.debug("💾 Adding defect to database...")
         db.add(new_defect)
+
+        # Email is queued in the outbox inside the same transaction
+        logger.debug("📧 Queueing email notification...")
+        enqueue_defect_email(db, prepare_email_data(new_defect), "CREATED")
         
-        logger.info("💾 Committing transaction...")
+        logger.debug("💾 Committing transaction...")
         await db.commit()
         
-        logger.info("🔄 Refreshing defect with relationships...")
+        logger.debug("🔄 Refreshing defect with relationships...")
         await db.refresh(new_defect, attribute_names=["pr_entries", "vessel"])
 
-        logger.info("✅ Defect created successfully")
+        logger.debug("✅ Defect created successfully")
 
         # Get vessel name for notifications
         vessel = await db.get(Vessel, new_defect.vessel_imo)
         vessel_name = vessel.name if vessel else new_defect.vessel_imo
 
         # Send notifications
-        logger.info("📢 Sending notifications to vessel users...")
+        logger.debug("📢 Sending notifications to vessel users...")
         await notify_vessel_users(
             db=db,
             vessel_imo=new_defect.vessel_imo,
@@ -210,12 +230,8 @@ async def create_defect(
         )
         await db.commit()
 
-        # Send email notification
-        logger.info("📧 Scheduling email notification...")
-        email_data = prepare_email_data(new_defect)
-        background_tasks.add_task(send_defect_email, email_data, "CREATED")
-        
         logger.info(f"🎉 Defect {new_defect.id} creation complete")
+        sign_defects([new_defect])
         return new_defect
 
     except HTTPException:
@@ -319,7 +335,9 @@ async def create_thread(
         existing = await db.get(Thread, thread_in.id)
         if existing:
             res = await db.execute(select(Thread).where(Thread.id == thread_in.id).options(selectinload(Thread.attachments)))
-            return res.scalars().first()
+            thread = res.scalars().first()
+            sign_attachments(thread.attachments)
+            return thread
 
         new_thread = Thread(
             id=thread_in.id,
@@ -343,6 +361,7 @@ async def create_thread(
             )
         await db.commit()
         await db.refresh(new_thread, attribute_names=["attachments"])
+        sign_attachments(new_thread.attachments)
         return new_thread
         
     except Exception as e:
@@ -350,10 +369,54 @@ async def create_thread(
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- BATCH SYNC (offline outbox: many threads + attachments, one transaction) ---
+@router.post("/threads/batch", response_model=ThreadSyncResponse)
+async def sync_thread_batch(
+    sync_in: ThreadSyncRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Replays queued threads (each with its attachments) across any number
+    of defects. Idempotent on the client-generated ids: re-sending a batch
+    reports "existing" instead of failing, and items the user may not
+    post are "rejected" without affecting the rest.
+    """
+    attachment_total = sum(len(t.attachments) for t in sync_in.threads)
+    if len(sync_in.threads) > settings.THREAD_SYNC_MAX_THREADS or attachment_total > settings.THREAD_SYNC_MAX_ATTACHMENTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.THREAD_SYNC_MAX_THREADS} threads / {settings.THREAD_SYNC_MAX_ATTACHMENTS} attachments)"
+        )
+
+    try:
+        results, new_attachments = await sync_threads(db, sync_in.threads, current_user)
+        await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Error syncing thread batch: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    for sha in {a.content_sha256 for a in new_attachments if a.content_sha256}:
+        background_tasks.add_task(verify_content, sha)
+    for attachment in new_attachments:
+        if is_image(attachment.blob_path, attachment.content_type):
+            background_tasks.add_task(process_attachment_image, attachment.id)
+
+    created_threads = sum(1 for r in results if r.status == CREATED)
+    logger.info(f"🔄 Synced batch: {created_threads}/{len(results)} threads, {len(new_attachments)}/{attachment_total} attachments created")
+    return ThreadSyncResponse(
+        results=results,
+        created_threads=created_threads,
+        created_attachments=len(new_attachments)
+    )
+
 # --- CREATE ATTACHMENT (with file size validation) ---
 @router.post("/attachments", response_model=AttachmentResponse)
 async def create_attachment(
     attachment_in: AttachmentBase,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -362,6 +425,7 @@ async def create_attachment(
         existing = await db.get(Attachment, attachment_in.id)
         if existing: 
             logger.info(f"⚠️ Attachment {attachment_in.id} already exists")
+            sign_attachments([existing])
             return existing
 
         # ✅ File size validation (1MB limit)
@@ -370,8 +434,25 @@ async def create_attachment(
             logger.error(f"❌ File size exceeds limit: {attachment_in.file_size} bytes")
             raise HTTPException(
                 status_code=400,
-                detail=f"File '{attachment_in.file_name}' exceeds 1MB limit ({attachment_in.file_size / 1024 / 1024:.2f}MB)"
+                detail=f"File '{attachment_in.file_name}' exceeds 1MB limit ({attachment_in.file_size / 1024 / 1024:.2f}MB), use /attachments/uploads for larger files"
+            )
+
+        content_sha256 = None
+        if attachment_in.content_sha256:
+            try:
+                content_sha256 = normalize_sha256(attachment_in.content_sha256)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if not attachment_in.file_size:
+                raise HTTPException(status_code=400, detail="file_size is required with content_sha256")
+        # First upload of this content: enters the dedup index once verified
+        try:
+            content_sha256 = await attach_content(
+                db, content_sha256, attachment_in.blob_path,
+                attachment_in.file_size, attachment_in.content_type
             )
+        except ContentPathMismatch as e:
+            raise HTTPException(status_code=409, detail=str(e))
 
         new_attachment = Attachment(
             id=attachment_in.id,
@@ -379,7 +460,8 @@ async def create_attachment(
             file_name=attachment_in.file_name,
             file_size=attachment_in.file_size,
             content_type=attachment_in.content_type,
-            blob_path=attachment_in.blob_path
+            blob_path=attachment_in.blob_path,
+            content_sha256=content_sha256
         )
         
         db.add(new_attachment)
@@ -387,6 +469,13 @@ async def create_attachment(
         await db.refresh(new_attachment)
         
         logger.info(f"✅ Attachment created: {new_attachment.file_name}")
+
+        # Thumbnails / preview are rendered after the response is sent
+        if content_sha256:
+            background_tasks.add_task(verify_content, content_sha256)
+        if is_image(new_attachment.blob_path, new_attachment.content_type):
+            background_tasks.add_task(process_attachment_image, new_attachment.id)
+        sign_attachments([new_attachment])
         return new_attachment
         
     except HTTPException:
@@ -396,26 +485,163 @@ async def create_attachment(
         await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-# --- GET THREADS ---
-@router.get("/{defect_id}/threads", response_model=list[ThreadResponse])
-async def get_defect_threads(defect_id: UUID, db: AsyncSession = Depends(get_db)):
-    """Get all threads for a defect"""
+# --- DELETE ATTACHMENT ---
+@router.delete("/attachments/{attachment_id}")
+async def delete_attachment(
+    attachment_id: UUID,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Deletes attachment metadata. Content-addressed blobs are shared, so
+    the blob is only purged when its last reference goes away.
+    """
+    attachment = await db.get(Attachment, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    thread = await db.get(Thread, attachment.thread_id)
+    defect = await db.get(Defect, thread.defect_id) if thread else None
+    if not defect:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    ensure_vessel_access(current_user, defect.vessel_imo)
+
     try:
-        query = select(Thread).where(Thread.defect_id == defect_id)\
-                .options(selectinload(Thread.attachments), selectinload(Thread.user))\
-                .order_by(Thread.created_at.asc())
+        content_sha256 = attachment.content_sha256
+        blob_paths = [attachment.blob_path] + [derived_blob_path(attachment.blob_path, v) for v in VARIANTS]
 
-        result = await db.execute(query)
-        threads = result.scalars().all()
+        await db.delete(attachment)
+        remaining = await release_reference(db, content_sha256) if content_sha256 else None
+        await db.commit()
+
+        if content_sha256:
+            if remaining is not None and remaining <= 0:
+                background_tasks.add_task(purge_content, content_sha256)
+        else:
+            background_tasks.add_task(delete_blobs, blob_paths)
+
+        logger.info(f"🗑️ Attachment {attachment_id} deleted (remaining refs: {remaining})")
+        return {"message": "Attachment deleted", "id": str(attachment_id)}
+    except Exception as e:
+        logger.error(f"❌ Error deleting attachment: {str(e)}")
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
 
-        for thread in threads:
-            thread.author_role = thread.user.full_name
-                
-        return threads
+# --- GET THREADS ---
+@router.get("/{defect_id}/threads", response_model=list[ThreadResponse])
+async def get_defect_threads(
+    defect_id: UUID,
+    response: Response,
+    limit: int = Query(None, ge=1, description="Page size (default THREAD_PAGE_SIZE)"),
+    before: Optional[UUID] = Query(None, description="Thread id: return older messages (X-Older-Cursor)"),
+    after: Optional[UUID] = Query(None, description="Thread id: return newer messages (last seen)"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Threads for a defect, oldest first. Without cursors: the latest page.
+    X-Older-Cursor / X-Newer-Cursor headers are set when more remain.
+    """
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    limit = min(limit or settings.THREAD_PAGE_SIZE, settings.THREAD_PAGE_MAX)
+    try:
+        page = await fetch_thread_page(db, defect_id, limit, before=before, after=after)
+
+        if page.older_cursor:
+            response.headers["X-Older-Cursor"] = str(page.older_cursor)
+        if page.newer_cursor:
+            response.headers["X-Newer-Cursor"] = str(page.newer_cursor)
+        return page.threads
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"❌ Error fetching threads: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- DEFECT DETAIL (one round trip for the defect screen) ---
+@router.get("/{defect_id}/detail", response_model=DefectDetailResponse)
+async def get_defect_detail(
+    limit: int = Query(None, ge=1, description="Thread page size (default THREAD_PAGE_SIZE)"),
+    defect: Defect = Depends(get_accessible_defect),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Defect + PR entries, the latest page of threads with attachments,
+    read URLs for every blob on screen and the mentionable roster.
+    Replaces /threads, /pr-entries, /vessel-users and batch-signed-urls.
+    """
+    try:
+        await db.refresh(defect, attribute_names=["pr_entries", "vessel"])
+        defect.vessel_name = defect.vessel.name if defect.vessel else None
+        sign_defects([defect])
+
+        limit = min(limit or settings.THREAD_PAGE_SIZE, settings.THREAD_PAGE_MAX)
+        page = await fetch_thread_page(db, defect.id, limit)
+
+        # Roster: from the in-memory fleet registry, already sorted by name
+        roster = [
+            VesselUserResponse(id=u["id"], full_name=u["full_name"], job_title=u["job_title"])
+            for u in await fleet_registry.get_roster(defect.vessel_imo, active_only=True)
+        ]
+
+        # Signing is local (cached HMAC), no storage round trips
+        blob_paths = [
+            defect.before_image_path, defect.after_image_path,
+            defect.closure_image_before, defect.closure_image_after,
+        ] + [a.blob_path for t in page.threads for a in t.attachments]
+        signed_urls = {}
+        for path in blob_paths:
+            url = generate_read_sas_url_or_none(path)
+            if url:
+                signed_urls[path] = url
+
+        return DefectDetailResponse(
+            defect=DefectResponse.model_validate(defect),
+            threads=page.threads,
+            older_cursor=page.older_cursor,
+            vessel_users=roster,
+            signed_urls=signed_urls
+        )
+    except Exception as e:
+        logger.error(f"❌ Error fetching defect detail: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# --- DOWNLOAD ALL ATTACHMENTS (streaming ZIP) ---
+@router.get("/{defect_id}/attachments.zip")
+async def download_defect_attachments(
+    defect: Defect = Depends(get_accessible_defect),
+    db: AsyncSession = Depends(get_db)
+):
+    """All evidence for a defect (defect images + thread attachments) as one ZIP, streamed."""
+    entries = []
+    for label, path in (
+        ("before", defect.before_image_path),
+        ("after", defect.after_image_path),
+        ("closure_before", defect.closure_image_before),
+        ("closure_after", defect.closure_image_after),
+    ):
+        if path:
+            entries.append((f"defect/{label}_{safe_arcname(path)}", path))
+
+    query = select(Attachment.file_name, Attachment.blob_path, Thread.created_at)\
+            .join(Thread, Attachment.thread_id == Thread.id)\
+            .where(Thread.defect_id == defect.id)\
+            .order_by(Thread.created_at.asc(), Attachment.created_at.asc())
+    result = await db.execute(query)
+    for file_name, blob_path, created_at in result.all():
+        prefix = created_at.strftime("%Y%m%d-%H%M%S") if created_at else "undated"
+        entries.append((f"threads/{prefix}_{safe_arcname(file_name)}", blob_path))
+
+    if not entries:
+        raise HTTPException(status_code=404, detail="Defect has no attachments")
+
+    file_name = f"defect_{defect.vessel_imo}_{str(defect.id)[:8]}.zip"
+    return StreamingResponse(
+        stream_zip(unique_arcnames(entries)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
 # --- GET VESSEL USERS ---
 @router.get("/{defect_id}/vessel-users", response_model=list[VesselUserResponse])
 async def get_vessel_users_for_defect(defect_id: UUID, db: AsyncSession = Depends(get_db)):
@@ -425,17 +651,42 @@ async def get_vessel_users_for_defect(defect_id: UUID, db: AsyncSession = Depend
         if not defect: 
             raise HTTPException(status_code=404, detail="Defect not found")
         
-        query = select(User).join(User.vessels).where(Vessel.imo == defect.vessel_imo)
-        result = await db.execute(query)
-        users = result.scalars().all()
-        
-        return [{"id": str(u.id), "full_name": u.full_name} for u in users]
+        users = await fleet_registry.get_roster(defect.vessel_imo)
+        return [{"id": u["id"], "full_name": u["full_name"]} for u in users]
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"❌ Error fetching vessel users: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- @MENTION PICKER (served from memory on every keystroke) ---
+@router.get("/{defect_id}/mentionable", response_model=list[MentionableUserResponse])
+async def get_mentionable_users(
+    defect_id: UUID,
+    q: Optional[str] = Query(None, max_length=100, description="Prefix / substring of name or job title"),
+    limit: int = Query(None, ge=1, description="Max results (default MENTION_RESULTS_DEFAULT)"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Vessel crew and shore staff matching `q`, best matches first"""
+    vessel_imo = await fleet_registry.get_defect_vessel(db, defect_id)
+    if vessel_imo is None:
+        raise HTTPException(status_code=404, detail="Defect not found")
+    ensure_vessel_access(current_user, vessel_imo)
+
+    limit = min(limit or settings.MENTION_RESULTS_DEFAULT, settings.MENTION_RESULTS_MAX)
+    entries = await fleet_registry.search_mentionable(vessel_imo, q, limit)
+    return [
+        MentionableUserResponse(
+            id=e.user["id"],
+            full_name=e.user["full_name"],
+            job_title=e.user["job_title"],
+            role=e.user["role"],
+            on_vessel=e.on_vessel
+        )
+        for e in entries
+    ]
+
 # --- UPDATE DEFECT ---
 @router.patch("/{defect_id}", response_model=DefectResponse)
 async def update_defect(
@@ -467,10 +718,15 @@ async def update_defect(
                     pass
             else:
                 setattr(defect, field, value)
-                
+
+        enqueue_defect_email(db, prepare_email_data(defect), "UPDATED")
         await db.commit()
         await db.refresh(defect, attribute_names=["pr_entries"])
 
+        new_image_paths = [update_data.get(f) for f in ("before_image_path", "after_image_path")]
+        if any(new_image_paths):
+            background_tasks.add_task(process_defect_images, defect.id, new_image_paths)
+
         new_priority_str = defect.priority.value if hasattr(defect.priority, "value") else str(defect.priority)
         
         if defect_in.priority and old_priority_str != new_priority_str:
@@ -498,9 +754,7 @@ async def update_defect(
             )
             await db.commit() 
 
-        email_data = prepare_email_data(defect)
-        background_tasks.add_task(send_defect_email, email_data, "UPDATED")
-
+        sign_defects([defect])
         return defect
         
     except HTTPException:
@@ -555,12 +809,15 @@ async def close_defect(
             defect_id=str(defect.id)
         )
 
+        enqueue_defect_email(db, prepare_email_data(defect), "CLOSED")
         await db.commit()
         await db.refresh(defect, attribute_names=["pr_entries"])
 
-        email_data = prepare_email_data(defect)
-        background_tasks.add_task(send_defect_email, email_data, "CLOSED")
+        background_tasks.add_task(
+            process_defect_images, defect.id, [defect.closure_image_before, defect.closure_image_after]
+        )
 
+        sign_defects([defect])
         return defect
         
     except HTTPException:
@@ -574,7 +831,6 @@ async def close_defect(
 @router.delete("/{defect_id}")
 async def remove_defect(
     defect_id: UUID,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
     """Soft delete a defect"""
@@ -583,12 +839,11 @@ async def remove_defect(
         if not defect: 
             raise HTTPException(status_code=404, detail="Defect not found")
 
-        email_data = prepare_email_data(defect)
-        
+        enqueue_defect_email(db, prepare_email_data(defect), "REMOVED")
+
         defect.is_deleted = True 
         await db.commit()
-
-        background_tasks.add_task(send_defect_email, email_data, "REMOVED")
+        fleet_registry.forget_defect(defect_id)
 
         return {"message": "Defect removed and archived"}
         
@@ -0,0 +1,121 @@
+# app/api/v1/endpoints/reports.py
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.blob_storage import generate_read_sas_url
+from app.api.deps import get_current_user, ensure_vessel_access
+from app.models.user import User
+from app.models.vessel import Vessel
+from app.models.enums import UserRole, DefectStatus
+from app.services.defect_report import (
+    RenderedReport, count_report_defects, load_report_defects, build_report, upload_report
+)
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+class ReportStreamingResponse(StreamingResponse):
+    """
+    Removes the report's temp directory however the response ends: the
+    background task after a full send, and the finally below when the
+    client is gone before the body starts (Starlette then skips both the
+    generator and the background task).
+    """
+
+    def __init__(self, report: RenderedReport, **kwargs):
+        super().__init__(report.iter_bytes(), background=BackgroundTask(report.cleanup), **kwargs)
+        self.report = report
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.report.cleanup()
+
+# --- DEFECT REPORT (PDF) ---
+@router.get("/defects.pdf")
+async def get_defect_report(
+    vessel_imo: Optional[str] = Query(None, description="One vessel; omit for the whole fleet you can see"),
+    status: Optional[str] = Query(None, description="OPEN / IN_PROGRESS / CLOSED"),
+    include_images: bool = Query(True, description="Embed thumbnails of defect images and attachments"),
+    destination: str = Query("response", pattern="^(response|blob)$"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Audit report: one section per defect (fields, PR entries, thread
+    history, thumbnails), rendered in parallel and merged behind a cover
+    page. Streamed back, or uploaded to reports/ with a read URL returned.
+    """
+    # Scope: vessel users only ever get their own vessels
+    if vessel_imo:
+        ensure_vessel_access(current_user, vessel_imo)
+        # Shore users pass any IMO: it names the reports/ folder, so it must be a real vessel
+        if await db.get(Vessel, vessel_imo) is None:
+            raise HTTPException(status_code=404, detail="Vessel not found")
+        vessel_imos = [vessel_imo]
+    elif current_user.role == UserRole.VESSEL:
+        vessel_imos = [v.imo for v in current_user.vessels]
+    else:
+        vessel_imos = None
+
+    status_enum = None
+    if status:
+        try:
+            status_enum = DefectStatus(status.upper())
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid status '{status}'")
+
+    # Count first: an oversized scope is refused without loading a single row
+    defect_count = await count_report_defects(db, vessel_imos, status_enum)
+    if not defect_count:
+        raise HTTPException(status_code=404, detail="No defects match this report")
+    if defect_count > settings.REPORT_MAX_DEFECTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Report would contain {defect_count} defects (limit {settings.REPORT_MAX_DEFECTS}); narrow it by vessel or status"
+        )
+    defects = await load_report_defects(db, vessel_imos, status_enum)
+
+    scope = vessel_imo or "fleet"
+    title = f"Defect Report - {scope}" + (f" ({status_enum.value})" if status_enum else "")
+    try:
+        report = await build_report(defects, title, include_images=include_images)
+    except Exception as e:
+        logger.error(f"❌ Report generation failed: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Report generation failed: {str(e)}")
+
+    file_name = f"defect_report_{scope}_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
+
+    if destination == "blob":
+        blob_path = f"reports/{scope}/{file_name}"
+        page_count, defect_count = report.page_count, report.defect_count
+        try:
+            await upload_report(report, blob_path)
+        except Exception as e:
+            logger.error(f"❌ Report upload failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Report upload failed: {str(e)}")
+        return {
+            "blob_path": blob_path,
+            "url": generate_read_sas_url(blob_path),
+            "pages": page_count,
+            "defects": defect_count
+        }
+
+    return ReportStreamingResponse(
+        report,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": f'attachment; filename="{file_name}"',
+            "Content-Length": str(report.size),
+            "X-Report-Pages": str(report.page_count),
+        }
+    )
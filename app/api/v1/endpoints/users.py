@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
 from app.models.vessel import Vessel
-from app.schemas.user import UserCreate, UserResponse
-from app.core.security import get_password_hash
+from app.models.enums import UserRole
+from app.schemas.user import UserCreate, UserResponse, EmailDigestPreference, ImportReport, NotificationResponse
 from app.models.tasks import Task, Notification
 from sqlalchemy import update, desc
 from app.api.deps import get_current_user # <--- ADDED THIS IMPORT
+from app.services.recipient_directory import recipient_directory
+from app.services.fleet_registry import fleet_registry
+from app.core.security import get_password_hash
+from app.services.bulk_import import parse_import_file, import_fleet, ImportFileError
 from uuid import UUID
+import asyncio
+import logging
 
-
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 @router.post("/", response_model=UserResponse)
@@ -39,16 +47,21 @@ async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     # 3. Create User
     new_user = User(
         email=user_in.email,
-        password_hash=get_password_hash(user_in.password), # <--- CRITICAL FIX: 'password_hash'
+        password_hash=await asyncio.to_thread(get_password_hash, user_in.password), # One hash: a thread, not the process pool
         full_name=user_in.full_name,
         job_title=user_in.job_title,
         role=user_in.role,
+        email_digest_minutes=user_in.email_digest_minutes,
         vessels=vessels_to_assign 
     )
 
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+
+    # New user may be shore staff or assigned to vessels: drop cached recipients
+    recipient_directory.invalidate()
+    fleet_registry.invalidate()
     
     # Manually map response to avoid Pydantic validation errors on relationships
     return {
@@ -57,9 +70,74 @@ async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
         "full_name": new_user.full_name,
         "role": new_user.role,
         "is_active": new_user.is_active,
+        "email_digest_minutes": new_user.email_digest_minutes,
         # Helper to return list of IMOs
         "assigned_vessel_imos": [v.imo for v in new_user.vessels]
     }
+# --- BULK IMPORT (CSV / JSON onboarding) ---
+@router.post("/import", response_model=ImportReport)
+async def import_users(
+    files: List[UploadFile] = File(..., description="users.csv / vessels.csv, or one JSON with 'vessels' and 'users'"),
+    dry_run: bool = Query(False, description="Validate only, write nothing"),
+    allow_partial: bool = Query(False, description="Import the valid rows even if some rows fail"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Creates vessels, users and assignments in one transaction with a per-row report"""
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail="Only admins can import users")
+
+    vessel_rows, user_rows = [], []
+    max_bytes = settings.BULK_IMPORT_MAX_MB * 1024 * 1024
+    for upload in files:
+        content = await upload.read(max_bytes + 1)
+        if len(content) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"{upload.filename} exceeds {settings.BULK_IMPORT_MAX_MB}MB")
+        try:
+            vessels, users = parse_import_file(upload.filename or "upload", content)
+        except ImportFileError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        vessel_rows += vessels
+        user_rows += users
+
+    if len(vessel_rows) + len(user_rows) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Import is limited to {settings.BULK_IMPORT_MAX_ROWS} rows")
+
+    try:
+        report = await import_fleet(db, vessel_rows, user_rows, dry_run=dry_run, allow_partial=allow_partial)
+        if report.imported:
+            await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Error importing users: {e}", exc_info=True)
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Import failed; nothing was written")
+
+    if report.imported:
+        recipient_directory.invalidate()
+        fleet_registry.invalidate()
+    return report
+
+# --- EMAIL PREFERENCES ---
+
+@router.patch("/me/email-digest")
+async def set_my_email_digest(
+    pref_in: EmailDigestPreference,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Set the digest interval in minutes (null = role default, 0 = every event)"""
+    if pref_in.email_digest_minutes is not None and pref_in.email_digest_minutes < 0:
+        raise HTTPException(status_code=400, detail="email_digest_minutes must be >= 0")
+
+    stmt = update(User).where(User.id == current_user.id).values(
+        email_digest_minutes=pref_in.email_digest_minutes
+    )
+    await db.execute(stmt)
+    await db.commit()
+
+    recipient_directory.invalidate()
+    return {"status": "success", "email_digest_minutes": pref_in.email_digest_minutes}
+
 # --- TASKS ENDPOINTS ---
 
 @router.get("/me/tasks")
@@ -94,7 +172,7 @@ async def complete_task(
 
 # --- NOTIFICATIONS ENDPOINTS ---
 
-@router.get("/me/notifications")
+@router.get("/me/notifications", response_model=List[NotificationResponse])
 async def get_my_notifications(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
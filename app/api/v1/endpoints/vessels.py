@@ -1,51 +1,59 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from app.core.config import settings
 from app.core.database import get_db
+from app.models.user import User
 from app.models.vessel import Vessel
 from app.schemas.vessel import VesselCreate, VesselResponse
 import traceback
 from app.schemas.defect import VesselUserResponse
+from app.services.recipient_directory import recipient_directory
+from app.services.fleet_registry import fleet_registry
 
 router = APIRouter()
 
-# 1. GET ALL VESSELS
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 asks for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+def cached_json(request: Request, body: bytes, etag: str) -> Response:
+    """Pre-encoded registry payload, or 304 when the client already has it."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.FLEET_HTTP_MAX_AGE_SECONDS}, must-revalidate",
+    }
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# 1. GET ALL VESSELS (served from the fleet registry)
 @router.get("/", response_model=List[VesselResponse])
-async def read_vessels(db: AsyncSession = Depends(get_db)):
+async def read_vessels(request: Request):
     try:
-        result = await db.execute(select(Vessel))
-        vessels = result.scalars().all()
-        
-        # Map DB 'imo' to API 'imo_number'
-        response_data = []
-        for v in vessels:
-            response_data.append({
-                "imo_number": v.imo, 
-                "name": v.name,
-                "vessel_type": v.vessel_type,
-                # "code": v.code,     # <--- Ensure this is mapped
-                "email": v.email,   # <--- Ensure this is mapped
-                "is_active": v.is_active,
-                "created_at": v.created_at
-            })
-        return response_data
+        snapshot = await fleet_registry.snapshot()
+        body, etag = snapshot.encoded("vessels", list(snapshot.vessels.values()))
+        return cached_json(request, body, etag)
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{imo_number}/users", response_model=List[VesselUserResponse])
-async def get_users_by_vessel(
-    imo_number: str,
-    db: AsyncSession = Depends(get_db)
-):
+async def get_users_by_vessel(imo_number: str, request: Request):
     """Fetch all users assigned to a specific vessel IMO"""
     try:
-        # Join User -> user_vessel_link -> Vessel
-        stmt = select(User).join(User.vessels).where(Vessel.imo == imo_number)
-        result = await db.execute(stmt)
-        users = result.scalars().all()
-        return users
+        snapshot = await fleet_registry.snapshot()
+        roster = [
+            {"id": u["id"], "full_name": u["full_name"], "job_title": u["job_title"]}
+            for u in snapshot.rosters.get(imo_number, [])
+        ]
+        body, etag = snapshot.encoded(f"roster:{imo_number}", roster)
+        return cached_json(request, body, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -77,6 +85,8 @@ async def create_vessel(
         db.add(new_vessel)
         await db.commit()
         await db.refresh(new_vessel)
+        recipient_directory.invalidate(new_vessel.imo)
+        fleet_registry.invalidate()
         
         return {
             "imo_number": new_vessel.imo,
@@ -1,20 +1,29 @@
 # app/core/blob_storage.py
+import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+import aiohttp
+from azure.core.exceptions import ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
 from azure.storage.blob import (
-    BlobServiceClient, 
     generate_blob_sas, 
     BlobSasPermissions,
     ContentSettings
 )
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from azure.storage.filedatalake import generate_directory_sas, DirectorySasPermissions
 from app.core.config import settings
+from app.core.metrics import SAS_READ_HIT, SAS_READ_MISS, SAS_WRITE, SAS_DIRECTORY
 
 logger = logging.getLogger(__name__)
 
-def get_blob_info():
-    """Parses connection string to get account details safely."""
-    conn_str = settings.AZURE_STORAGE_CONNECTION_STRING
-    
+# Azurite (local emulator) well-known development account
+AZURITE_ACCOUNT_NAME = "devstoreaccount1"
+AZURITE_ACCOUNT_KEY = "Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=="
+AZURITE_BLOB_ENDPOINT = "http://127.0.0.1:10000/devstoreaccount1"
+
+def parse_connection_string(conn_str: str) -> dict:
     # Handle both semicolon and newline-separated connection strings
     if ';' in conn_str:
         parts = [item for item in conn_str.split(';') if item and '=' in item]
@@ -24,81 +33,181 @@ def get_blob_info():
     conn_str_dict = {}
     for part in parts:
         key, value = part.split('=', 1)
-        conn_str_dict[key.strip()] = value.strip()
-    
-    account_name = (conn_str_dict.get('AccountName') or 
-                   conn_str_dict.get('accountname') or 
-                   conn_str_dict.get('ACCOUNTNAME'))
+        conn_str_dict[key.strip().lower()] = value.strip()
+    return conn_str_dict
+
+def get_blob_info():
+    """Parses connection string to get account details safely."""
+    conn_str_dict = parse_connection_string(settings.AZURE_STORAGE_CONNECTION_STRING)
+
+    if conn_str_dict.get('usedevelopmentstorage', '').lower() == 'true':
+        return {
+            "account_name": AZURITE_ACCOUNT_NAME,
+            "account_key": AZURITE_ACCOUNT_KEY,
+            "container": settings.AZURE_CONTAINER_NAME,
+            "blob_endpoint": AZURITE_BLOB_ENDPOINT
+        }
     
-    account_key = (conn_str_dict.get('AccountKey') or 
-                  conn_str_dict.get('accountkey') or 
-                  conn_str_dict.get('ACCOUNTKEY'))
+    account_name = conn_str_dict.get('accountname')
+    account_key = conn_str_dict.get('accountkey')
     
     if not account_name or not account_key:
         logger.error(f"❌ Failed to parse connection string. Keys found: {list(conn_str_dict.keys())}")
         raise ValueError("Invalid Azure Storage connection string format")
     
-    logger.info(f"✅ Parsed account: {account_name}, container: {settings.AZURE_CONTAINER_NAME}")
+    blob_endpoint = conn_str_dict.get('blobendpoint') or f"https://{account_name}.blob.core.windows.net"
     
     return {
         "account_name": account_name,
         "account_key": account_key,
-        "container": settings.AZURE_CONTAINER_NAME
+        "container": settings.AZURE_CONTAINER_NAME,
+        "blob_endpoint": blob_endpoint.rstrip('/')
     }
 
+class BlobSasSigner:
+    """
+    Account details parsed once and reused for every SAS we issue.
+    Read URLs are expiry-aligned to SAS_EXPIRY_BUCKET_MINUTES and kept in
+    an LRU cache, so the same blob keeps the same URL (and stays in the
+    browser cache) until it gets close to expiry.
+    """
+
+    def __init__(self, account_name: str, account_key: str, container: str, blob_endpoint: str):
+        self.account_name = account_name
+        self.account_key = account_key
+        self.container = container
+        self.blob_endpoint = blob_endpoint
+
+        self._read_urls: OrderedDict[str, tuple[str, datetime]] = OrderedDict()
+        self._read_scopes: dict[str, tuple[str, datetime]] = {}
+        self.read_cache_hits = 0
+        self.read_cache_misses = 0
+
+    @classmethod
+    def from_settings(cls) -> "BlobSasSigner":
+        info = get_blob_info()
+        logger.info(f"✅ SAS signer ready for account: {info['account_name']}, container: {info['container']}")
+        return cls(info["account_name"], info["account_key"], info["container"], info["blob_endpoint"])
+
+    def blob_url(self, blob_path: str) -> str:
+        return f"{self.blob_endpoint}/{self.container}/{blob_path}"
+
+    def sign(self, blob_path: str, permission: BlobSasPermissions, expiry: datetime, start: datetime | None = None) -> str:
+        sas_token = generate_blob_sas(
+            account_name=self.account_name,
+            account_key=self.account_key,
+            container_name=self.container,
+            blob_name=blob_path,
+            permission=permission,
+            start=start,
+            expiry=expiry
+        )
+        return f"{self.blob_url(blob_path)}?{sas_token}"
+
+    @staticmethod
+    def aligned_expiry(now: datetime, lifetime: timedelta) -> datetime:
+        """now + lifetime, rounded up to the next bucket boundary."""
+        bucket = settings.SAS_EXPIRY_BUCKET_MINUTES * 60
+        target = int((now + lifetime).timestamp())
+        aligned = -(-target // bucket) * bucket
+        return datetime.fromtimestamp(aligned, tz=timezone.utc)
+
+    def read_url(self, blob_path: str) -> str:
+        now = datetime.now(timezone.utc)
+        min_remaining = timedelta(hours=settings.SAS_READ_MIN_REMAINING_HOURS)
+
+        cached = self._read_urls.get(blob_path)
+        if cached and cached[1] - now > min_remaining:
+            self._read_urls.move_to_end(blob_path)
+            self.read_cache_hits += 1
+            SAS_READ_HIT.inc()
+            return cached[0]
+
+        self.read_cache_misses += 1
+        SAS_READ_MISS.inc()
+        expiry = self.aligned_expiry(now, timedelta(hours=settings.SAS_READ_EXPIRY_HOURS))
+        url = self.sign(blob_path, BlobSasPermissions(read=True), expiry)
+
+        self._read_urls[blob_path] = (url, expiry)
+        self._read_urls.move_to_end(blob_path)
+        while len(self._read_urls) > settings.SAS_URL_CACHE_SIZE:
+            self._read_urls.popitem(last=False)
+        return url
+
+    def write_url(self, blob_path: str) -> str:
+        now = datetime.now(timezone.utc)
+        SAS_WRITE.inc()
+        # Start 15 minutes in the past to handle clock skew
+        return self.sign(
+            blob_path,
+            BlobSasPermissions(read=True, write=True, create=True),
+            expiry=now + timedelta(hours=1),
+            start=now - timedelta(minutes=15)
+        )
+
+    def create_url(self, blob_path: str) -> str:
+        """Create-only SAS: uploads a new blob but can never overwrite an existing one."""
+        now = datetime.now(timezone.utc)
+        SAS_WRITE.inc()
+        return self.sign(
+            blob_path,
+            BlobSasPermissions(create=True),
+            expiry=now + timedelta(hours=1),
+            start=now - timedelta(minutes=15)
+        )
+
+    def sign_directory(self, prefix: str, permission: DirectorySasPermissions, expiry: datetime) -> str:
+        """
+        Directory-scoped SAS (sr=d) covering every blob under `prefix`.
+        Only valid on accounts with hierarchical namespace (ADLS Gen2).
+        """
+        SAS_DIRECTORY.inc()
+        return generate_directory_sas(
+            account_name=self.account_name,
+            file_system_name=self.container,
+            directory_name=prefix.strip('/'),
+            credential=self.account_key,
+            permission=permission,
+            expiry=expiry
+        )
+
+    def read_scope(self, prefix: str) -> tuple[str, datetime]:
+        """Read-only directory SAS, bucket-aligned and cached like read_url()."""
+        now = datetime.now(timezone.utc)
+        cached = self._read_scopes.get(prefix)
+        if cached and cached[1] - now > timedelta(hours=settings.SAS_READ_MIN_REMAINING_HOURS):
+            return cached
+
+        expiry = self.aligned_expiry(now, timedelta(hours=settings.SAS_READ_EXPIRY_HOURS))
+        token = self.sign_directory(prefix, DirectorySasPermissions(read=True), expiry)
+        self._read_scopes[prefix] = (token, expiry)
+        if len(self._read_scopes) > settings.SAS_URL_CACHE_SIZE:
+            self._read_scopes.clear()
+        return token, expiry
+
+    def upload_scope(self, prefix: str) -> tuple[str, datetime]:
+        expiry = datetime.now(timezone.utc) + timedelta(hours=1)
+        token = self.sign_directory(prefix, DirectorySasPermissions(read=True, write=True, create=True), expiry)
+        return token, expiry
+
+_sas_signer: BlobSasSigner | None = None
+
+def get_sas_signer() -> BlobSasSigner:
+    """Process-wide signer; built on first use (warmed up at startup)."""
+    global _sas_signer
+    if _sas_signer is None:
+        _sas_signer = BlobSasSigner.from_settings()
+    return _sas_signer
+
 def generate_write_sas_url(blob_name: str):
     """
     Generates a URL that allows the UI to UPLOAD (Write/Create).
     Uses the latest Azure Storage API version.
     """
-    info = get_blob_info()
-    now = datetime.now(timezone.utc)
-    
-    # Start time 15 minutes in the past to handle clock skew
-    start_time = now - timedelta(minutes=15)
-    expiry_time = now + timedelta(hours=1)
-
     try:
-        logger.info(f"🔧 Generating WRITE SAS for: {blob_name}")
-        logger.info(f"   Account: {info['account_name']}")
-        logger.info(f"   Container: {info['container']}")
-        logger.info(f"   Start: {start_time.isoformat()}")
-        logger.info(f"   Expiry: {expiry_time.isoformat()}")
-        
-        # Generate SAS token with explicit parameters
-        sas_token = generate_blob_sas(
-            account_name=info["account_name"],
-            account_key=info["account_key"],
-            container_name=info["container"],
-            blob_name=blob_name,
-            permission=BlobSasPermissions(read=True, write=True, create=True),
-            start=start_time,
-            expiry=expiry_time
-            # Note: 'version' parameter is handled automatically by SDK 12.28.0
-        )
-        
-        # Debug: Log first 150 chars of SAS token to verify format
-        logger.info(f"🔍 SAS Token (first 150 chars): {sas_token[:150]}...")
-        
-        # Verify 'sv' parameter exists in token
-        if 'sv=' not in sas_token:
-            logger.error("❌ SAS token missing 'sv' (storage version) parameter!")
-            raise ValueError("Generated SAS token is invalid - missing version parameter")
-        
-        # Extract and log the sv value
-        sv_start = sas_token.find('sv=') + 3
-        sv_end = sas_token.find('&', sv_start) if '&' in sas_token[sv_start:] else len(sas_token)
-        sv_value = sas_token[sv_start:sv_end]
-        logger.info(f"✅ Storage Version (sv): {sv_value}")
-        
-        # Construct the full URL
-        url = f"https://{info['account_name']}.blob.core.windows.net/{info['container']}/{blob_name}?{sas_token}"
-        
-        logger.info(f"✅ Generated write SAS URL successfully")
-        logger.info(f"🔗 Full URL (first 200 chars): {url[:200]}...")
-        
+        url = get_sas_signer().write_url(blob_name)
+        logger.debug(f"Generated write SAS for: {blob_name}")
         return url
-        
     except Exception as e:
         logger.error(f"❌ Failed to generate write SAS URL: {str(e)}", exc_info=True)
         raise
@@ -106,89 +215,144 @@ def generate_write_sas_url(blob_name: str):
 def generate_read_sas_url(blob_path: str):
     """
     Generates a URL that allows viewing/downloading (Read).
-    Uses the latest Azure Storage API version.
+    Served from the signer's LRU cache when a fresh-enough URL exists.
     """
-    info = get_blob_info()
-    now = datetime.now(timezone.utc)
-    expiry_time = now + timedelta(hours=24)  # 24 hours for viewing
-    
     try:
-        logger.info(f"🔧 Generating READ SAS for: {blob_path}")
-        logger.info(f"   Account: {info['account_name']}")
-        logger.info(f"   Container: {info['container']}")
-        logger.info(f"   Expiry: {expiry_time.isoformat()}")
-        
-        # Generate SAS token
-        sas_token = generate_blob_sas(
-            account_name=info["account_name"],
-            account_key=info["account_key"],
-            container_name=info["container"],
-            blob_name=blob_path,
-            permission=BlobSasPermissions(read=True),
-            expiry=expiry_time
-        )
-        
-        # Debug logging
-        logger.info(f"🔍 SAS Token (first 150 chars): {sas_token[:150]}...")
-        
-        # Verify 'sv' parameter
-        if 'sv=' not in sas_token:
-            logger.error("❌ SAS token missing 'sv' parameter!")
-            raise ValueError("Generated SAS token is invalid")
-        
-        # Extract sv value
-        sv_start = sas_token.find('sv=') + 3
-        sv_end = sas_token.find('&', sv_start) if '&' in sas_token[sv_start:] else len(sas_token)
-        sv_value = sas_token[sv_start:sv_end]
-        logger.info(f"✅ Storage Version (sv): {sv_value}")
-        
-        # Construct the full URL
-        url = f"https://{info['account_name']}.blob.core.windows.net/{info['container']}/{blob_path}?{sas_token}"
-        
-        logger.info(f"✅ Generated read SAS URL successfully")
-        
-        return url
-        
+        return get_sas_signer().read_url(blob_path)
     except Exception as e:
         logger.error(f"❌ Failed to generate read SAS URL: {str(e)}", exc_info=True)
         raise
 
-def get_blob_service_client():
+def generate_read_sas_url_or_none(blob_path: str | None) -> str | None:
+    """Read URL for optional paths (e.g. thumbnails) in responses; never raises."""
+    if not blob_path:
+        return None
+    try:
+        return get_sas_signer().read_url(blob_path)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not sign {blob_path}: {str(e)}")
+        return None
+
+# --- ASYNC BLOB CLIENT (one per process, created in lifespan) ---
+_blob_service_client: BlobServiceClient | None = None
+_http_session: aiohttp.ClientSession | None = None
+
+async def init_blob_client() -> BlobServiceClient:
+    """
+    Creates the process-wide async BlobServiceClient on one shared aiohttp
+    session, so every container/blob client reuses the same connection
+    pool. Works with Azure and Azurite (UseDevelopmentStorage=true).
+    """
+    global _blob_service_client, _http_session
+    if _blob_service_client is None:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=settings.BLOB_MAX_CONNECTIONS)
+        )
+        transport = AioHttpTransport(session=_http_session, session_owner=False)
+        _blob_service_client = BlobServiceClient.from_connection_string(
+            settings.AZURE_STORAGE_CONNECTION_STRING,
+            transport=transport
+        )
+        logger.info("✅ Async BlobServiceClient initialized")
+    return _blob_service_client
+
+async def close_blob_client():
+    global _blob_service_client, _streaming_client, _http_session
+    if _streaming_client is not None:
+        await _streaming_client.close()
+        _streaming_client = None
+    if _blob_service_client is not None:
+        await _blob_service_client.close()
+        _blob_service_client = None
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+async def get_blob_service_client() -> BlobServiceClient:
     """
-    Returns a BlobServiceClient instance for direct blob operations.
+    Returns the shared async BlobServiceClient for direct blob operations.
     """
+    if _blob_service_client is None:
+        return await init_blob_client()
+    return _blob_service_client
+
+async def get_container_client() -> ContainerClient:
+    client = await get_blob_service_client()
+    return client.get_container_client(settings.AZURE_CONTAINER_NAME)
+
+_streaming_client: BlobServiceClient | None = None
+
+async def get_streaming_container_client() -> ContainerClient:
+    """
+    Container client for streamed downloads: every GET, the first one
+    included (SDK default: 32MB), fetches at most ZIP_CHUNK_BYTES. Shares
+    the process-wide aiohttp session.
+    """
+    global _streaming_client
+    if _streaming_client is None:
+        await get_blob_service_client()
+        _streaming_client = BlobServiceClient.from_connection_string(
+            settings.AZURE_STORAGE_CONNECTION_STRING,
+            transport=AioHttpTransport(session=_http_session, session_owner=False),
+            max_single_get_size=settings.ZIP_CHUNK_BYTES,
+            max_chunk_get_size=settings.ZIP_CHUNK_BYTES
+        )
+    return _streaming_client.get_container_client(settings.AZURE_CONTAINER_NAME)
+
+async def get_blob_properties(blob_path: str):
+    """Blob properties, or None when the blob does not exist."""
+    container = await get_container_client()
     try:
-        connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
-        
-        logger.info("🔧 Initializing BlobServiceClient...")
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        
-        # Test the connection
-        logger.info("🧪 Testing connection to Azure Storage...")
-        blob_service_client.get_service_properties()
-        
-        logger.info("✅ BlobServiceClient initialized and tested successfully")
-        return blob_service_client
-        
-    except Exception as e:
-        logger.error(f"❌ Failed to initialize BlobServiceClient: {str(e)}", exc_info=True)
-        raise
+        return await container.get_blob_client(blob_path).get_blob_properties()
+    except ResourceNotFoundError:
+        return None
 
-def verify_blob_exists(blob_path: str) -> bool:
+async def get_blobs_properties(blob_paths: list[str], concurrency: int = None) -> dict:
+    """
+    Fetches properties for many blobs concurrently (bounded). Maps each
+    path to its properties, or None if missing / the lookup failed.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.BLOB_MAX_CONCURRENCY)
+
+    async def _one(path):
+        async with semaphore:
+            try:
+                return await get_blob_properties(path)
+            except Exception as e:
+                logger.error(f"❌ Error reading blob properties for {path}: {str(e)}")
+                return None
+
+    results = await asyncio.gather(*(_one(p) for p in blob_paths))
+    return dict(zip(blob_paths, results))
+
+async def verify_blob_exists(blob_path: str) -> bool:
     """
     Check if a blob exists in Azure Storage.
     Useful for debugging attachment access issues.
     """
     try:
-        info = get_blob_info()
-        blob_service_client = get_blob_service_client()
-        container_client = blob_service_client.get_container_client(info["container"])
-        blob_client = container_client.get_blob_client(blob_path)
-        
-        exists = blob_client.exists()
-        logger.info(f"🔍 Blob exists check: {blob_path} -> {exists}")
+        container = await get_container_client()
+        exists = await container.get_blob_client(blob_path).exists()
+        logger.debug(f"Blob exists check: {blob_path} -> {exists}")
         return exists
-        
     except Exception as e:
         logger.error(f"❌ Error checking blob existence: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+async def verify_blobs_exist(blob_paths: list[str]) -> dict[str, bool]:
+    """Concurrent existence check for a batch of blob paths."""
+    properties = await get_blobs_properties(blob_paths)
+    return {path: props is not None for path, props in properties.items()}
+
+async def delete_blobs(blob_paths: list[str]):
+    """Deletes blobs (and their snapshots); already-missing blobs are ignored."""
+    container = await get_container_client()
+
+    async def _one(path):
+        try:
+            await container.delete_blob(path, delete_snapshots="include")
+            logger.info(f"🗑️ Deleted blob {path}")
+        except ResourceNotFoundError:
+            pass
+
+    await asyncio.gather(*(_one(p) for p in blob_paths if p))
@@ -1,4 +1,5 @@
 # app/core/config.py
+import os
 from pydantic_settings import BaseSettings
 from urllib.parse import quote_plus
 
@@ -23,6 +24,47 @@ class Settings(BaseSettings):
     # --- AZURE STORAGE ---
     AZURE_STORAGE_CONNECTION_STRING: str = ""
     AZURE_CONTAINER_NAME: str = "pdf-repository"
+    SAS_READ_EXPIRY_HOURS: int = 24
+    SAS_READ_MIN_REMAINING_HOURS: int = 12   # Re-sign cached read URLs below this
+    SAS_EXPIRY_BUCKET_MINUTES: int = 60      # Expiries are rounded up to this grid
+    SAS_URL_CACHE_SIZE: int = 20000
+    # Directory-scoped SAS (sr=d) needs a hierarchical-namespace account
+    AZURE_STORAGE_HNS_ENABLED: bool = False
+    # Resumable uploads (Put Block / Put Block List)
+    UPLOAD_BLOCK_SIZE_BYTES: int = 512 * 1024   # Small blocks: cheap to retry over VSAT
+    MAX_RESUMABLE_UPLOAD_MB: int = 100
+    UPLOAD_SESSION_TTL_HOURS: int = 72          # Azure drops uncommitted blocks after 7 days
+    # Image derivatives (thumbnail / preview, WebP)
+    IMAGE_WORKER_PROCESSES: int = 2
+    IMAGE_THUMBNAIL_SIZE: int = 256
+    IMAGE_THUMBNAIL_QUALITY: int = 70
+    IMAGE_PREVIEW_SIZE: int = 1280
+    IMAGE_PREVIEW_QUALITY: int = 80
+    IMAGE_MAX_SOURCE_MB: int = 50
+    # Thread pagination
+    THREAD_PAGE_SIZE: int = 50
+    THREAD_PAGE_MAX: int = 200
+
+    # Offline sync (POST /defects/threads/batch)
+    THREAD_SYNC_MAX_THREADS: int = 500
+    THREAD_SYNC_MAX_ATTACHMENTS: int = 2000
+
+    # PDF defect reports
+    REPORT_WORKER_PROCESSES: int = os.cpu_count() or 2
+    REPORT_DEFECTS_PER_PART: int = 25
+    REPORT_MAX_DEFECTS: int = 5000
+
+    # Bulk user / vessel import (POST /users/import, externalwork/import_fleet.py)
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 2
+    BULK_IMPORT_MAX_ROWS: int = 20000
+    BULK_IMPORT_MAX_MB: int = 10
+
+    # Streaming ZIP export
+    ZIP_DOWNLOAD_CONCURRENCY: int = 4
+    ZIP_PREFETCH_CHUNKS: int = 2  # Per download, each up to ZIP_CHUNK_BYTES
+    ZIP_CHUNK_BYTES: int = 4 * 1024 * 1024  # Per GET, first request included
+    BLOB_MAX_CONNECTIONS: int = 100   # aiohttp pool shared by all blob calls
+    BLOB_MAX_CONCURRENCY: int = 16    # Parallel blob calls per batch operation
 
     # --- EMAIL ---
     MAIL_USERNAME: str
@@ -31,7 +73,65 @@ class Settings(BaseSettings):
     MAIL_PORT: int
     MAIL_SERVER: str
     MAIL_FROM_NAME: str = "Maritime DRS"
-    
+    MAIL_TRANSPORT: str = "graph"   # "graph" (Microsoft Graph) or "smtp" (MAIL_SERVER)
+    MAIL_STARTTLS: bool | None = None   # None: STARTTLS if the server offers it (plain relays on :25 work)
+    MAIL_USE_TLS: bool = False      # Implicit TLS (port 465)
+    SMTP_POOL_SIZE: int = 4
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+
+    # --- MICROSOFT GRAPH ---
+    GRAPH_BASE_URL: str = "https://graph.microsoft.com/v1.0"
+    GRAPH_MAX_CONCURRENCY: int = 4   # Exchange allows ~4 concurrent requests per mailbox
+    GRAPH_MAX_RETRIES: int = 5
+    GRAPH_TIMEOUT_SECONDS: float = 30.0
+
+    # --- EMAIL OUTBOX ---
+    EMAIL_WORKER_EMBEDDED: bool = True   # Run the outbox worker inside the API process
+    EMAIL_WORKER_CONCURRENCY: int = 8
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50
+    EMAIL_OUTBOX_POLL_SECONDS: float = 2.0
+    EMAIL_OUTBOX_LEASE_SECONDS: int = 300   # Renewed every lease/3 while a batch is being sent
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+
+    # --- EMAIL DIGEST ---
+    # Default digest interval (minutes) per role, e.g. {"SHORE": 60}.
+    # Users can override it; CRITICAL defects always go out immediately.
+    EMAIL_DIGEST_ROLE_MINUTES: dict[str, int] = {}
+    EMAIL_DIGEST_FLUSH_SECONDS: float = 60.0
+    EMAIL_DIGEST_MAX_RECIPIENTS_PER_FLUSH: int = 100
+    EMAIL_DIGEST_MAX_ATTEMPTS: int = 8   # Failed digests back off like outbox rows, then give up
+
+    # --- RECIPIENT CACHE ---
+    # Upper bound on staleness for changes made in another process
+    RECIPIENT_CACHE_TTL_SECONDS: int = 300
+
+    # --- FLEET REGISTRY (vessels + rosters) ---
+    FLEET_CACHE_TTL_SECONDS: int = 300
+    # Browser freshness for /vessels responses; 0 = always revalidate (cheap 304s)
+    FLEET_HTTP_MAX_AGE_SECONDS: int = 0
+    # @mention picker (GET /defects/{id}/mentionable)
+    MENTION_RESULTS_DEFAULT: int = 20
+    MENTION_RESULTS_MAX: int = 50
+    MENTION_DEFECT_CACHE_SIZE: int = 10000
+
+    # --- LOGGING ---
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"          # "json" (one object per line) or "text"
+    # Per-logger levels, e.g. {"app.core.blob_storage": "DEBUG", "sqlalchemy.engine": "INFO"}
+    LOG_LEVELS: dict[str, str] = {"sqlalchemy.engine": "WARNING", "azure": "WARNING", "httpx": "WARNING", "uvicorn.access": "WARNING"}
+    # Fraction of DEBUG/INFO records kept per logger prefix, e.g. {"app.api.v1.endpoints.attachments": 0.1}.
+    # WARNING and above are never sampled.
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    LOG_QUEUE_SIZE: int = 10000       # Records beyond this are dropped (and counted), never block
+    LOG_REQUESTS: bool = True         # One line per request with status + duration
+    SQL_ECHO: bool = False
+    METRICS_ENABLED: bool = True      # Prometheus scrape endpoint at GET /metrics
+
+    # --- NOTIFICATIONS ---
+    # Alerts for the same (user, defect) inside this window are merged into
+    # one row with an event count. 0 disables coalescing.
+    NOTIFICATION_COALESCE_WINDOW_SECONDS: int = 0
+
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         """
@@ -1,12 +1,15 @@
 # app/core/database.py
+import logging
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 # 1. Create the Async Engine
 engine = create_async_engine(
     settings.SQLALCHEMY_DATABASE_URI,
-    echo=True, 
+    echo=settings.SQL_ECHO,  # Logs via "sqlalchemy.engine" (see LOG_LEVELS) when on
     future=True
 )
 
@@ -43,7 +46,8 @@ async def init_models():
         from app.models.vessel import Vessel
         from app.models.user import User
         from app.models.defect import Defect
+        from app.models.outbox import EmailOutbox, EmailDigestEntry
         
         # Create all tables
         await conn.run_sync(Base.metadata.create_all)
-        print("✅ DRS Database Tables Created Successfully (No Comments Table)!")
\ No newline at end of file
+        logger.info("✅ DRS Database Tables Created Successfully (No Comments Table)!")
\ No newline at end of file
@@ -0,0 +1,197 @@
+# app/core/metrics.py
+"""
+Prometheus metrics (GET /metrics).
+
+Metrics are per process: with several uvicorn workers, scrape each one
+or run prometheus_client in multiprocess mode. Label sets are small and
+fixed (route templates, not raw paths) so series don't explode.
+"""
+import functools
+import logging
+import time
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# --- 1. HTTP ---
+HTTP_REQUESTS = Counter(
+    "drs_http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "drs_http_request_duration_seconds", "Time to the last response byte (background tasks excluded)",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+HTTP_IN_PROGRESS = Gauge("drs_http_requests_in_progress", "Requests currently being handled")
+
+# --- 2. DATABASE ---
+DB_STATEMENTS = Counter("drs_db_statements_total", "SQL statements executed", ["verb"])
+
+# --- 3. BACKGROUND WORK ---
+BACKGROUND_IN_PROGRESS = Gauge("drs_background_tasks_in_progress", "Background tasks running", ["task"])
+BACKGROUND_SECONDS = Histogram(
+    "drs_background_task_duration_seconds", "Background task duration", ["task"],
+    buckets=(0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+BACKGROUND_FAILURES = Counter("drs_background_task_failures_total", "Background tasks that raised", ["task"])
+
+# --- 4. EMAIL / SAS / NOTIFICATIONS ---
+EMAIL_SEND_SECONDS = Histogram(
+    "drs_email_send_duration_seconds", "Email send latency (single mail or whole batch)", ["transport", "mode"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+EMAILS = Counter("drs_emails_total", "Emails handed to the transport", ["transport", "result"])
+SAS_ISSUED = Counter("drs_sas_issued_total", "SAS tokens issued", ["kind", "cache"])
+NOTIFICATION_FANOUT = Histogram(
+    "drs_notification_fanout_size", "Recipients per notification event", ["kind"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+)
+
+# Pre-bound children: the hot paths skip the label lookup entirely
+SAS_READ_HIT = SAS_ISSUED.labels(kind="read", cache="hit")
+SAS_READ_MISS = SAS_ISSUED.labels(kind="read", cache="miss")
+SAS_WRITE = SAS_ISSUED.labels(kind="write", cache="none")
+SAS_DIRECTORY = SAS_ISSUED.labels(kind="directory", cache="none")
+
+
+def route_label(scope) -> str:
+    """Route template ("/api/v1/defects/{defect_id}") or "unmatched" (404s, CORS preflight)."""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "unmatched"
+    path = scope["path"]
+    if route.path_regex.match(path):
+        return template
+    # Routers nested without flattening only know their own suffix: put the static prefix back
+    try:
+        suffix = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    return path[:-len(suffix)] + template if suffix and path.endswith(suffix) else template
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: one counter + one histogram observation per request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status_code = 500
+        finished = False
+
+        def record():
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            method = scope["method"]
+            route = route_label(scope)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+            HTTP_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()  # Background tasks run after this point and are not billed to the route
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            record()
+
+
+def track_background(task_name: str):
+    """Decorator for async functions run as BackgroundTasks / fire-and-forget work."""
+    in_progress = BACKGROUND_IN_PROGRESS.labels(task_name)
+    seconds = BACKGROUND_SECONDS.labels(task_name)
+    failures = BACKGROUND_FAILURES.labels(task_name)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            in_progress.inc()
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                failures.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - started)
+                in_progress.dec()
+        return wrapper
+    return decorator
+
+
+# --- 5. COLLECTORS (read at scrape time, zero cost per request) ---
+def instrument_engine(engine):
+    """Counts statements by verb and exposes pool gauges for an AsyncEngine."""
+    sync_engine = engine.sync_engine
+    children = {}
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip()[:6].upper()
+        counter = children.get(verb)
+        if counter is None:
+            counter = children[verb] = DB_STATEMENTS.labels(verb if verb.isalpha() else "OTHER")
+        counter.inc()
+
+    REGISTRY.register(_PoolCollector(sync_engine.pool))
+
+
+class _PoolCollector:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def collect(self):
+        pool = self.pool
+        for name, read in (
+            ("size", getattr(pool, "size", None)),
+            ("checked_out", getattr(pool, "checkedout", None)),
+            ("checked_in", getattr(pool, "checkedin", None)),
+            ("overflow", getattr(pool, "overflow", None)),
+        ):
+            if read is not None:
+                yield GaugeMetricFamily(f"drs_db_pool_{name}", f"SQLAlchemy pool {name.replace('_', ' ')}", value=read())
+
+
+class _StatsCollector:
+    """Exports existing stats() dicts: drs_<source>_<key> gauges for every numeric value."""
+
+    def __init__(self):
+        self.sources: dict[str, Callable[[], dict]] = {}
+
+    def collect(self):
+        for source, stats in list(self.sources.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"⚠️ Metrics source '{source}' failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):  # bools count as 0/1
+                    yield GaugeMetricFamily(f"drs_{source}_{key}", f"{source} stats(): {key}", value=float(value))
+
+
+_stats_collector = _StatsCollector()
+REGISTRY.register(_stats_collector)
+
+def register_stats_source(name: str, stats: Callable[[], dict]):
+    _stats_collector.sources[name] = stats
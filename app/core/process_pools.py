@@ -0,0 +1,29 @@
+# app/core/process_pools.py
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_pools: dict[str, ProcessPoolExecutor] = {}
+
+def get_process_pool(name: str, max_workers: int) -> ProcessPoolExecutor:
+    """
+    Lazily created, named process pools for CPU-bound work (images,
+    PDF rendering) so it never blocks the event loop. Workers are
+    spawned, never forked from the running loop / DB pool.
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        _pools[name] = pool
+        logger.info(f"⚙️ Process pool '{name}' started ({max_workers} workers)")
+    return pool
+
+def shutdown_process_pools():
+    for name, pool in list(_pools.items()):
+        pool.shutdown(wait=False, cancel_futures=True)
+    _pools.clear()
@@ -15,6 +15,10 @@ def get_password_hash(password: str) -> str:
     """Encrypts the password before saving to DB."""
     return pwd_context.hash(password)
 
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Batch of hashes in one call; runs in the "passwords" process pool."""
+    return [pwd_context.hash(p) for p in passwords]
+
 def create_access_token(subject: Union[str, Any]) -> str:
     """Generates the JWT Token string."""
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -1,15 +1,53 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.database import init_models
+from app.core.config import settings
+from app.core.database import init_models, engine
+from app.core.blob_storage import get_sas_signer, init_blob_client, close_blob_client
 from app.api.v1.api import api_router 
+from app.services.email_service import token_provider, graph_client, mail_transport
+from app.services.email_outbox import OutboxWorker
+from app.core.process_pools import shutdown_process_pools
+from app.core.log_config import setup_logging, shutdown_logging, logging_stats, RequestContextMiddleware
+from app.core.metrics import MetricsMiddleware, instrument_engine, register_stats_source
+from app.services.recipient_directory import recipient_directory
+from app.services.fleet_registry import fleet_registry
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("🚀 Starting Maritime DRS Backend...")
+    logger.info("🚀 Starting Maritime DRS Backend...")
     await init_models()
+
+    try:
+        get_sas_signer()
+        await init_blob_client()
+    except ValueError as e:
+        logger.warning(f"⚠️ Blob storage not configured: {e}")
+
+    outbox_worker = None
+    worker_task = None
+    if settings.EMAIL_WORKER_EMBEDDED:
+        outbox_worker = OutboxWorker()
+        worker_task = asyncio.create_task(outbox_worker.run())
+
     yield
 
+    if outbox_worker:
+        outbox_worker.stop()
+        await worker_task
+    shutdown_process_pools()
+    await close_blob_client()
+    await mail_transport.aclose()
+    await graph_client.aclose()
+    await token_provider.aclose()
+    shutdown_logging()
+
 app = FastAPI(title="Maritime DRS API", lifespan=lifespan)
 
 # ✅ FIXED: Enhanced CORS Configuration
@@ -28,12 +66,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"]  # ✅ Added to expose response headers
+    expose_headers=["*", "X-Older-Cursor", "X-Newer-Cursor", "ETag", "X-Request-ID"]  # ✅ Named too: "*" is ignored with credentials
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Outermost: every log line of a request (CORS included) carries its X-Request-ID
+app.add_middleware(RequestContextMiddleware)
 
 # Register Routes
 app.include_router(api_router, prefix="/api/v1")
 
+# --- METRICS ---
+def _sas_stats() -> dict:
+    try:
+        signer = get_sas_signer()
+    except ValueError:
+        return {}
+    return {"read_cache_hits": signer.read_cache_hits, "read_cache_misses": signer.read_cache_misses}
+
+if settings.METRICS_ENABLED:
+    instrument_engine(engine)
+    # Existing in-process counters, read only when Prometheus scrapes
+    register_stats_source("recipients", recipient_directory.stats)
+    register_stats_source("fleet", fleet_registry.stats)
+    register_stats_source("mail", mail_transport.stats)
+    register_stats_source("graph_token", token_provider.stats)
+    register_stats_source("sas", _sas_stats)
+    register_stats_source("logging", logging_stats)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root():
     return {"message": "Maritime DRS API is Online 🟢"}
\ No newline at end of file
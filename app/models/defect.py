@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Integer, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum, ARRAY
+from sqlalchemy import Column, String, Integer, Text, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum, ARRAY
 from sqlalchemy.dialects.postgresql import ENUM  # ✅ Add this import
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -49,6 +49,8 @@ class Defect(Base):
     # ✅ NEW: Before/After images uploaded during creation or update
     before_image_path = Column(String, nullable=True)
     after_image_path = Column(String, nullable=True)
+    # ✅ NEW: Rendered WebP derivatives per image path: {blob_path: {"thumb": ..., "preview": ...}}
+    image_derivatives = Column(JSONB, nullable=True)
     
     # Dates
     date_identified = Column(DateTime(timezone=True), nullable=True)
@@ -100,6 +102,11 @@ class Thread(Base):
     user = relationship("User", foreign_keys=[user_id])
     attachments = relationship("Attachment", back_populates="thread", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination: WHERE defect_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        Index("ix_threads_defect_created", "defect_id", "created_at", "id"),
+    )
+
 
 class Attachment(Base):
     __tablename__ = "attachments"
@@ -110,11 +117,53 @@ class Attachment(Base):
     file_size = Column(Integer, nullable=True)
     content_type = Column(String, nullable=True)
     blob_path = Column(String, nullable=False)
+    # ✅ NEW: Content hash when stored content-addressed (cas/...), shared with duplicates
+    content_sha256 = Column(String(64), ForeignKey("blob_contents.sha256"), nullable=True, index=True)
+    # ✅ NEW: WebP derivatives (set by the image pipeline, EXIF stripped)
+    thumbnail_path = Column(String, nullable=True)
+    preview_path = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     thread = relationship("Thread", back_populates="attachments")
 
 
+# ✅ NEW MODEL: Content-addressed blobs (one per unique SHA-256)
+class BlobContent(Base):
+    __tablename__ = "blob_contents"
+    
+    sha256 = Column(String(64), primary_key=True)
+    blob_path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=1)  # Attachments pointing here
+    verified = Column(Boolean, nullable=False, default=False)  # Hash re-computed server-side
+    hash_mismatch = Column(Boolean, nullable=False, default=False, server_default="false")  # Stored bytes don't match
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ✅ NEW MODEL: Resumable (block) uploads
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    attachment_id = Column(UUID(as_uuid=True), nullable=False, unique=True)  # Id the Attachment row gets on finalize
+    thread_id = Column(UUID(as_uuid=True), ForeignKey("threads.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    
+    file_name = Column(String, nullable=False)
+    file_size = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    content_sha256 = Column(String(64), nullable=True)
+    blob_path = Column(String, nullable=False)
+    block_size = Column(Integer, nullable=False)
+    block_count = Column(Integer, nullable=False)
+    
+    status = Column(String, nullable=False, default="OPEN")  # OPEN / COMMITTED
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    committed_at = Column(DateTime(timezone=True), nullable=True)
+
+
 # ✅ NEW MODEL: PR Entries
 class PrEntry(Base):
     __tablename__ = "pr_entries"
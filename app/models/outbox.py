@@ -0,0 +1,66 @@
+import uuid
+import enum
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Text, DateTime, Enum, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.core.database import Base
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "PENDING"    # Waiting for a worker
+    SENDING = "SENDING"    # Claimed by a worker (lease in locked_at)
+    SENT = "SENT"
+    FAILED = "FAILED"      # Gave up after EMAIL_OUTBOX_MAX_ATTEMPTS, or delivery unknown
+
+class EmailOutbox(Base):
+    """
+    Transactional outbox for defect emails. Rows are written in the same
+    transaction as the defect change and delivered by the email worker.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String, nullable=False)  # CREATED / UPDATED / CLOSED / REMOVED
+    payload = Column(JSONB, nullable=False)      # Output of prepare_email_data()
+
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class EmailDigestEntry(Base):
+    """
+    One defect event held back for a recipient in digest mode. Pending
+    entries for a recipient are rendered into a single summary email once
+    the earliest due_at has passed.
+    """
+    __tablename__ = "email_digest_entries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    recipient = Column(String, nullable=False)
+    event_id = Column(UUID(as_uuid=True), nullable=True)  # Outbox row, for idempotent retries
+    event_type = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    due_at = Column(DateTime, nullable=False)         # Pushed back after a failed send
+    sent_at = Column(DateTime, nullable=True)
+
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime, nullable=True)       # Gave up after EMAIL_DIGEST_MAX_ATTEMPTS
+
+    __table_args__ = (
+        Index(
+            "ix_email_digest_pending", "recipient", "due_at",
+            postgresql_where=(sent_at.is_(None) & failed_at.is_(None))
+        ),
+        Index("uq_email_digest_event_recipient", "event_id", "recipient", unique=True),
+    )
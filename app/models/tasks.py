@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 import enum
@@ -47,4 +47,18 @@ class Notification(Base):
     
     is_read = Column(Boolean, default=False)
     is_seen = Column(Boolean, default=False) # Removes from badge (NEW)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Coalescing: repeated alerts for the same (user, defect) inside one
+    # window are merged into a single row instead of inserting a new one.
+    defect_id = Column(UUID(as_uuid=True), ForeignKey("defects.id", ondelete="CASCADE"), nullable=True)
+    event_count = Column(Integer, default=1, nullable=False, server_default="1")
+    coalesce_bucket = Column(Integer, nullable=True) # NULL = never coalesced
+
+    __table_args__ = (
+        Index(
+            "uq_notifications_coalesce",
+            "user_id", "defect_id", "coalesce_bucket",
+            unique=True
+        ),
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -20,6 +20,8 @@ class User(Base):
     role = Column(String, default=UserRole.VESSEL, nullable=False)
     
     is_active = Column(Boolean, default=True)
+    # Email digest interval in minutes: NULL = role default, 0 = every event
+    email_digest_minutes = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # RELATIONS
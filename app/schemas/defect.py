@@ -12,6 +12,11 @@ class VesselUserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# ✅ NEW: @mention picker entry (vessel crew first, then shore staff)
+class MentionableUserResponse(VesselUserResponse):
+    role: Optional[str] = None
+    on_vessel: bool = True
+
 # ✅ NEW: PR Entry Schemas
 class PrEntryCreate(BaseModel):
     defect_id: UUID
@@ -95,6 +100,9 @@ class DefectResponse(BaseModel):
     closure_image_after: Optional[str] = None
     
     # ❌ REMOVED: ships_remarks, office_support_required, pr_number, pr_status
+
+    # ✅ NEW: Thumbnail URL per image field, the original if none was rendered (set by sign_defects)
+    image_thumbnails: dict[str, str] = {}
     
     class Config:
         from_attributes = True
@@ -124,9 +132,15 @@ class AttachmentBase(BaseModel):
     blob_path: str
     file_size: Optional[int] = None
     content_type: Optional[str] = None
+    content_sha256: Optional[str] = None  # Set for content-addressed (cas/...) uploads
 
 class AttachmentResponse(AttachmentBase):
     created_at: datetime
+    thumbnail_path: Optional[str] = None
+    preview_path: Optional[str] = None
+    thumbnail_url: Optional[str] = None  # Set by sign_attachments
+    preview_url: Optional[str] = None
+
     class Config:
         from_attributes = True
 
@@ -150,4 +164,40 @@ class ThreadResponse(BaseModel):
 
     class Config:
         from_attributes = True
-        populate_by_name = True
\ No newline at end of file
+        populate_by_name = True
+
+# ✅ NEW: Everything the defect screen needs in one response
+class DefectDetailResponse(BaseModel):
+    defect: DefectResponse
+    threads: List[ThreadResponse] = []         # Latest page, oldest first
+    older_cursor: Optional[UUID] = None        # before= for /{id}/threads
+    vessel_users: List[VesselUserResponse] = []  # Mentionable roster
+    signed_urls: dict[str, str] = {}           # blob_path -> read URL (defect images + attachments)
+
+# ✅ NEW: Offline sync (many threads + attachments in one request)
+class AttachmentSyncItem(BaseModel):
+    id: UUID
+    file_name: str
+    blob_path: str
+    file_size: Optional[int] = None
+    content_type: Optional[str] = None
+    content_sha256: Optional[str] = None
+
+class ThreadSyncItem(ThreadCreate):
+    attachments: List[AttachmentSyncItem] = []
+
+class ThreadSyncRequest(BaseModel):
+    threads: List[ThreadSyncItem]
+
+class SyncItemResult(BaseModel):
+    id: UUID
+    status: str                  # created / existing / rejected / conflict
+    error: Optional[str] = None
+
+class ThreadSyncResult(SyncItemResult):
+    attachments: List[SyncItemResult] = []
+
+class ThreadSyncResponse(BaseModel):
+    results: List[ThreadSyncResult]
+    created_threads: int
+    created_attachments: int
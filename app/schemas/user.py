@@ -1,7 +1,9 @@
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
 from uuid import UUID
 from uuid import UUID
+from datetime import datetime
+from app.models.enums import UserRole
 
 
 # Shared properties
@@ -11,6 +13,7 @@ class UserBase(BaseModel):
     job_title: Optional[str] = None
     role: str = "VESSEL"
     is_active: Optional[bool] = True
+    email_digest_minutes: Optional[int] = None # None = role default, 0 = every event
 
 # Properties to receive via API on creation
 class UserCreate(UserBase):
@@ -23,4 +26,64 @@ class UserResponse(UserBase):
     assigned_vessel_imos: List[str] = [] # The API returns this list now
 
     class Config:
-        from_attributes = True # updated from 'orm_mode' in Pydantic v2
\ No newline at end of file
+        from_attributes = True # updated from 'orm_mode' in Pydantic v2
+
+class EmailDigestPreference(BaseModel):
+    email_digest_minutes: Optional[int] = None
+
+# ✅ NEW: Bell notifications (coalesced rows carry how many events they merged)
+class NotificationResponse(BaseModel):
+    id: UUID
+    user_id: Optional[UUID] = None
+    type: Optional[str] = None
+    title: str
+    message: str
+    link: Optional[str] = None
+    is_read: bool = False
+    is_seen: bool = False
+    created_at: Optional[datetime] = None
+    defect_id: Optional[UUID] = None
+    event_count: int = 1   # > 1: "N updates" merged into this row
+
+    class Config:
+        from_attributes = True
+
+# ✅ NEW: Bulk import (CSV / JSON)
+class UserImportRow(UserBase):
+    password: Optional[str] = None
+    password_hash: Optional[str] = None  # Pre-hashed bcrypt, e.g. migrated accounts
+    assigned_vessel_imos: List[str] = []
+
+    @field_validator("role")
+    @classmethod
+    def check_role(cls, v):
+        v = (v or "").strip().upper()
+        if v not in {r.value for r in UserRole}:
+            raise ValueError(f"role must be one of {', '.join(r.value for r in UserRole)}")
+        return v
+
+    @model_validator(mode="after")
+    def check_password(self):
+        if not self.password and not self.password_hash:
+            raise ValueError("password or password_hash is required")
+        if self.password_hash and not self.password_hash.startswith(("$2a$", "$2b$", "$2y$")):
+            raise ValueError("password_hash must be a bcrypt hash")
+        return self
+
+class ImportRowResult(BaseModel):
+    kind: str                # user / vessel
+    row: int                 # CSV line (header = 1) or 1-based JSON index
+    key: Optional[str] = None  # email / IMO
+    status: str              # created / exists / valid / error
+    error: Optional[str] = None
+
+class ImportReport(BaseModel):
+    dry_run: bool
+    imported: bool
+    vessels_created: int = 0
+    users_created: int = 0
+    assignments_created: int = 0
+    errors: int = 0
+    elapsed_seconds: float = 0.0
+    rows: List[ImportRowResult] = []
+
@@ -0,0 +1,130 @@
+# app/services/attachment_zip.py
+import asyncio
+import io
+import logging
+import posixpath
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.core.blob_storage import get_streaming_container_client
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable file for zipfile: collects what was written
+    since the last drain(). zipfile then emits data descriptors instead of
+    seeking back, so the archive can be streamed as it is produced.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def safe_arcname(name: str) -> str:
+    """Flat, traversal-free file name for use inside the archive."""
+    name = posixpath.basename((name or "").replace("\\", "/")).strip()
+    return name or "file"
+
+def unique_arcnames(entries: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Appends (2), (3)... to repeated archive names, keeping the extension."""
+    seen: dict[str, int] = {}
+    result = []
+    for arcname, blob_path in entries:
+        count = seen.get(arcname, 0)
+        seen[arcname] = count + 1
+        if count:
+            stem, ext = posixpath.splitext(arcname)
+            arcname = f"{stem} ({count + 1}){ext}"
+        result.append((arcname, blob_path))
+    return result
+
+
+async def _download(blob_path: str, queue: asyncio.Queue, semaphore: asyncio.Semaphore):
+    """Streams one blob into a bounded queue: (size, chunk..., _DONE) or an exception."""
+    async with semaphore:
+        try:
+            container = await get_streaming_container_client()
+            downloader = await container.get_blob_client(blob_path).download_blob()
+            await queue.put(downloader.size)
+            async for chunk in downloader.chunks():
+                await queue.put(chunk)
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+
+
+async def stream_zip(entries: list[tuple[str, str]]) -> AsyncIterator[bytes]:
+    """
+    Yields a ZIP of (arcname, blob_path) entries as it is built.
+
+    Up to ZIP_DOWNLOAD_CONCURRENCY blobs download at once, each into a
+    queue of ZIP_PREFETCH_CHUNKS chunks of ZIP_CHUNK_BYTES, and are written
+    out in order. Memory is bounded by those settings, not by file or
+    archive size.
+    Entries are STORED (photos/PDFs are already compressed). Blobs that
+    cannot be read are listed in MISSING.txt at the end of the archive.
+    """
+    semaphore = asyncio.Semaphore(settings.ZIP_DOWNLOAD_CONCURRENCY)
+    queues = [asyncio.Queue(maxsize=settings.ZIP_PREFETCH_CHUNKS) for _ in entries]
+    tasks = [
+        asyncio.create_task(_download(blob_path, queue, semaphore))
+        for (_, blob_path), queue in zip(entries, queues)
+    ]
+
+    sink = _ChunkSink()
+    missing: list[str] = []
+    total_bytes = 0
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for (arcname, blob_path), queue in zip(entries, queues):
+                first = await queue.get()
+                if isinstance(first, Exception):
+                    logger.warning(f"⚠️ Skipping {blob_path} in ZIP: {first}")
+                    missing.append(f"{arcname}\t{blob_path}\t{first.__class__.__name__}")
+                    continue
+
+                info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+                info.file_size = first  # Lets zipfile pick ZIP64 up front for >4GB entries
+                with archive.open(info, "w") as dest:
+                    while True:
+                        item = await queue.get()
+                        if item is _DONE:
+                            break
+                        if isinstance(item, Exception):
+                            # Headers are already sent: truncate this entry and note it
+                            logger.warning(f"⚠️ Download of {blob_path} failed mid-stream: {item}")
+                            missing.append(f"{arcname}\t{blob_path}\tincomplete")
+                            break
+                        dest.write(item)
+                        total_bytes += len(item)
+                        yield sink.drain()
+                yield sink.drain()
+
+            if missing:
+                archive.writestr("MISSING.txt", "file\tblob_path\treason\n" + "\n".join(missing) + "\n")
+        # Central directory is written on close
+        yield sink.drain()
+        logger.info(f"📦 ZIP streamed: {len(entries) - len(missing)}/{len(entries)} files, {total_bytes // 1024}KB")
+    finally:
+        # Client went away (or we are done): stop any prefetching downloads
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,179 @@
+# app/services/blob_dedup.py
+import hashlib
+import logging
+import re
+from sqlalchemy import update, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.database import SessionLocal
+from app.core.metrics import track_background
+from app.core.blob_storage import get_container_client, delete_blobs
+from app.models.defect import Attachment, BlobContent
+from app.services.image_derivatives import derived_blob_path, VARIANTS
+
+logger = logging.getLogger(__name__)
+
+SHA256_REGEX = re.compile(r'^[0-9a-f]{64}$')
+CAS_PREFIX = "cas/"
+
+class ContentPathMismatch(ValueError):
+    """The hash is registered at another blob path (or a cas/ path lacks its hash)."""
+
+def normalize_sha256(value: str) -> str:
+    sha = (value or "").strip().lower()
+    if not SHA256_REGEX.match(sha):
+        raise ValueError("content_sha256 must be 64 hex characters")
+    return sha
+
+def cas_blob_path(sha256: str, file_name: str) -> str:
+    """
+    Content-addressed path: cas/ab/abcdef...<ext>. The extension is kept
+    only so content-type sniffing / image detection keep working.
+    """
+    dot = file_name.rfind(".")
+    ext = file_name[dot:].lower() if dot != -1 and len(file_name) - dot <= 6 else ""
+    return f"{CAS_PREFIX}{sha256[:2]}/{sha256}{ext}"
+
+def is_cas_path(blob_path: str | None) -> bool:
+    return bool(blob_path) and blob_path.startswith(CAS_PREFIX)
+
+# --- 1. LOOKUP / REFERENCES (inside the caller's transaction) ---
+async def find_verified_content(db: AsyncSession, sha256: str, size: int) -> BlobContent | None:
+    """
+    A verified blob with this hash and size, row-locked so a concurrent
+    purge cannot remove it before our reference is counted.
+    """
+    stmt = (
+        select(BlobContent)
+        .where(BlobContent.sha256 == sha256, BlobContent.size == size, BlobContent.verified == True)
+        .with_for_update()
+    )
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+async def add_reference(db: AsyncSession, sha256: str, blob_path: str, size: int, content_type: str | None):
+    """
+    Registers the content on first sight, otherwise bumps its ref_count.
+    Raises ContentPathMismatch (counting nothing) when the hash is already
+    registered at a different blob path.
+    """
+    stmt = pg_insert(BlobContent).values(
+        sha256=sha256,
+        blob_path=blob_path,
+        size=size,
+        content_type=content_type,
+        ref_count=1,
+        verified=False
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BlobContent.sha256],
+        set_={"ref_count": BlobContent.ref_count + 1},
+        where=(BlobContent.blob_path == stmt.excluded.blob_path)
+    ).returning(BlobContent.sha256)
+    result = await db.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        raise ContentPathMismatch(f"content {sha256[:12]} is stored at a different blob path")
+
+async def attach_content(
+    db: AsyncSession, sha256: str | None, blob_path: str, size: int | None, content_type: str | None
+) -> str | None:
+    """
+    Reference counting for a new attachment; returns the content_sha256
+    to store on it. Shared cas/ blobs must carry their own hash (else
+    ContentPathMismatch). A private blob whose hash is registered at
+    another path is kept out of the dedup index (None): it stays owned by
+    its attachment and is deleted with it.
+    """
+    if is_cas_path(blob_path) and (not sha256 or not blob_path.startswith(cas_blob_path(sha256, ""))):
+        raise ContentPathMismatch("cas/ blob paths must match their content_sha256")
+    if not sha256:
+        return None
+    try:
+        await add_reference(db, sha256, blob_path, size, content_type)
+        return sha256
+    except ContentPathMismatch:
+        if is_cas_path(blob_path):
+            raise
+        logger.info(f"ℹ️ Content {sha256[:12]} already registered elsewhere, {blob_path} kept unshared")
+        return None
+
+async def release_reference(db: AsyncSession, sha256: str) -> int | None:
+    """Drops one reference; returns the remaining count (None if unknown hash)."""
+    stmt = (
+        update(BlobContent)
+        .where(BlobContent.sha256 == sha256)
+        .values(ref_count=BlobContent.ref_count - 1)
+        .returning(BlobContent.ref_count)
+    )
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+async def copy_derivatives(db: AsyncSession, attachment: Attachment):
+    """A duplicate inherits thumbnails already rendered for the same content."""
+    stmt = select(Attachment.thumbnail_path, Attachment.preview_path).where(
+        Attachment.content_sha256 == attachment.content_sha256,
+        Attachment.blob_path == attachment.blob_path,
+        Attachment.thumbnail_path.isnot(None)
+    ).limit(1)
+    row = (await db.execute(stmt)).first()
+    if row:
+        attachment.thumbnail_path, attachment.preview_path = row
+
+# --- 2. BACKGROUND TASKS ---
+@track_background("verify_content")
+async def verify_content(sha256: str):
+    """
+    Re-computes the hash from the stored blob before it may serve as a
+    dedup target, so a wrong client hash can never alias other content.
+    A mismatch only flags the row: references keep being counted so the
+    blob is purged with its last attachment, never while still in use.
+    """
+    try:
+        async with SessionLocal() as db:
+            content = await db.get(BlobContent, sha256)
+            if not content or content.verified or content.hash_mismatch:
+                return
+            blob_path = content.blob_path
+
+        container = await get_container_client()
+        digest = hashlib.sha256()
+        size = 0
+        downloader = await container.get_blob_client(blob_path).download_blob()
+        async for chunk in downloader.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+
+        async with SessionLocal() as db:
+            content = await db.get(BlobContent, sha256, with_for_update=True)
+            if not content:
+                return
+            if digest.hexdigest() == sha256:
+                content.verified = True
+                content.size = size
+                logger.info(f"✅ Verified content {sha256[:12]} ({size} bytes)")
+            else:
+                # Never a dedup target (verified stays False); ref counting carries on
+                logger.warning(f"⚠️ Hash mismatch for {blob_path}: claimed {sha256[:12]}, got {digest.hexdigest()[:12]}")
+                content.hash_mismatch = True
+            await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Content verification failed for {sha256[:12]}: {str(e)}", exc_info=True)
+
+@track_background("purge_content")
+async def purge_content(sha256: str):
+    """Deletes an unreferenced blob (and derivatives) if still unreferenced."""
+    try:
+        async with SessionLocal() as db:
+            content = await db.get(BlobContent, sha256, with_for_update=True)
+            if not content or content.ref_count > 0:
+                return
+            # Row stays locked while deleting: a concurrent dedup hit waits, then re-uploads
+            paths = [content.blob_path] + [derived_blob_path(content.blob_path, v) for v in VARIANTS]
+            await delete_blobs(paths)
+            await db.execute(delete(BlobContent).where(BlobContent.sha256 == sha256))
+            await db.commit()
+            logger.info(f"🗑️ Purged content {sha256[:12]}")
+    except Exception as e:
+        logger.error(f"❌ Content purge failed for {sha256[:12]}: {str(e)}", exc_info=True)
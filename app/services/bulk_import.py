@@ -0,0 +1,274 @@
+# app/services/bulk_import.py
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.process_pools import get_process_pool
+from app.core.security import hash_passwords
+from app.models.associations import user_vessel_link
+from app.models.user import User
+from app.models.vessel import Vessel
+from app.schemas.user import UserImportRow, ImportRowResult, ImportReport
+from app.schemas.vessel import VesselCreate
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHUNK_ROWS = 1000  # 9 columns x 1000 rows stays well under asyncpg's bind limit
+IMO_SEPARATORS = (";", "|", ",")
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be read (bad JSON, unknown CSV layout...)."""
+
+
+# --- 1. PARSING ---
+def _split_imos(value) -> list[str]:
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    text = (value or "").strip()
+    for sep in IMO_SEPARATORS:
+        text = text.replace(sep, " ")
+    return text.split()
+
+def _clean_csv_row(row: dict) -> dict:
+    # Empty cells mean "not given", so pydantic defaults apply
+    return {k.strip().lower(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+
+def parse_import_file(filename: str, content: bytes) -> tuple[list[tuple[int, dict]], list[tuple[int, dict]]]:
+    """
+    Returns ([(row, vessel dict)], [(row, user dict)]).
+
+    JSON: {"vessels": [...], "users": [...]} or a bare list of users.
+    CSV: one kind per file; a file with imo_number and no full_name column
+    is a vessel list, otherwise users (assigned_vessel_imos split on ; | ,).
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFileError(f"{filename}: file must be UTF-8")
+
+    if filename.lower().endswith(".json") or text.lstrip()[:1] in ("{", "["):
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise ImportFileError(f"{filename}: invalid JSON ({e})")
+        if isinstance(data, list):
+            data = {"users": data}
+        if not isinstance(data, dict):
+            raise ImportFileError(f"{filename}: expected an object with 'vessels' / 'users'")
+        vessels = list(enumerate(data.get("vessels") or [], 1))
+        users = list(enumerate(data.get("users") or [], 1))
+        return vessels, users
+
+    reader = csv.DictReader(io.StringIO(text))
+    columns = {c.strip().lower() for c in reader.fieldnames or []}
+    if not columns:
+        raise ImportFileError(f"{filename}: CSV has no header row")
+    rows = [(line, _clean_csv_row(row)) for line, row in enumerate(reader, 2)]
+    if "imo_number" in columns and "full_name" not in columns:
+        return rows, []
+    if "email" not in columns:
+        raise ImportFileError(f"{filename}: CSV needs 'email' + 'full_name' (users) or 'imo_number' (vessels) columns")
+    return [], rows
+
+def _validation_message(e: ValidationError) -> str:
+    parts = []
+    for err in e.errors():
+        field = ".".join(str(loc) for loc in err["loc"])
+        parts.append(f"{field}: {err['msg']}" if field else err["msg"])
+    return "; ".join(parts)
+
+
+# --- 2. HASHING (process pool) ---
+async def hash_passwords_parallel(passwords: list[str]) -> list[str]:
+    """bcrypt is deliberately slow: spread the batch over every worker."""
+    if not passwords:
+        return []
+    workers = settings.PASSWORD_HASH_WORKERS
+    pool = get_process_pool("passwords", workers)
+    loop = asyncio.get_running_loop()
+    size = max(1, -(-len(passwords) // (workers * 4)))  # ~4 chunks per worker for even finish times
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    results = await asyncio.gather(*(loop.run_in_executor(pool, hash_passwords, c) for c in chunks))
+    return [h for chunk in results for h in chunk]
+
+
+async def _insert_chunked(db: AsyncSession, table, rows: list[dict], conflict_columns, returning) -> list:
+    """Multi-row INSERT ... ON CONFLICT DO NOTHING; returns `returning` of the rows actually inserted."""
+    inserted = []
+    for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+        stmt = pg_insert(table).values(rows[i:i + INSERT_CHUNK_ROWS])\
+               .on_conflict_do_nothing(index_elements=conflict_columns)\
+               .returning(returning)
+        result = await db.execute(stmt)
+        inserted.extend(result.scalars().all())
+    return inserted
+
+
+# --- 3. IMPORT ---
+async def import_fleet(
+    db: AsyncSession,
+    vessel_rows: list[tuple[int, dict]],
+    user_rows: list[tuple[int, dict]],
+    dry_run: bool = False,
+    allow_partial: bool = False
+) -> ImportReport:
+    """
+    Validates every row first (schema, in-file duplicates, existing
+    records in one query per table, vessel references), then writes
+    vessels, users and assignments with multi-row inserts in the caller's
+    transaction. Rows that already exist are reported, not failed, so a
+    file can be re-run. Unless allow_partial, any error means nothing is
+    written. The caller commits.
+    """
+    started = time.perf_counter()
+    results: list[ImportRowResult] = []
+    vessels: list[tuple[ImportRowResult, VesselCreate]] = []
+    users: list[tuple[ImportRowResult, UserImportRow]] = []
+
+    # Schema + duplicates inside the file
+    seen_imos, seen_emails = set(), set()
+    for row, raw in vessel_rows:
+        if not isinstance(raw, dict):
+            results.append(ImportRowResult(kind="vessel", row=row, status="error", error="row must be an object"))
+            continue
+        result = ImportRowResult(kind="vessel", row=row, key=str(raw.get("imo_number") or "") or None, status="valid")
+        results.append(result)
+        try:
+            vessel = VesselCreate(**raw)
+        except (ValidationError, TypeError) as e:
+            result.status, result.error = "error", _validation_message(e) if isinstance(e, ValidationError) else str(e)
+            continue
+        if vessel.imo_number in seen_imos:
+            result.status, result.error = "error", "duplicate IMO in file"
+            continue
+        seen_imos.add(vessel.imo_number)
+        vessels.append((result, vessel))
+
+    for row, raw in user_rows:
+        if not isinstance(raw, dict):
+            results.append(ImportRowResult(kind="user", row=row, status="error", error="row must be an object"))
+            continue
+        if "assigned_vessel_imos" in raw:
+            raw = {**raw, "assigned_vessel_imos": _split_imos(raw["assigned_vessel_imos"])}
+        result = ImportRowResult(kind="user", row=row, key=str(raw.get("email") or "") or None, status="valid")
+        results.append(result)
+        try:
+            user = UserImportRow(**raw)
+        except (ValidationError, TypeError) as e:
+            result.status, result.error = "error", _validation_message(e) if isinstance(e, ValidationError) else str(e)
+            continue
+        email_key = user.email.lower()
+        if email_key in seen_emails:
+            result.status, result.error = "error", "duplicate email in file"
+            continue
+        seen_emails.add(email_key)
+        users.append((result, user))
+
+    # Existing records: one query per table
+    existing_imos = set()
+    referenced_imos = {imo for _, u in users for imo in u.assigned_vessel_imos}
+    lookup_imos = seen_imos | referenced_imos
+    if lookup_imos:
+        result = await db.execute(select(Vessel.imo).where(Vessel.imo.in_(lookup_imos)))
+        existing_imos = set(result.scalars().all())
+    existing_emails = set()
+    if seen_emails:
+        result = await db.execute(select(func.lower(User.email)).where(func.lower(User.email).in_(seen_emails)))
+        existing_emails = set(result.scalars().all())
+
+    for result, vessel in vessels:
+        if vessel.imo_number in existing_imos:
+            result.status = "exists"
+    known_imos = existing_imos | {v.imo_number for r, v in vessels if r.status == "valid"}
+    for result, user in users:
+        if user.email.lower() in existing_emails:
+            result.status = "exists"
+            continue
+        unknown = [imo for imo in user.assigned_vessel_imos if imo not in known_imos]
+        if unknown:
+            result.status, result.error = "error", f"unknown vessel IMO(s): {', '.join(unknown)}"
+
+    errors = sum(1 for r in results if r.status == "error")
+    report = ImportReport(dry_run=dry_run, imported=False, errors=errors, rows=results)
+    if dry_run or (errors and not allow_partial):
+        report.elapsed_seconds = round(time.perf_counter() - started, 2)
+        return report
+
+    # Vessels
+    now = datetime.utcnow()
+    new_vessels = [(r, v) for r, v in vessels if r.status == "valid"]
+    created_imos = set(await _insert_chunked(db, Vessel, [
+        {
+            "imo": v.imo_number,
+            "name": v.name,
+            "vessel_type": v.vessel_type,
+            "email": v.email,
+            "is_active": True,
+            "created_at": now,
+        }
+        for _, v in new_vessels
+    ], [Vessel.imo], Vessel.imo)) if new_vessels else set()
+    for result, vessel in new_vessels:
+        result.status = "created" if vessel.imo_number in created_imos else "exists"
+
+    # Users (hashing is the slow part: all cores, off the event loop)
+    new_users = [(r, u) for r, u in users if r.status == "valid"]
+    to_hash = [u.password for _, u in new_users if not u.password_hash]
+    hash_started = time.perf_counter()
+    hashes = iter(await hash_passwords_parallel(to_hash))
+    if to_hash:
+        logger.info(f"🔐 Hashed {len(to_hash)} passwords in {time.perf_counter() - hash_started:.1f}s")
+
+    user_ids = {}
+    user_values = []
+    for _, user in new_users:
+        user_id = uuid.uuid4()
+        user_ids[user.email.lower()] = user_id
+        user_values.append({
+            "id": user_id,
+            "email": user.email,
+            "password_hash": user.password_hash or next(hashes),
+            "full_name": user.full_name,
+            "job_title": user.job_title,
+            "role": user.role,
+            "is_active": user.is_active if user.is_active is not None else True,
+            "email_digest_minutes": user.email_digest_minutes,
+            "created_at": now,
+        })
+    created_ids = set(await _insert_chunked(db, User, user_values, [User.email], User.id)) if user_values else set()
+
+    link_values = []
+    for result, user in new_users:
+        user_id = user_ids[user.email.lower()]
+        if user_id not in created_ids:
+            result.status = "exists"  # Raced with another insert
+            continue
+        result.status = "created"
+        link_values += [{"user_id": user_id, "vessel_imo": imo} for imo in dict.fromkeys(user.assigned_vessel_imos)]
+    links = await _insert_chunked(
+        db, user_vessel_link, link_values,
+        [user_vessel_link.c.user_id, user_vessel_link.c.vessel_imo], user_vessel_link.c.user_id
+    ) if link_values else []
+
+    report.imported = True
+    report.vessels_created = len(created_imos)
+    report.users_created = len(created_ids)
+    report.assignments_created = len(links)
+    report.elapsed_seconds = round(time.perf_counter() - started, 2)
+    logger.info(
+        f"📥 Import: {report.vessels_created} vessels, {report.users_created} users, "
+        f"{report.assignments_created} assignments, {errors} errors in {report.elapsed_seconds}s"
+    )
+    return report
@@ -0,0 +1,225 @@
+# app/services/defect_report.py
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator
+from azure.storage.blob import ContentSettings
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.blob_storage import get_container_client
+from app.core.process_pools import get_process_pool
+from app.models.defect import Defect, Thread
+from app.models.enums import DefectStatus
+from app.services.image_derivatives import is_image, defect_derivative_path
+from app.services.report_render import render_defects_pdf, render_cover_pdf, merge_pdf_files
+
+logger = logging.getLogger(__name__)
+
+REPORT_STREAM_CHUNK = 256 * 1024
+
+
+@dataclass
+class RenderedReport:
+    """A merged report on local disk; call cleanup() once it has been sent (safe to call twice)."""
+    path: str
+    workdir: str
+    page_count: int
+    defect_count: int
+    cleaned: bool = False
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def cleanup(self):
+        if self.cleaned:
+            return
+        self.cleaned = True
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    async def read_chunks(self) -> AsyncIterator[bytes]:
+        """The file in REPORT_STREAM_CHUNK pieces, read off the event loop."""
+        f = await asyncio.to_thread(open, self.path, "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, REPORT_STREAM_CHUNK):
+                yield chunk
+        finally:
+            f.close()
+
+    async def iter_bytes(self) -> AsyncIterator[bytes]:
+        """Streams the file, then removes the working directory."""
+        try:
+            async for chunk in self.read_chunks():
+                yield chunk
+        finally:
+            self.cleanup()
+
+
+def _value(v):
+    return v.value if hasattr(v, "value") else v
+
+def _fmt(dt) -> str | None:
+    return dt.strftime("%Y-%m-%d %H:%M") if dt else None
+
+# --- 1. LOAD ---
+def _report_scope(query, vessel_imos: list[str] | None, status: DefectStatus | None):
+    query = query.where(Defect.is_deleted == False)
+    if vessel_imos is not None:
+        query = query.where(Defect.vessel_imo.in_(vessel_imos))
+    if status:
+        query = query.where(Defect.status == status)
+    return query
+
+async def count_report_defects(db: AsyncSession, vessel_imos: list[str] | None, status: DefectStatus | None) -> int:
+    """One COUNT(*), so an oversized scope is refused before anything is loaded."""
+    result = await db.execute(_report_scope(select(func.count(Defect.id)), vessel_imos, status))
+    return result.scalar_one()
+
+async def load_report_defects(db: AsyncSession, vessel_imos: list[str] | None, status: DefectStatus | None) -> list[Defect]:
+    """Every defect of the scope with PR entries and thread history in a fixed number of queries."""
+    query = _report_scope(select(Defect), vessel_imos, status)\
+            .options(
+                selectinload(Defect.vessel),
+                selectinload(Defect.pr_entries),
+                selectinload(Defect.threads).selectinload(Thread.user),
+                selectinload(Defect.threads).selectinload(Thread.attachments),
+            )\
+            .order_by(Defect.vessel_imo, Defect.created_at)
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+def _defect_thumbnail_paths(defect: Defect) -> list[tuple[str, str | None]]:
+    fields = (
+        ("Before", defect.before_image_path),
+        ("After", defect.after_image_path),
+        ("Closure (before)", defect.closure_image_before),
+        ("Closure (after)", defect.closure_image_after),
+    )
+    # Only thumbnails the pipeline recorded (None otherwise): no doomed downloads
+    return [(label, defect_derivative_path(defect, path)) for label, path in fields if is_image(path)]
+
+async def fetch_thumbnails(paths: set[str]) -> dict[str, bytes]:
+    """Downloads the (few-KB) WebP thumbnails; missing ones are just left out."""
+    container = await get_container_client()
+    semaphore = asyncio.Semaphore(settings.BLOB_MAX_CONCURRENCY)
+
+    async def _one(path):
+        async with semaphore:
+            try:
+                downloader = await container.get_blob_client(path).download_blob()
+                return path, await downloader.readall()
+            except Exception:
+                return path, None
+
+    results = await asyncio.gather(*(_one(p) for p in paths))
+    return {path: data for path, data in results if data}
+
+def serialize_defect(defect: Defect, thumbnails: dict[str, bytes]) -> dict:
+    """Plain, picklable view of a defect for the render workers."""
+    threads = []
+    for thread in sorted(defect.threads, key=lambda t: t.created_at or datetime.min):
+        images = [(a.file_name, thumbnails.get(a.thumbnail_path)) for a in thread.attachments if a.thumbnail_path]
+        files = [a.file_name for a in thread.attachments if not a.thumbnail_path]
+        threads.append({
+            "created_at": _fmt(thread.created_at),
+            "author": "System" if thread.is_system_message else (thread.user.full_name if thread.user else thread.author_role),
+            "body": thread.body,
+            "images": images,
+            "files": files,
+        })
+
+    return {
+        "vessel_imo": defect.vessel_imo,
+        "vessel_name": defect.vessel.name if defect.vessel else defect.vessel_imo,
+        "title": defect.title,
+        "equipment_name": defect.equipment_name,
+        "description": defect.description,
+        "priority": _value(defect.priority),
+        "status": _value(defect.status),
+        "defect_source": _value(defect.defect_source),
+        "responsibility": defect.responsibility,
+        "pr_status": defect.pr_status,
+        "date_identified": _fmt(defect.date_identified),
+        "target_close_date": _fmt(defect.target_close_date),
+        "closed_at": _fmt(defect.closed_at),
+        "closure_remarks": defect.closure_remarks,
+        "pr_entries": [{"pr_number": pr.pr_number, "pr_description": pr.pr_description} for pr in defect.pr_entries],
+        "images": [(label, thumbnails.get(path)) for label, path in _defect_thumbnail_paths(defect)],
+        "threads": threads,
+    }
+
+# --- 2. RENDER + MERGE (process pool) ---
+async def build_report(defects: list[Defect], title: str, include_images: bool = True) -> RenderedReport:
+    """
+    Renders the defects in parts of REPORT_DEFECTS_PER_PART on the
+    "reports" process pool (all parts in parallel) and merges them behind
+    a cover page. The result is a file in a private temp directory.
+    """
+    started = time.perf_counter()
+    thumbnails = {}
+    if include_images:
+        paths = {p for d in defects for _, p in _defect_thumbnail_paths(d) if p}
+        paths |= {a.thumbnail_path for d in defects for t in d.threads for a in t.attachments if a.thumbnail_path}
+        thumbnails = await fetch_thumbnails(paths)
+
+    payloads = [serialize_defect(d, thumbnails) for d in defects]
+    meta = {
+        "title": title,
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "defect_count": len(payloads),
+        "by_status": dict(Counter(p["status"] for p in payloads)),
+        "by_priority": dict(Counter(p["priority"] for p in payloads)),
+    }
+
+    workdir = tempfile.mkdtemp(prefix="drs_report_")
+    try:
+        pool = get_process_pool("reports", settings.REPORT_WORKER_PROCESSES)
+        loop = asyncio.get_running_loop()
+        per_part = settings.REPORT_DEFECTS_PER_PART
+
+        cover = loop.run_in_executor(pool, render_cover_pdf, meta, os.path.join(workdir, "cover.pdf"))
+        parts = [
+            loop.run_in_executor(
+                pool, render_defects_pdf, payloads[i:i + per_part], title,
+                os.path.join(workdir, f"part_{i // per_part:05d}.pdf")
+            )
+            for i in range(0, len(payloads), per_part)
+        ]
+        cover_path, *rendered = await asyncio.gather(cover, *parts)
+
+        output = os.path.join(workdir, "report.pdf")
+        page_count = await loop.run_in_executor(
+            pool, merge_pdf_files, [cover_path] + [path for path, _ in rendered], output
+        )
+    except Exception:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"📄 Report '{title}': {len(payloads)} defects, {page_count} pages in {elapsed:.1f}s ({len(parts)} parts)")
+    return RenderedReport(path=output, workdir=workdir, page_count=page_count, defect_count=len(payloads))
+
+async def upload_report(report: RenderedReport, blob_path: str):
+    """
+    Uploads a rendered report to blob storage, then cleans up. Awaited
+    inline. Disk reads go through read_chunks() so they stay off the loop.
+    """
+    try:
+        container = await get_container_client()
+        await container.get_blob_client(blob_path).upload_blob(
+            report.read_chunks(), overwrite=True, length=report.size,
+            content_settings=ContentSettings(content_type="application/pdf")
+        )
+        logger.info(f"✅ Report uploaded to {blob_path}")
+    finally:
+        report.cleanup()
@@ -0,0 +1,133 @@
+# app/services/email_digest.py
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.outbox import EmailDigestEntry
+
+logger = logging.getLogger(__name__)
+
+async def queue_digest_entries(
+    recipients: dict[str, int],
+    defect_data: dict,
+    event_type: str,
+    event_id: uuid.UUID | None = None
+):
+    """
+    Holds an event back for recipients in digest mode. `recipients` maps
+    address -> digest interval in minutes. Re-queueing the same outbox
+    event (worker retry) is a no-op thanks to (event_id, recipient).
+    """
+    if not recipients:
+        return
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "recipient": email,
+            "event_id": event_id,
+            "event_type": event_type,
+            "payload": defect_data,
+            "created_at": now,
+            "due_at": now + timedelta(minutes=minutes),
+        }
+        for email, minutes in recipients.items()
+    ]
+    async with SessionLocal() as db:
+        stmt = pg_insert(EmailDigestEntry).values(rows).on_conflict_do_nothing(
+            index_elements=["event_id", "recipient"]
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+async def flush_due_digests(limit: int = None) -> int:
+    """
+    Sends one summary email to every recipient whose oldest pending event
+    is due. Entries are locked with SKIP LOCKED so several workers can
+    flush concurrently. A failed send pushes the recipient's entries back
+    with the outbox backoff; after EMAIL_DIGEST_MAX_ATTEMPTS they are
+    marked failed. Returns the number of digests sent.
+    """
+    # Imported here: email_service and email_outbox import this module
+    from app.services.email_service import OutgoingMail, render_digest_email, send_email_batch
+    from app.services.email_outbox import retry_delay, delivery_unknown
+
+    limit = limit or settings.EMAIL_DIGEST_MAX_RECIPIENTS_PER_FLUSH
+    now = datetime.utcnow()
+    sent = 0
+
+    async with SessionLocal() as db:
+        due_stmt = (
+            select(EmailDigestEntry.recipient)
+            .where(EmailDigestEntry.sent_at.is_(None), EmailDigestEntry.failed_at.is_(None))
+            .group_by(EmailDigestEntry.recipient)
+            .having(func.min(EmailDigestEntry.due_at) <= now)
+            .limit(limit)
+        )
+        due_recipients = (await db.execute(due_stmt)).scalars().all()
+        if not due_recipients:
+            return 0
+
+        entries_stmt = (
+            select(EmailDigestEntry)
+            .where(
+                EmailDigestEntry.recipient.in_(due_recipients),
+                EmailDigestEntry.sent_at.is_(None),
+                EmailDigestEntry.failed_at.is_(None)
+            )
+            .order_by(EmailDigestEntry.created_at)
+            .with_for_update(skip_locked=True)
+        )
+        entries = (await db.execute(entries_stmt)).scalars().all()
+
+        by_recipient = defaultdict(list)
+        for entry in entries:
+            by_recipient[entry.recipient].append(entry)
+
+        mails = []
+        for recipient, items in by_recipient.items():
+            events = [
+                {**item.payload, "event_type": item.event_type, "created_at": item.created_at.strftime("%Y-%m-%d %H:%M")}
+                for item in items
+            ]
+            subject, html_content = render_digest_email(events)
+            mails.append((recipient, OutgoingMail(subject, [recipient], html_content)))
+
+        # All due digests go out together through Graph $batch
+        results = await send_email_batch([mail for _, mail in mails])
+
+        for (recipient, _), error in zip(mails, results):
+            items = by_recipient[recipient]
+            if error is None:
+                for item in items:
+                    item.sent_at = now
+                sent += 1
+                continue
+
+            given_up = 0
+            unknown = delivery_unknown(error)  # May have been sent: never re-sent automatically
+            for item in items:
+                item.attempts += 1
+                item.last_error = str(error)[:2000]
+                if unknown or item.attempts >= settings.EMAIL_DIGEST_MAX_ATTEMPTS:
+                    item.failed_at = now
+                    given_up += 1
+                else:
+                    item.due_at = now + retry_delay(item.attempts)
+            if given_up:
+                logger.error(f"❌ Digest for {recipient} failed, giving up on {given_up} event(s): {error}")
+            else:
+                logger.warning(f"⚠️ Digest for {recipient} failed (attempt {max(i.attempts for i in items)}): {error}")
+
+        await db.commit()
+
+    if sent:
+        logger.info(f"📰 Sent {sent} digest email(s)")
+    return sent
@@ -0,0 +1,220 @@
+# app/services/email_outbox.py
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import or_, and_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.outbox import EmailOutbox, OutboxStatus
+from app.services.email_digest import flush_due_digests
+
+logger = logging.getLogger(__name__)
+
+# --- 1. PRODUCER SIDE (API) ---
+def enqueue_defect_email(db: AsyncSession, defect_data: dict, event_type: str):
+    """
+    Adds a defect email to the outbox. Nothing is sent here: the row is
+    committed together with the caller's defect change, so the email is
+    sent if and only if the change is persisted.
+    """
+    db.add(EmailOutbox(event_type=event_type, payload=defect_data))
+
+# --- 2. CONSUMER SIDE (Worker) ---
+async def claim_batch(db: AsyncSession, limit: int) -> list[EmailOutbox]:
+    """
+    Claims up to `limit` due rows with FOR UPDATE SKIP LOCKED, so any number
+    of workers can poll the same table without handing out a row twice.
+    Rows stuck in SENDING past the lease (crashed worker) are reclaimed;
+    a live worker keeps renewing the lease while it sends.
+    """
+    now = datetime.utcnow()
+    lease_expired = now - timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+
+    stmt = (
+        select(EmailOutbox)
+        .where(or_(
+            and_(EmailOutbox.status == OutboxStatus.PENDING, EmailOutbox.next_attempt_at <= now),
+            and_(EmailOutbox.status == OutboxStatus.SENDING, EmailOutbox.locked_at < lease_expired),
+        ))
+        .order_by(EmailOutbox.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(stmt)
+    rows = result.scalars().all()
+
+    for row in rows:
+        row.status = OutboxStatus.SENDING
+        row.locked_at = now
+        row.attempts += 1
+
+    await db.commit()
+    return rows
+
+async def renew_leases(db: AsyncSession, row_ids: list) -> int:
+    """Pushes locked_at forward for rows this worker is still sending."""
+    result = await db.execute(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(row_ids), EmailOutbox.status == OutboxStatus.SENDING)
+        .values(locked_at=datetime.utcnow())
+    )
+    await db.commit()
+    return result.rowcount
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: 30s, 1m, 2m, 4m ... capped at one hour."""
+    return timedelta(seconds=min(3600, 30 * 2 ** max(0, attempts - 1)))
+
+def delivery_unknown(error: Exception) -> bool:
+    """The transport got no answer: the mail may already be in someone's inbox."""
+    return getattr(error, "delivery_unknown", False)
+
+async def record_result(db: AsyncSession, row: EmailOutbox, error: Exception | None):
+    values = {"locked_at": None}
+    if error is None:
+        values.update(status=OutboxStatus.SENT, sent_at=datetime.utcnow(), last_error=None)
+    elif delivery_unknown(error):
+        # Never re-sent automatically: FAILED with the reason, for manual review
+        values.update(status=OutboxStatus.FAILED, last_error=f"Delivery unknown, not retried: {error}"[:2000])
+    elif row.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        values.update(status=OutboxStatus.FAILED, last_error=str(error)[:2000])
+    else:
+        values.update(
+            status=OutboxStatus.PENDING,
+            last_error=str(error)[:2000],
+            next_attempt_at=datetime.utcnow() + retry_delay(row.attempts),
+        )
+    await db.execute(update(EmailOutbox).where(EmailOutbox.id == row.id).values(**values))
+
+
+class OutboxWorker:
+    """
+    Polls the outbox and delivers emails with bounded concurrency.
+    Runs either embedded in the API process or standalone via
+    `python -m app.workers.email_worker` (any number of replicas).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = None,
+        concurrency: int = None,
+        poll_seconds: float = None,
+    ):
+        self.batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self.concurrency = concurrency or settings.EMAIL_WORKER_CONCURRENCY
+        self.poll_seconds = poll_seconds or settings.EMAIL_OUTBOX_POLL_SECONDS
+        self._stopping = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        self.sent = 0
+        self.failed = 0
+        self.in_flight = 0
+
+    async def _build(self, row: EmailOutbox):
+        # Imported here: email_service pulls in the Graph client stack
+        from app.services.email_service import build_defect_email
+
+        async with self._semaphore:
+            try:
+                return await build_defect_email(dict(row.payload), row.event_type, event_id=row.id)
+            except Exception as e:
+                return e
+
+    async def _deliver(self, rows: list[EmailOutbox]) -> list[Exception | None]:
+        """
+        Builds every claimed email, then hands all of them to the mail
+        transport in one go (Graph $batch or pooled SMTP). Returns the
+        error (or None) per row.
+        """
+        from app.services.email_service import OutgoingMail, send_email_batch
+
+        built = await asyncio.gather(*(self._build(row) for row in rows))
+        errors: list[Exception | None] = [b if isinstance(b, Exception) else None for b in built]
+
+        to_send = [(i, mail) for i, mail in enumerate(built) if isinstance(mail, OutgoingMail)]
+        self.in_flight += len(to_send)
+        try:
+            results = await send_email_batch([mail for _, mail in to_send])
+        except Exception as e:
+            results = [e] * len(to_send)
+        finally:
+            self.in_flight -= len(to_send)
+
+        for (i, _), result in zip(to_send, results):
+            errors[i] = result
+
+        for row, error in zip(rows, errors):
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed += 1
+                logger.warning(f"⚠️ Outbox email {row.id} failed (attempt {row.attempts}): {error}")
+        return errors
+
+    async def _keep_leases(self, rows: list[EmailOutbox]):
+        """
+        Renews the claim every third of the lease while the batch is being
+        sent: Graph retries with Retry-After can outlast one lease, and an
+        expired lease would let another worker send the same email again.
+        """
+        row_ids = [row.id for row in rows]
+        interval = settings.EMAIL_OUTBOX_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with SessionLocal() as db:
+                    await renew_leases(db, row_ids)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew outbox leases: {e}")
+
+    async def run_once(self) -> int:
+        """Claims and delivers one batch. Returns the number of rows claimed."""
+        async with SessionLocal() as db:
+            rows = await claim_batch(db, self.batch_size)
+        if not rows:
+            return 0
+
+        heartbeat = asyncio.create_task(self._keep_leases(rows))
+        try:
+            errors = await self._deliver(rows)
+        finally:
+            heartbeat.cancel()
+
+        async with SessionLocal() as db:
+            for row, error in zip(rows, errors):
+                await record_result(db, row, error)
+            await db.commit()
+
+        logger.info(f"📬 Outbox batch done: {len(rows) - sum(e is not None for e in errors)}/{len(rows)} sent")
+        return len(rows)
+
+    async def run(self):
+        logger.info(f"📮 Email outbox worker started (batch={self.batch_size}, concurrency={self.concurrency})")
+        last_digest_flush = 0.0
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Outbox worker error: {e}", exc_info=True)
+                claimed = 0
+
+            loop_time = asyncio.get_running_loop().time()
+            if loop_time - last_digest_flush >= settings.EMAIL_DIGEST_FLUSH_SECONDS:
+                last_digest_flush = loop_time
+                try:
+                    await flush_due_digests()
+                except Exception as e:
+                    logger.error(f"❌ Digest flush error: {e}", exc_info=True)
+
+            # A full batch means there is probably more waiting
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stop(self):
+        self._stopping.set()
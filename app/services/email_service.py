@@ -1,25 +1,26 @@
 import os
-import msal
-import httpx
-import re
+import logging
+import time
 from jinja2 import Environment, FileSystemLoader
 from pathlib import Path
 from dotenv import load_dotenv
-from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from app.core.database import SessionLocal
-from app.models.user import User
-from app.models.vessel import Vessel
-from app.models.enums import UserRole
+from app.core.config import settings
+from app.core.metrics import EMAIL_SEND_SECONDS, EMAILS
+from app.models.enums import DefectPriority
+from app.services.graph_client import GraphTokenProvider, GraphClient
+from app.services.mail_transport import OutgoingMail, create_mail_transport
+from app.services.recipient_directory import recipient_directory, is_valid_email
+from app.services.email_digest import queue_digest_entries
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # --- 1. AZURE CONFIGURATION ---
 TENANT_ID = os.getenv("AZURE_TENANT_ID")
 CLIENT_ID = os.getenv("AZURE_CLIENT_ID")
 CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET")
 MAIL_FROM = os.getenv("MAIL_FROM")
-GRAPH_ENDPOINT = f"https://graph.microsoft.com/v1.0/users/{MAIL_FROM}/sendMail"
 
 # --- 2. TEMPLATE SETUP ---
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,108 +28,100 @@ TEMPLATE_FOLDER = Path(BASE_DIR, "templates")
 env = Environment(loader=FileSystemLoader(str(TEMPLATE_FOLDER)))
 
 # --- 3. HELPER: Get Token ---
-def get_access_token():
-    app = msal.ConfidentialClientApplication(
-        CLIENT_ID,
-        authority=f"https://login.microsoftonline.com/{TENANT_ID}",
-        client_credential=CLIENT_SECRET,
-    )
-    result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
-    if "access_token" in result:
-        return result["access_token"]
-    else:
-        print(f"❌ OAuth Token Error: {result.get('error_description')}")
-        raise Exception("Could not acquire Azure Token")
-
-# --- 4. HELPER: Valid Email Check ---
-def is_valid_email(email: str) -> bool:
-    if not email: return False
-    regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    if not re.match(regex, email): return False
-    if email.split('@')[-1] in ["example.com", "test.com", "localhost"]: return False
-    return True
-
-# --- 5. HELPER: Get Recipients from DB ---
+# One cached token for the whole process, refreshed ahead of expiry
+token_provider = GraphTokenProvider(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
+
+async def get_access_token() -> str:
+    return await token_provider.get_token()
+
+# Shared keep-alive client; throttled sends are retried per Retry-After
+graph_client = GraphClient(
+    token_provider,
+    base_url=settings.GRAPH_BASE_URL,
+    max_concurrency=settings.GRAPH_MAX_CONCURRENCY,
+    max_retries=settings.GRAPH_MAX_RETRIES,
+    timeout_seconds=settings.GRAPH_TIMEOUT_SECONDS,
+)
+
+# --- 4. HELPER: Get Recipients (cached per vessel) ---
 async def get_recipients_for_vessel(vessel_imo: str) -> list[str]:
-    recipients = set()
-    async with SessionLocal() as db:
-        # A. Linked Vessel Users
-        stmt_vessel = select(Vessel).where(Vessel.imo == vessel_imo).options(selectinload(Vessel.users))
-        result_vessel = await db.execute(stmt_vessel)
-        vessel = result_vessel.scalars().first()
-        
-        if vessel:
-            if is_valid_email(vessel.email): recipients.add(vessel.email)
-            for user in vessel.users:
-                if is_valid_email(user.email) and user.is_active:
-                    recipients.add(user.email)
-
-        # B. Admin/Shore Users
-        target_roles = []
-        # Handle Enum vs String safely
-        if hasattr(UserRole.ADMIN, 'value'):
-            target_roles = [UserRole.ADMIN.value, UserRole.SHORE.value]
-        else:
-            target_roles = ["ADMIN", "SHORE"]
-
-        stmt_admins = select(User).where(User.role.in_(target_roles), User.is_active == True)
-        result_admins = await db.execute(stmt_admins)
-        admins = result_admins.scalars().all()
-        
-        for admin in admins:
-            if is_valid_email(admin.email): recipients.add(admin.email)
-            
-    return list(recipients)
-
-# --- 6. CORE: Send via Graph API ---
-async def send_graph_email(subject: str, recipients: list[str], html_content: str):
-    token = get_access_token()
-    
-    to_recipients = [{"emailAddress": {"address": email}} for email in recipients]
-    
-    payload = {
-        "message": {
-            "subject": subject,
-            "body": {
-                "contentType": "HTML",
-                "content": html_content
-            },
-            "toRecipients": to_recipients
-        },
-        "saveToSentItems": "true"
-    }
-    
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(GRAPH_ENDPOINT, json=payload, headers=headers)
-        
-        if response.status_code == 202:
-            print(f"✅ OAuth Email Sent to {len(recipients)} recipients.")
-        else:
-            print(f"❌ Graph API Error: {response.status_code} - {response.text}")
-
-# --- 7. EXPORTED FUNCTION ---
-async def send_defect_email(defect_data: dict, event_type: str):
-    print(f"🚀 Processing Email for: {defect_data.get('title')}")
+    return await recipient_directory.get_recipients(vessel_imo)
+
+# --- 5. CORE: Send via the configured transport (Graph or SMTP) ---
+mail_transport = create_mail_transport(settings, graph_client, MAIL_FROM)
+
+async def send_email(subject: str, recipients: list[str], html_content: str):
+    started = time.perf_counter()
+    try:
+        await mail_transport.send(OutgoingMail(subject, recipients, html_content))
+        EMAILS.labels(mail_transport.name, "sent").inc()
+        logger.info(f"✅ Email Sent to {len(recipients)} recipients via {mail_transport.name}.")
+    except Exception as e:
+        EMAILS.labels(mail_transport.name, "failed").inc()
+        logger.error(f"❌ Email Error ({mail_transport.name}): {e}")
+        raise
+    finally:
+        EMAIL_SEND_SECONDS.labels(mail_transport.name, "single").observe(time.perf_counter() - started)
+
+async def send_email_batch(mails: list[OutgoingMail]) -> list[Exception | None]:
+    """Sends many mails at once; returns None or the error per mail."""
+    if not mails:
+        return []
+    started = time.perf_counter()
+    results = await mail_transport.send_many(mails)
+    EMAIL_SEND_SECONDS.labels(mail_transport.name, "batch").observe(time.perf_counter() - started)
+    failed = sum(r is not None for r in results)
+    EMAILS.labels(mail_transport.name, "sent").inc(len(mails) - failed)
+    EMAILS.labels(mail_transport.name, "failed").inc(failed)
+    logger.info(f"✅ {mail_transport.name} batch: {len(mails) - failed}/{len(mails)} emails accepted.")
+    return results
+
+# --- 6. HELPER: Digest Rendering ---
+def render_digest_email(events: list[dict]) -> tuple[str, str]:
+    template = env.get_template("defect_digest.html")
+    html_content = template.render(events=events)
+    vessels = sorted({e["vessel_imo"] for e in events})
+    scope = vessels[0] if len(vessels) == 1 else f"{len(vessels)} vessels"
+    subject = f"[{scope}] 📰 DRS Digest: {len(events)} defect update{'s' if len(events) != 1 else ''}"
+    return subject, html_content
+
+# --- 7. EXPORTED FUNCTIONS ---
+async def build_defect_email(defect_data: dict, event_type: str, event_id=None) -> OutgoingMail | None:
+    """
+    Resolves recipients, queues digest-mode recipients and renders the
+    immediate email. Returns None when nobody needs an immediate email.
+    """
+    logger.debug("🚀 Processing Email for: %s", defect_data.get("title"))
     
-    # 1. Find who to send to
-    recipients = await get_recipients_for_vessel(defect_data['vessel_imo'])
+    # 1. Find who to send to (address -> digest interval in minutes)
+    profiles = await recipient_directory.get_recipient_profiles(defect_data['vessel_imo'])
     
+    if not profiles:
+        logger.warning("⚠️ No recipients found. Skipping email.")
+        return None
+
+    # 2. Split immediate vs digest recipients; CRITICAL always goes out now
+    if defect_data.get("priority") == DefectPriority.CRITICAL.value:
+        recipients = sorted(profiles)
+    else:
+        recipients = sorted(email for email, minutes in profiles.items() if minutes <= 0)
+        held = {email: minutes for email, minutes in profiles.items() if minutes > 0}
+        await queue_digest_entries(held, defect_data, event_type, event_id)
+
     if not recipients:
-        print("⚠️ No recipients found. Skipping email.")
-        return
+        logger.info(f"📰 All {len(profiles)} recipients are in digest mode.")
+        return None
 
-    # 2. Prepare HTML
+    # 3. Prepare HTML
     defect_data["event_type"] = event_type
     try:
         template = env.get_template("defect_notification.html")
         html_content = template.render(**defect_data)
     except Exception as e:
-        print(f"❌ HTML Template Error: {e}")
-        return
+        logger.error(f"❌ HTML Template Error: {e}")
+        return None
 
-    # 3. Prepare Subject (Updated with REMOVED)
+    # 4. Prepare Subject (Updated with REMOVED)
     subject_map = {
         "CREATED": f"🚨 New Defect: {defect_data['title']}",
         "UPDATED": f"📝 Defect Updated: {defect_data['title']}",
@@ -137,5 +130,9 @@ async def send_defect_email(defect_data: dict, event_type: str):
     }
     subject = f"[{defect_data['vessel_imo']}] {subject_map.get(event_type, 'Notification')}"
 
-    # 4. Fire and Forget
-    await send_graph_email(subject, recipients, html_content)
\ No newline at end of file
+    return OutgoingMail(subject=subject, recipients=recipients, html_content=html_content)
+
+async def send_defect_email(defect_data: dict, event_type: str, event_id=None):
+    mail = await build_defect_email(defect_data, event_type, event_id)
+    if mail:
+        await send_email(mail.subject, mail.recipients, mail.html_content)
@@ -0,0 +1,264 @@
+# app/services/fleet_registry.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from uuid import UUID
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.associations import user_vessel_link
+from app.models.defect import Defect
+from app.models.enums import UserRole
+from app.models.user import User
+from app.models.vessel import Vessel
+
+logger = logging.getLogger(__name__)
+
+SHORE_ROLES = {UserRole.ADMIN.value, UserRole.SHORE.value}
+
+
+@dataclass(frozen=True)
+class MentionEntry:
+    """A mentionable user with lower-cased search keys precomputed."""
+    user: dict
+    name: str
+    name_words: tuple[str, ...]
+    job_title: str
+    job_words: tuple[str, ...]
+    on_vessel: bool
+
+    @classmethod
+    def build(cls, user: dict, on_vessel: bool) -> "MentionEntry":
+        name = (user["full_name"] or "").lower()
+        job_title = (user["job_title"] or "").lower()
+        return cls(
+            user=user,
+            name=name,
+            name_words=tuple(name.split()),
+            job_title=job_title,
+            job_words=tuple(job_title.split()),
+            on_vessel=on_vessel,
+        )
+
+    def rank(self, q: str) -> int | None:
+        """0 name prefix, 1 name word prefix, 2 job title word prefix, 3 substring; None = no match."""
+        if self.name.startswith(q):
+            return 0
+        if any(word.startswith(q) for word in self.name_words):
+            return 1
+        if any(word.startswith(q) for word in self.job_words):
+            return 2
+        if q in self.name or q in self.job_title:
+            return 3
+        return None
+
+def search_mentionable(entries: list[MentionEntry], q: str | None, limit: int) -> list[MentionEntry]:
+    """Entries are pre-sorted, so a stable sort on rank keeps name order within a rank."""
+    q = (q or "").strip().lower()
+    if not q:
+        return entries[:limit]
+    ranked = []
+    for entry in entries:
+        rank = entry.rank(q)
+        if rank is not None:
+            ranked.append((rank, entry))
+    ranked.sort(key=lambda pair: pair[0])
+    return [entry for _, entry in ranked[:limit]]
+
+
+@dataclass
+class FleetSnapshot:
+    """Immutable view of the fleet; replaced as a whole, never edited."""
+    vessels: dict[str, dict]                 # imo -> VesselResponse fields
+    rosters: dict[str, list[dict]]           # imo -> users (sorted by name)
+    user_vessels: dict[UUID, list[str]]      # user id -> assigned IMOs
+    shore: list[dict]                        # active ADMIN/SHORE users (sorted by name)
+    loaded_at: float
+    _encoded: dict[str, tuple[bytes, str]] = field(default_factory=dict)
+    _mentionable: dict[str, list[MentionEntry]] = field(default_factory=dict)
+
+    def mentionable(self, vessel_imo: str) -> list[MentionEntry]:
+        """Active crew of the vessel, then active shore staff; built once per vessel."""
+        entries = self._mentionable.get(vessel_imo)
+        if entries is None:
+            crew = [u for u in self.rosters.get(vessel_imo, []) if u["is_active"]]
+            crew_ids = {u["id"] for u in crew}
+            entries = [MentionEntry.build(u, True) for u in crew]
+            entries += [MentionEntry.build(u, False) for u in self.shore if u["id"] not in crew_ids]
+            self._mentionable[vessel_imo] = entries
+        return entries
+
+    def encoded(self, key: str, payload) -> tuple[bytes, str]:
+        """JSON body + strong ETag, computed once per snapshot and resource."""
+        cached = self._encoded.get(key)
+        if cached is None:
+            body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+            cached = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+            self._encoded[key] = cached
+        return cached
+
+
+class FleetRegistry:
+    """
+    In-memory copy of vessels, per-vessel user rosters and the reverse
+    user -> vessels map, loaded in three queries.
+
+    invalidate() is called by the endpoints that create vessels/users or
+    change assignments in this process; the TTL bounds staleness for
+    changes made by other API workers.
+    """
+
+    def __init__(self, ttl_seconds: int = 300, defect_cache_size: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: FleetSnapshot | None = None
+        self._lock = asyncio.Lock()
+        self._generation = 0  # Bumped by invalidate(): a load that straddles it is stale
+        # A defect never changes vessel: LRU of defect id -> IMO
+        self.defect_cache_size = defect_cache_size
+        self._defect_vessels: OrderedDict[UUID, str] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() - self._snapshot.loaded_at < self.ttl_seconds
+
+    async def _load(self) -> FleetSnapshot:
+        async with SessionLocal() as db:
+            vessel_rows = (await db.execute(
+                select(Vessel.imo, Vessel.name, Vessel.vessel_type, Vessel.email, Vessel.is_active, Vessel.created_at)
+                .order_by(Vessel.name)
+            )).all()
+            user_rows = (await db.execute(
+                select(User.id, User.full_name, User.job_title, User.role, User.is_active)
+                .order_by(User.full_name)
+            )).all()
+            link_rows = (await db.execute(
+                select(user_vessel_link.c.user_id, user_vessel_link.c.vessel_imo)
+            )).all()
+
+        vessels = {
+            imo: {
+                "imo_number": imo,
+                "name": name,
+                "vessel_type": vessel_type,
+                "email": email,
+                "flag": None,
+                "is_active": is_active,
+                "created_at": created_at.isoformat() if created_at else None,
+            }
+            for imo, name, vessel_type, email, is_active, created_at in vessel_rows
+        }
+        users = {
+            user_id: {
+                "id": user_id,
+                "full_name": full_name,
+                "job_title": job_title,
+                "role": role,
+                "is_active": is_active,
+            }
+            for user_id, full_name, job_title, role, is_active in user_rows
+        }
+
+        vessel_order = {imo: i for i, imo in enumerate(vessels)}
+        user_vessels: dict[UUID, list[str]] = {}
+        for user_id, imo in link_rows:
+            if user_id in users and imo in vessels:
+                user_vessels.setdefault(user_id, []).append(imo)
+        for imos in user_vessels.values():
+            imos.sort(key=vessel_order.__getitem__)
+
+        # Walk users in name order so every roster comes out pre-sorted
+        rosters: dict[str, list[dict]] = {imo: [] for imo in vessels}
+        for user_id, user in users.items():
+            for imo in user_vessels.get(user_id, ()):
+                rosters[imo].append(user)
+
+        shore = [u for u in users.values() if u["is_active"] and u["role"] in SHORE_ROLES]
+
+        logger.info(f"🚢 Fleet registry loaded: {len(vessels)} vessels, {len(users)} users, {len(link_rows)} assignments")
+        return FleetSnapshot(
+            vessels=vessels, rosters=rosters, user_vessels=user_vessels,
+            shore=shore, loaded_at=time.monotonic()
+        )
+
+    async def snapshot(self) -> FleetSnapshot:
+        if self._fresh():
+            self.hits += 1
+            return self._snapshot
+
+        # Single flight: concurrent screen loads wait on one reload
+        async with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._snapshot
+            self.misses += 1
+            return await self._reload()
+
+    async def _reload(self, attempts: int = 3) -> FleetSnapshot:
+        """
+        Installs a load only if no invalidate() ran while it was in flight;
+        otherwise it may predate the change and is loaded again.
+        """
+        for _ in range(attempts):
+            generation = self._generation
+            snapshot = await self._load()
+            if generation == self._generation:
+                self._snapshot = snapshot
+                return snapshot
+        return snapshot  # Still churning: serve it, but don't cache it
+
+    async def get_vessels(self) -> list[dict]:
+        return list((await self.snapshot()).vessels.values())
+
+    async def get_roster(self, vessel_imo: str, active_only: bool = False) -> list[dict]:
+        roster = (await self.snapshot()).rosters.get(vessel_imo, [])
+        return [u for u in roster if u["is_active"]] if active_only else roster
+
+    async def get_user_vessels(self, user_id: UUID) -> list[str]:
+        return (await self.snapshot()).user_vessels.get(user_id, [])
+
+    async def get_defect_vessel(self, db, defect_id: UUID) -> str | None:
+        """IMO of a live defect (None if missing / deleted), cached after the first lookup."""
+        imo = self._defect_vessels.get(defect_id)
+        if imo is not None:
+            self._defect_vessels.move_to_end(defect_id)
+            return imo
+        result = await db.execute(
+            select(Defect.vessel_imo).where(Defect.id == defect_id, Defect.is_deleted == False)
+        )
+        imo = result.scalar_one_or_none()
+        if imo is not None:
+            self._defect_vessels[defect_id] = imo
+            if len(self._defect_vessels) > self.defect_cache_size:
+                self._defect_vessels.popitem(last=False)
+        return imo
+
+    async def search_mentionable(self, vessel_imo: str, q: str | None, limit: int) -> list[MentionEntry]:
+        return search_mentionable((await self.snapshot()).mentionable(vessel_imo), q, limit)
+
+    def forget_defect(self, defect_id: UUID):
+        self._defect_vessels.pop(defect_id, None)
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "vessels_cached": len(snapshot.vessels) if snapshot else 0,
+        }
+
+
+fleet_registry = FleetRegistry(
+    ttl_seconds=settings.FLEET_CACHE_TTL_SECONDS,
+    defect_cache_size=settings.MENTION_DEFECT_CACHE_SIZE
+)
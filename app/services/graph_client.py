@@ -0,0 +1,408 @@
+# app/services/graph_client.py
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+import msal
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+GRAPH_BASE_URL = "https://graph.microsoft.com/v1.0"
+
+# Throttling statuses that mean "not processed": retried only when Graph sends Retry-After.
+# 504 is never retried - the gateway timed out but the mail may already be accepted.
+RETRYABLE_STATUSES = {429, 503}
+
+# The request never reached Graph, so a retry cannot send a mail twice.
+# Read/write timeouts and dropped connections may follow an accepted sendMail.
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Graph JSON batching accepts at most 20 requests per $batch call
+GRAPH_BATCH_LIMIT = 20
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class GraphSendError(Exception):
+    """
+    Raised when Graph rejects a request or retries are exhausted.
+    delivery_unknown: no answer came back, so the mail may have been sent.
+    """
+
+    def __init__(self, status_code: int, detail: str, delivery_unknown: bool = False):
+        self.status_code = status_code
+        self.detail = detail
+        self.delivery_unknown = delivery_unknown
+        super().__init__(f"Graph API Error: {status_code} - {detail}")
+
+
+class GraphTokenProvider:
+    """
+    Process-wide cache for the app-only Microsoft Graph token.
+
+    The token is reused until it gets close to expiry. Inside the refresh
+    margin the cached token is still handed out while a single background
+    task fetches a new one. MSAL does blocking HTTPS, so every fetch runs
+    in a worker thread and never on the event loop.
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        refresh_margin_seconds: int = 300,
+    ):
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin_seconds = refresh_margin_seconds
+
+        self._app = None
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task = None
+
+        # Exposed through stats()
+        self.fetch_count = 0
+        self.fetch_failures = 0
+        self.last_fetch_seconds = 0.0
+        self.total_fetch_seconds = 0.0
+
+    def _get_app(self):
+        if self._app is None:
+            self._app = msal.ConfidentialClientApplication(
+                self.client_id,
+                authority=f"https://login.microsoftonline.com/{self.tenant_id}",
+                client_credential=self.client_secret,
+            )
+        return self._app
+
+    def _acquire_blocking(self) -> dict:
+        """Runs in a worker thread: the only place that talks to Azure AD."""
+        return self._get_app().acquire_token_for_client(scopes=GRAPH_SCOPES)
+
+    async def _fetch(self) -> str:
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(self._acquire_blocking)
+        except Exception:
+            self.fetch_failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.fetch_count += 1
+            self.last_fetch_seconds = elapsed
+            self.total_fetch_seconds += elapsed
+
+        if "access_token" not in result:
+            self.fetch_failures += 1
+            logger.error(f"❌ OAuth Token Error: {result.get('error_description')}")
+            raise Exception("Could not acquire Azure Token")
+
+        self._token = result["access_token"]
+        self._expires_at = time.monotonic() + int(result.get("expires_in", 3600))
+        logger.info(f"🔑 Graph token refreshed in {self.last_fetch_seconds * 1000:.0f}ms")
+        return self._token
+
+    async def _refresh_locked(self) -> str:
+        async with self._lock:
+            # Another caller may have refreshed while we waited
+            if self._token and time.monotonic() < self._expires_at - self.refresh_margin_seconds:
+                return self._token
+            return await self._fetch()
+
+    def _refresh_in_background(self):
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_locked())
+        self._refresh_task.add_done_callback(self._log_refresh_failure)
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.warning(f"⚠️ Background Graph token refresh failed: {task.exception()}")
+
+    def invalidate(self):
+        """Drops the cached token, e.g. after Graph answered 401."""
+        self._token = None
+        self._expires_at = 0.0
+
+    async def get_token(self) -> str:
+        now = time.monotonic()
+        if self._token and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin_seconds:
+                self._refresh_in_background()
+            return self._token
+
+        # No usable token: callers wait on a single shared fetch
+        return await self._refresh_locked()
+
+    def stats(self) -> dict:
+        return {
+            "fetch_count": self.fetch_count,
+            "fetch_failures": self.fetch_failures,
+            "last_fetch_seconds": self.last_fetch_seconds,
+            "avg_fetch_seconds": (self.total_fetch_seconds / self.fetch_count) if self.fetch_count else 0.0,
+            "expires_in_seconds": max(0.0, self._expires_at - time.monotonic()) if self._token else 0.0,
+        }
+
+    async def aclose(self):
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+
+
+def retry_after_delay(status_code: int, headers) -> float | None:
+    """Seconds to wait before re-sending, or None if the response must not be retried."""
+    if status_code not in RETRYABLE_STATUSES:
+        return None
+    return parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After is either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class GraphClient:
+    """
+    Long-lived Graph HTTP client shared by every sender in the process.
+
+    Keeps one keep-alive (HTTP/2 when available) connection pool, caps the
+    number of in-flight requests with a semaphore and retries throttled
+    calls, waiting as long as Graph asks via Retry-After. Sends are not
+    idempotent: anything that may have reached Graph is not retried.
+    """
+
+    def __init__(
+        self,
+        token_provider: GraphTokenProvider,
+        base_url: str = GRAPH_BASE_URL,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        timeout_seconds: float = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.token_provider = token_provider
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+        self.transport = transport  # Tests / local stand-ins (httpx.MockTransport)
+
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        # Exposed through stats()
+        self.requests_sent = 0
+        self.requests_failed = 0
+        self.throttled = 0
+        self.retries = 0
+        self.total_latency_seconds = 0.0
+        self.max_latency_seconds = 0.0
+        self.batch_calls = 0
+        self.batch_items_throttled = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout_seconds,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        return min(60.0, (2 ** attempt) + random.uniform(0, 1))
+
+    async def _post_once(self, path: str, payload: dict) -> httpx.Response:
+        token = await self.token_provider.get_token()
+        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                return await self._get_client().post(path, json=payload, headers=headers)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.requests_sent += 1
+                self.total_latency_seconds += elapsed
+                self.max_latency_seconds = max(self.max_latency_seconds, elapsed)
+
+    async def post(self, path: str, payload: dict) -> httpx.Response:
+        """
+        POSTs to Graph. Retries only what cannot have been delivered:
+        connect-phase errors, 401 (once, with a fresh token) and 429/503
+        carrying Retry-After. Read timeouts and 504s are surfaced as-is so a
+        sendMail is never duplicated. Returns the final response; the caller
+        decides which status codes count as success.
+        """
+        refreshed_token = False
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._post_once(path, payload)
+            except CONNECT_ERRORS as e:
+                if attempt == self.max_retries:
+                    self.requests_failed += 1
+                    raise GraphSendError(0, f"Connection error: {e}") from e
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except httpx.TransportError as e:
+                # Request may have been processed: let the caller decide
+                self.requests_failed += 1
+                raise GraphSendError(0, f"Transport error (delivery unknown): {e}", delivery_unknown=True) from e
+
+            if response.status_code == 401 and not refreshed_token:
+                refreshed_token = True
+                self.token_provider.invalidate()
+                self.retries += 1
+                continue
+
+            delay = retry_after_delay(response.status_code, response.headers)
+            if delay is not None and attempt < self.max_retries:
+                self.throttled += 1
+                self.retries += 1
+                logger.warning(f"⏳ Graph throttled ({response.status_code}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            return response
+
+        return response
+
+    async def send_mail(self, sender: str, message_payload: dict):
+        response = await self.post(f"/users/{sender}/sendMail", message_payload)
+        if response.status_code != 202:
+            self.requests_failed += 1
+            raise GraphSendError(response.status_code, response.text)
+
+    async def _send_mail_chunk(self, sender: str, payloads: list[dict]) -> list[Exception | None]:
+        """
+        Sends up to GRAPH_BATCH_LIMIT messages in one $batch call. Items
+        throttled inside the batch (429/503 with Retry-After) are re-sent,
+        only those, after the longest Retry-After Graph asked for.
+        """
+        results: list[Exception | None] = [None] * len(payloads)
+        pending = {str(i): payload for i, payload in enumerate(payloads)}
+
+        for attempt in range(self.max_retries + 1):
+            body = {
+                "requests": [
+                    {
+                        "id": item_id,
+                        "method": "POST",
+                        "url": f"/users/{sender}/sendMail",
+                        "headers": {"Content-Type": "application/json"},
+                        "body": payload,
+                    }
+                    for item_id, payload in pending.items()
+                ]
+            }
+            self.batch_calls += 1
+            try:
+                response = await self.post("/$batch", body)
+            except GraphSendError as e:
+                for item_id in pending:
+                    results[int(item_id)] = e
+                return results
+
+            if response.status_code != 200:
+                error = GraphSendError(response.status_code, response.text)
+                for item_id in pending:
+                    results[int(item_id)] = error
+                self.requests_failed += len(pending)
+                return results
+
+            retry_after = 0.0
+            throttled = {}
+            for item in response.json().get("responses", []):
+                item_id = str(item.get("id"))
+                if item_id not in pending:
+                    continue
+                status = int(item.get("status", 0))
+                if status == 202:
+                    pending.pop(item_id)
+                    continue
+                headers = {k.lower(): v for k, v in (item.get("headers") or {}).items()}
+                delay = retry_after_delay(status, headers)
+                if delay is not None and attempt < self.max_retries:
+                    throttled[item_id] = pending.pop(item_id)
+                    retry_after = max(retry_after, delay)
+                else:
+                    pending.pop(item_id)
+                    results[int(item_id)] = GraphSendError(status, str(item.get("body")))
+                    self.requests_failed += 1
+
+            # Items missing from the response are treated as failed
+            for item_id in pending:
+                results[int(item_id)] = GraphSendError(0, "No response for batch item", delivery_unknown=True)
+                self.requests_failed += 1
+
+            if not throttled:
+                return results
+
+            self.throttled += len(throttled)
+            self.batch_items_throttled += len(throttled)
+            self.retries += 1
+            logger.warning(f"⏳ {len(throttled)} batch item(s) throttled, retrying in {retry_after:.1f}s")
+            await asyncio.sleep(retry_after)
+            pending = throttled
+
+        return results
+
+    async def send_mail_batch(self, sender: str, payloads: list[dict]) -> list[Exception | None]:
+        """
+        Sends many messages through Graph JSON batching, GRAPH_BATCH_LIMIT
+        per round trip. Returns one entry per payload: None on success or
+        the error for that message (partial failures don't fail the rest).
+        """
+        chunks = [
+            payloads[i:i + GRAPH_BATCH_LIMIT]
+            for i in range(0, len(payloads), GRAPH_BATCH_LIMIT)
+        ]
+        chunk_results = await asyncio.gather(*(self._send_mail_chunk(sender, chunk) for chunk in chunks))
+        return [result for results in chunk_results for result in results]
+
+    def stats(self) -> dict:
+        completed = self.requests_sent
+        return {
+            "requests_sent": completed,
+            "requests_failed": self.requests_failed,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "avg_latency_seconds": (self.total_latency_seconds / completed) if completed else 0.0,
+            "max_latency_seconds": self.max_latency_seconds,
+            "batch_calls": self.batch_calls,
+            "batch_items_throttled": self.batch_items_throttled,
+            "http2": HTTP2_AVAILABLE,
+        }
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,190 @@
+# app/services/image_derivatives.py
+import asyncio
+import logging
+from uuid import UUID
+from azure.storage.blob import ContentSettings
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import track_background
+from app.core.process_pools import get_process_pool
+from app.core.blob_storage import get_container_client, get_blob_properties, generate_read_sas_url_or_none
+from app.models.defect import Attachment, Defect
+from app.services.image_render import render_variants
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".tif", ".tiff", ".heic"}
+THUMBNAIL = "thumb"
+PREVIEW = "preview"
+VARIANTS = (THUMBNAIL, PREVIEW)
+DEFECT_IMAGE_FIELDS = ("before_image_path", "after_image_path", "closure_image_before", "closure_image_after")
+
+_semaphore: asyncio.Semaphore | None = None
+
+def is_image(blob_path: str | None, content_type: str | None = None) -> bool:
+    if not blob_path:
+        return False
+    if content_type:
+        return content_type.lower().startswith("image/")
+    dot = blob_path.rfind(".")
+    return dot != -1 and blob_path[dot:].lower() in IMAGE_EXTENSIONS
+
+def derived_blob_path(blob_path: str, variant: str) -> str:
+    """e.g. defects/<id>/photo.jpg -> defects/<id>/photo.jpg.thumb.webp (same directory SAS)."""
+    return f"{blob_path}.{variant}.webp"
+
+def _variant_specs() -> dict[str, tuple[int, int]]:
+    return {
+        THUMBNAIL: (settings.IMAGE_THUMBNAIL_SIZE, settings.IMAGE_THUMBNAIL_QUALITY),
+        PREVIEW: (settings.IMAGE_PREVIEW_SIZE, settings.IMAGE_PREVIEW_QUALITY),
+    }
+
+async def generate_derivatives(blob_path: str) -> dict[str, str] | None:
+    """
+    Downloads an image, renders thumbnail + preview in the process pool
+    and uploads them next to the original. Returns variant -> blob path,
+    or None when the source is missing, too large or not decodable.
+    """
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.IMAGE_WORKER_PROCESSES * 2)
+
+    async with _semaphore:
+        props = await get_blob_properties(blob_path)
+        if props is None:
+            logger.warning(f"⚠️ Image {blob_path} not found, skipping derivatives")
+            return None
+        if props.size > settings.IMAGE_MAX_SOURCE_MB * 1024 * 1024:
+            logger.info(f"⏭️ Image {blob_path} too large for derivatives ({props.size} bytes)")
+            return None
+
+        container = await get_container_client()
+        downloader = await container.get_blob_client(blob_path).download_blob()
+        data = await downloader.readall()
+
+        try:
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(
+                get_process_pool("images", settings.IMAGE_WORKER_PROCESSES), render_variants,
+                data, _variant_specs()
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not render derivatives for {blob_path}: {str(e)}")
+            return None
+
+        content_settings = ContentSettings(
+            content_type="image/webp",
+            cache_control="public, max-age=31536000, immutable"
+        )
+        paths = {variant: derived_blob_path(blob_path, variant) for variant in rendered}
+        await asyncio.gather(*(
+            container.get_blob_client(paths[variant]).upload_blob(
+                body, overwrite=True, content_settings=content_settings
+            )
+            for variant, body in rendered.items()
+        ))
+
+        logger.info(
+            f"🖼️ Derivatives for {blob_path}: "
+            + ", ".join(f"{v}={len(b) // 1024}KB" for v, b in rendered.items())
+            + f" (source {props.size // 1024}KB)"
+        )
+        return paths
+
+# --- BACKGROUND ENTRY POINTS (FastAPI BackgroundTasks) ---
+@track_background("process_attachment_image")
+async def process_attachment_image(attachment_id: UUID):
+    """Generates derivatives for an image attachment and records their paths."""
+    try:
+        async with SessionLocal() as db:
+            attachment = await db.get(Attachment, attachment_id)
+            if not attachment or not is_image(attachment.blob_path, attachment.content_type):
+                return
+            blob_path = attachment.blob_path
+            content_sha256 = attachment.content_sha256
+
+        paths = await generate_derivatives(blob_path)
+        if not paths:
+            return
+
+        # Content-addressed blobs: every duplicate of the same blob shares the derivatives
+        target = (
+            (Attachment.content_sha256 == content_sha256) & (Attachment.blob_path == blob_path) if content_sha256
+            else Attachment.id == attachment_id
+        )
+        async with SessionLocal() as db:
+            await db.execute(
+                update(Attachment).where(target).values(
+                    thumbnail_path=paths.get(THUMBNAIL),
+                    preview_path=paths.get(PREVIEW)
+                )
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Derivative pipeline failed for attachment {attachment_id}: {str(e)}", exc_info=True)
+
+@track_background("process_defect_images")
+async def process_defect_images(defect_id: UUID, blob_paths: list[str | None]):
+    """
+    Renders derivatives for defect image fields and records the ones that
+    exist in Defect.image_derivatives (keyed by source path), so responses
+    only link thumbnails that were actually uploaded.
+    """
+    rendered = {}
+    for blob_path in blob_paths:
+        if not is_image(blob_path):
+            continue
+        try:
+            paths = await generate_derivatives(blob_path)
+        except Exception as e:
+            logger.error(f"❌ Derivative pipeline failed for {blob_path}: {str(e)}", exc_info=True)
+            continue
+        if paths:
+            rendered[blob_path] = paths
+    if not rendered:
+        return
+
+    try:
+        async with SessionLocal() as db:
+            defect = await db.get(Defect, defect_id, with_for_update=True)
+            if not defect:
+                return
+            current = {getattr(defect, field) for field in DEFECT_IMAGE_FIELDS}
+            # Entries for images that were replaced meanwhile are dropped
+            recorded = {path: v for path, v in (defect.image_derivatives or {}).items() if path in current}
+            recorded.update({path: v for path, v in rendered.items() if path in current})
+            defect.image_derivatives = recorded
+            await db.commit()
+    except Exception as e:
+        logger.error(f"❌ Could not record derivatives for defect {defect_id}: {str(e)}", exc_info=True)
+
+# --- RESPONSE HELPERS (signing stays out of the schemas) ---
+def defect_derivative_path(defect: Defect, blob_path: str | None, variant: str = THUMBNAIL) -> str | None:
+    """Recorded derivative of one of the defect's images, None if never rendered."""
+    if not blob_path:
+        return None
+    return ((defect.image_derivatives or {}).get(blob_path) or {}).get(variant)
+
+def defect_thumbnail_urls(defect: Defect) -> dict[str, str]:
+    """Read URL per image field: the thumbnail, or the original when none was rendered."""
+    urls = {}
+    for field in DEFECT_IMAGE_FIELDS:
+        path = getattr(defect, field)
+        if is_image(path):
+            url = generate_read_sas_url_or_none(defect_derivative_path(defect, path) or path)
+            if url:
+                urls[field] = url
+    return urls
+
+def sign_defects(defects) -> None:
+    """Sets image_thumbnails on Defect objects for DefectResponse."""
+    for defect in defects:
+        defect.image_thumbnails = defect_thumbnail_urls(defect)
+
+def sign_attachments(attachments) -> None:
+    """Sets thumbnail_url / preview_url on Attachment objects for AttachmentResponse."""
+    for attachment in attachments:
+        attachment.thumbnail_url = generate_read_sas_url_or_none(attachment.thumbnail_path)
+        attachment.preview_url = generate_read_sas_url_or_none(attachment.preview_path)
@@ -0,0 +1,30 @@
+# app/services/image_render.py
+"""
+Pure Pillow rendering, run inside the image process pool. Kept free of
+app imports so spawned worker processes start quickly.
+"""
+import io
+from PIL import Image, ImageOps
+
+def render_variants(data: bytes, variants: dict[str, tuple[int, int]]) -> dict[str, bytes]:
+    """
+    Renders one WebP per variant (name -> (max_side, quality)).
+    Orientation from EXIF is applied to the pixels, then all metadata
+    (EXIF, GPS, XMP, ICC) is dropped from the output.
+    """
+    largest = max(side for side, _ in variants.values())
+
+    with Image.open(io.BytesIO(data)) as img:
+        # JPEG: let the decoder downscale (1/2, 1/4, 1/8) instead of decoding full size
+        img.draft("RGB", (largest, largest))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+        outputs = {}
+        # Largest first: each smaller variant is resized from the previous one
+        for name, (side, quality) in sorted(variants.items(), key=lambda v: -v[1][0]):
+            img.thumbnail((side, side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+            outputs[name] = buffer.getvalue()
+        return outputs
@@ -0,0 +1,225 @@
+# app/services/mail_transport.py
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+
+import aiosmtplib
+
+from app.services.graph_client import GraphClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingMail:
+    subject: str
+    recipients: list[str]
+    html_content: str
+
+
+class MailTransport(ABC):
+    """How rendered emails leave the system. Selected by MAIL_TRANSPORT."""
+
+    name = "base"
+
+    @abstractmethod
+    async def send(self, mail: OutgoingMail):
+        """Sends one mail; raises on failure."""
+
+    async def send_many(self, mails: list[OutgoingMail]) -> list[Exception | None]:
+        """Sends several mails; returns None or the error per mail."""
+        async def _one(mail):
+            try:
+                await self.send(mail)
+                return None
+            except Exception as e:
+                return e
+        return list(await asyncio.gather(*(_one(m) for m in mails)))
+
+    def stats(self) -> dict:
+        return {}
+
+    async def aclose(self):
+        pass
+
+
+# --- 1. MICROSOFT GRAPH ---
+def build_graph_payload(mail: OutgoingMail) -> dict:
+    return {
+        "message": {
+            "subject": mail.subject,
+            "body": {
+                "contentType": "HTML",
+                "content": mail.html_content
+            },
+            "toRecipients": [{"emailAddress": {"address": email}} for email in mail.recipients]
+        },
+        "saveToSentItems": "true"
+    }
+
+
+class GraphMailTransport(MailTransport):
+    name = "graph"
+
+    def __init__(self, graph_client: GraphClient, sender: str):
+        self.graph_client = graph_client
+        self.sender = sender
+
+    async def send(self, mail: OutgoingMail):
+        await self.graph_client.send_mail(self.sender, build_graph_payload(mail))
+
+    async def send_many(self, mails: list[OutgoingMail]) -> list[Exception | None]:
+        # Graph JSON batching: 20 messages per round trip
+        return await self.graph_client.send_mail_batch(
+            self.sender, [build_graph_payload(m) for m in mails]
+        )
+
+    def stats(self) -> dict:
+        return self.graph_client.stats()
+
+
+# --- 2. SMTP ---
+class SmtpMailTransport(MailTransport):
+    """
+    SMTP with a small pool of persistent, authenticated connections.
+    Each connection is reused for many messages (no per-message
+    connect/TLS/AUTH); a dropped connection is re-opened on next use.
+    """
+
+    name = "smtp"
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str | None,
+        password: str | None,
+        sender: str,
+        sender_name: str | None = None,
+        use_tls: bool = False,
+        start_tls: bool | None = None,
+        pool_size: int = 4,
+        timeout_seconds: float = 30.0,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.sender_name = sender_name
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.pool_size = pool_size
+        self.timeout_seconds = timeout_seconds
+
+        self._pool: asyncio.Queue | None = None
+        self._connections: list[aiosmtplib.SMTP] = []
+
+        self.messages_sent = 0
+        self.messages_failed = 0
+        self.connects = 0
+        self.total_latency_seconds = 0.0
+
+    def _get_pool(self) -> asyncio.Queue:
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                smtp = aiosmtplib.SMTP(
+                    hostname=self.hostname,
+                    port=self.port,
+                    use_tls=self.use_tls,
+                    start_tls=False if self.use_tls else self.start_tls,
+                    timeout=self.timeout_seconds,
+                )
+                self._connections.append(smtp)
+                self._pool.put_nowait(smtp)
+        return self._pool
+
+    async def _ensure_connected(self, smtp: aiosmtplib.SMTP):
+        if smtp.is_connected:
+            return
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password or "")
+        self.connects += 1
+
+    def _build_message(self, mail: OutgoingMail) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((self.sender_name, self.sender)) if self.sender_name else self.sender
+        message["To"] = ", ".join(mail.recipients)
+        message["Subject"] = mail.subject
+        message.set_content("This message requires an HTML capable email client.")
+        message.add_alternative(mail.html_content, subtype="html")
+        return message
+
+    async def send(self, mail: OutgoingMail):
+        pool = self._get_pool()
+        smtp = await pool.get()
+        started = time.perf_counter()
+        clean = False
+        try:
+            for attempt in range(2):
+                try:
+                    await self._ensure_connected(smtp)
+                    await smtp.send_message(self._build_message(mail))
+                    self.messages_sent += 1
+                    clean = True
+                    return
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Server closed an idle connection: reconnect once
+                    if attempt == 1:
+                        raise
+                    smtp.close()
+        except Exception:
+            self.messages_failed += 1
+            raise
+        finally:
+            self.total_latency_seconds += time.perf_counter() - started
+            # Error, timeout, cancellation or failed login: the session may be
+            # mid-transaction or unauthenticated, so the next user reconnects
+            if not clean and smtp.is_connected:
+                smtp.close()
+            pool.put_nowait(smtp)
+
+    def stats(self) -> dict:
+        sent = self.messages_sent
+        return {
+            "messages_sent": sent,
+            "messages_failed": self.messages_failed,
+            "connects": self.connects,
+            "avg_latency_seconds": (self.total_latency_seconds / sent) if sent else 0.0,
+        }
+
+    async def aclose(self):
+        for smtp in self._connections:
+            if smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except aiosmtplib.SMTPException:
+                    smtp.close()
+        self._connections = []
+        self._pool = None
+
+
+def create_mail_transport(settings, graph_client: GraphClient, sender: str) -> MailTransport:
+    transport = settings.MAIL_TRANSPORT.lower()
+    if transport == "smtp":
+        return SmtpMailTransport(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            username=settings.MAIL_USERNAME,
+            password=settings.MAIL_PASSWORD,
+            sender=settings.MAIL_FROM,
+            sender_name=settings.MAIL_FROM_NAME,
+            use_tls=settings.MAIL_USE_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            pool_size=settings.SMTP_POOL_SIZE,
+            timeout_seconds=settings.SMTP_TIMEOUT_SECONDS,
+        )
+    if transport == "graph":
+        return GraphMailTransport(graph_client, sender)
+    raise ValueError(f"Unknown MAIL_TRANSPORT '{settings.MAIL_TRANSPORT}' (expected 'graph' or 'smtp')")
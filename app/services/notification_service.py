@@ -1,9 +1,60 @@
+import time
+import uuid
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.core.config import settings
+from app.core.metrics import NOTIFICATION_FANOUT
 from app.models.tasks import Notification, NotificationType, Task, TaskStatus
 from app.models.user import User
 from app.models.vessel import Vessel
 from app.models.defect import Defect, DefectStatus
+from app.services.fleet_registry import fleet_registry
+
+def current_coalesce_bucket(window_seconds: int) -> int:
+    """Index of the fixed time window the current moment falls into."""
+    return int(time.time() // window_seconds)
+
+async def upsert_coalesced_notifications(db: AsyncSession, rows: list[dict], window_seconds: int):
+    """
+    Inserts notifications, merging each into the open bucket for its
+    (user, defect) pair if one exists. A merged row keeps the latest
+    title/message/link, bumps event_count and is surfaced as new again.
+    """
+    if not rows:
+        return
+
+    bucket = current_coalesce_bucket(window_seconds)
+    now = datetime.utcnow()
+    values = [
+        {
+            **row,
+            "id": uuid.uuid4(),
+            "coalesce_bucket": bucket,
+            "event_count": 1,
+            "is_read": False,
+            "is_seen": False,
+            "created_at": now,
+        }
+        for row in rows
+    ]
+
+    stmt = pg_insert(Notification).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "defect_id", "coalesce_bucket"],
+        set_={
+            "title": stmt.excluded.title,
+            "message": stmt.excluded.message,
+            "link": stmt.excluded.link,
+            "type": stmt.excluded.type,
+            "event_count": Notification.event_count + 1,
+            "is_read": False,
+            "is_seen": False,
+            "created_at": stmt.excluded.created_at,
+        }
+    )
+    await db.execute(stmt)
 
 async def notify_vessel_users(
     db: AsyncSession, 
@@ -17,19 +68,19 @@ async def notify_vessel_users(
     # Fetch defect to check status
     defect = await db.get(Defect, defect_id)
     
-    stmt = select(User).join(User.vessels).where(
-        Vessel.imo == vessel_imo,
-        User.id != exclude_user_id,
-        User.is_active == True
-    )
-    result = await db.execute(stmt)
-    recipients = result.scalars().all()
+    # Roster comes from the in-memory fleet registry, not a join per event
+    roster = await fleet_registry.get_roster(vessel_imo, active_only=True)
+    recipients = [u for u in roster if str(u["id"]) != str(exclude_user_id)]
+    NOTIFICATION_FANOUT.labels("alert").observe(len(recipients))
 
     final_message = f"[{vessel_name}] {message}"
+    defect_uuid = uuid.UUID(str(defect_id))
+    window = settings.NOTIFICATION_COALESCE_WINDOW_SECONDS
+    coalesced_rows = []
 
     for recipient in recipients:
         # ✅ UPDATED: Route based on BOTH role AND defect status
-        if recipient.role == "VESSEL":
+        if recipient["role"] == "VESSEL":
             if defect and defect.status == DefectStatus.CLOSED:
                 target_link = f"/vessel/closed?highlightDefectId={defect_id}"
             else:
@@ -40,15 +91,30 @@ async def notify_vessel_users(
             else:
                 target_link = f"/shore/vessels?highlightDefectId={defect_id}"
 
+        if window > 0:
+            coalesced_rows.append({
+                "user_id": recipient["id"],
+                "defect_id": defect_uuid,
+                "type": NotificationType.ALERT,
+                "title": title,
+                "message": final_message,
+                "link": target_link
+            })
+            continue
+
         new_notif = Notification(
-            user_id=recipient.id,
+            user_id=recipient["id"],
             type=NotificationType.ALERT,
             title=title,
             message=final_message,
-            link=target_link
+            link=target_link,
+            defect_id=defect_uuid
         )
         db.add(new_notif)
 
+    # Bursty edits (escalate -> update -> close) collapse into one row per user
+    await upsert_coalesced_notifications(db, coalesced_rows, window)
+
 async def create_task_for_mentions(
     db: AsyncSession,
     defect_id: str,
@@ -62,6 +128,7 @@ async def create_task_for_mentions(
     stmt = select(User).where(User.id.in_(tagged_user_ids))
     result = await db.execute(stmt)
     tagged_users = result.scalars().all()
+    NOTIFICATION_FANOUT.labels("mention").observe(len(tagged_users))
 
     for user in tagged_users:
         # ✅ UPDATED: Route based on role AND status
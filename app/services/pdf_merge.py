@@ -0,0 +1,264 @@
+# app/services/pdf_merge.py
+"""
+Memory-bounded, resumable PDF merge engine.
+
+Inputs are validated in parallel, then merged in chunks of `chunk_size`
+files, each chunk written to its own part file by a worker process
+(pypdf holds one chunk at a time, so that phase is bounded by workers x
+chunk). The parts are joined with pikepdf/qpdf, which streams page
+content from the part files at save time instead of holding the whole
+output in memory, so the final phase stays flat too. A JSON
+manifest next to the output records validated files and finished chunks:
+re-running the same merge skips straight past completed work. Files that
+fail to parse are skipped and reported instead of aborting the run.
+
+Deliberately free of app settings/DB imports so the CLI
+(externalwork/pdfmerge.py) runs without any backend configuration.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable
+
+import pikepdf  # qpdf: copies page streams lazily from the source files
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class MergeResult:
+    outputs: list[str]
+    pages: int
+    files_merged: int
+    skipped: dict[str, str] = field(default_factory=dict)  # path -> reason
+    elapsed_seconds: float = 0.0
+    resumed_chunks: int = 0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+# --- 1. WORKER FUNCTIONS (run in the process pool) ---
+def inspect_pdf(path: str) -> tuple[str, int | None, str | None]:
+    """(path, page count, None) for a readable PDF, else (path, None, reason)."""
+    try:
+        reader = PdfReader(path, strict=False)
+        if reader.is_encrypted and not reader.decrypt(""):
+            return path, None, "encrypted"
+        pages = len(reader.pages)
+        if pages == 0:
+            return path, None, "no pages"
+        reader.pages[pages - 1]  # Forces the page tree to resolve end to end
+        return path, pages, None
+    except Exception as e:
+        return path, None, f"{e.__class__.__name__}: {e}"
+
+def build_chunk(paths: list[str], out_path: str) -> tuple[int, dict[str, str]]:
+    """
+    Writes one part file. Returns (pages, {path: reason} for inputs that
+    failed while copying). The part only appears once fully written.
+    """
+    writer = PdfWriter()
+    failed = {}
+    for path in paths:
+        before = len(writer.pages)
+        try:
+            writer.append(path)
+        except Exception as e:
+            # Roll back pages of a partially appended file
+            while len(writer.pages) > before:
+                writer.remove_page(len(writer.pages) - 1)
+            failed[path] = f"{e.__class__.__name__}: {e}"
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        writer.write(f)
+    pages = len(writer.pages)
+    writer.close()
+    os.replace(tmp_path, out_path)
+    return pages, failed
+
+def concatenate_pdfs(paths: list[str], output_path: str) -> int:
+    """
+    Joins already-clean PDFs in order. Page content is streamed from the
+    inputs at save time, so memory stays flat however large the output.
+    """
+    tmp_path = f"{output_path}.tmp"
+    sources = []
+    try:
+        with pikepdf.Pdf.new() as out:
+            for path in paths:
+                src = pikepdf.Pdf.open(path)
+                sources.append(src)
+                out.pages.extend(src.pages)
+            pages = len(out.pages)
+            out.save(tmp_path)
+    finally:
+        for src in sources:
+            src.close()
+    os.replace(tmp_path, output_path)
+    return pages
+
+
+# --- 2. MANIFEST ---
+def fingerprint(inputs: list[str], chunk_size: int) -> str:
+    """Identifies a run: same files (path, size, mtime), order and chunking."""
+    digest = hashlib.sha256(f"v{MANIFEST_VERSION}:{chunk_size}".encode())
+    for path in inputs:
+        stat = os.stat(path)
+        digest.update(f"\n{path}|{stat.st_size}|{int(stat.st_mtime)}".encode())
+    return digest.hexdigest()
+
+def load_manifest(path: str, expected_fingerprint: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("fingerprint") != expected_fingerprint:
+        logger.info("📋 Manifest belongs to a different input set, starting fresh")
+        return None
+    return manifest
+
+def save_manifest(path: str, manifest: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --- 3. ENGINE ---
+def _volume_name(output_path: str, index: int) -> str:
+    stem, ext = os.path.splitext(output_path)
+    return f"{stem}_{index:03d}{ext or '.pdf'}"
+
+def merge_pdfs(
+    inputs: list[str],
+    output_path: str,
+    chunk_size: int = 50,
+    workers: int | None = None,
+    volume_pages: int | None = None,
+    resume: bool = True,
+    keep_parts: bool = False,
+    progress: Callable[[str], None] | None = None,
+) -> MergeResult:
+    """
+    Merges `inputs` (in the given order) into `output_path`, or into
+    output_001.pdf, output_002.pdf ... of roughly `volume_pages` pages each.
+    """
+    report = progress or (lambda message: logger.info(message))
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 2
+
+    parts_dir = f"{output_path}.parts"
+    manifest_path = f"{output_path}.manifest.json"
+    os.makedirs(parts_dir, exist_ok=True)
+
+    run_id = fingerprint(inputs, chunk_size)
+    manifest = load_manifest(manifest_path, run_id) if resume else None
+    if manifest is None:
+        manifest = {"version": MANIFEST_VERSION, "fingerprint": run_id, "files": {}, "chunks": {}}
+
+    skipped: dict[str, str] = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Phase 1: validate (parallel), reusing results from an interrupted run
+        pending = [p for p in inputs if p not in manifest["files"]]
+        if pending:
+            report(f"🔍 Validating {len(pending)} PDFs with {workers} workers...")
+            futures = [pool.submit(inspect_pdf, p) for p in pending]
+            for i, future in enumerate(as_completed(futures), 1):
+                path, pages, error = future.result()
+                manifest["files"][path] = {"pages": pages} if error is None else {"error": error}
+                if i % 500 == 0:
+                    save_manifest(manifest_path, manifest)
+            save_manifest(manifest_path, manifest)
+
+        good = []
+        for path in inputs:
+            entry = manifest["files"][path]
+            if "error" in entry:
+                skipped[path] = entry["error"]
+            else:
+                good.append(path)
+        if skipped:
+            report(f"⚠️ Skipping {len(skipped)} unreadable PDFs")
+
+        # Phase 2: build chunk parts (parallel), skipping finished ones
+        chunks = [good[i:i + chunk_size] for i in range(0, len(good), chunk_size)]
+        part_paths = [os.path.join(parts_dir, f"chunk_{i:05d}.pdf") for i in range(len(chunks))]
+
+        resumed = 0
+        futures = {}
+        for i, (files, part_path) in enumerate(zip(chunks, part_paths)):
+            done = manifest["chunks"].get(str(i))
+            if done and os.path.exists(part_path):
+                resumed += 1
+                continue
+            futures[pool.submit(build_chunk, files, part_path)] = i
+        if resumed:
+            report(f"⏩ Resuming: {resumed}/{len(chunks)} chunks already merged")
+
+        pages_done = sum(c["pages"] for c in manifest["chunks"].values())
+        for future in as_completed(futures):
+            i = futures[future]
+            pages, failed = future.result()
+            skipped.update(failed)
+            manifest["chunks"][str(i)] = {"pages": pages, "failed": failed}
+            save_manifest(manifest_path, manifest)
+
+            pages_done += pages
+            rate = pages_done / (time.perf_counter() - started)
+            report(f"✅ Chunk {len(manifest['chunks'])}/{len(chunks)}: {pages_done} pages ({rate:.0f} pages/s)")
+
+        for entry in manifest["chunks"].values():
+            skipped.update(entry.get("failed", {}))
+
+        # Phase 3: assemble the output file(s) from the parts, in order
+        chunk_pages = [manifest["chunks"][str(i)]["pages"] for i in range(len(chunks))]
+        groups: list[list[str]] = [[]]
+        group_pages = 0
+        for part_path, pages in zip(part_paths, chunk_pages):
+            if volume_pages and groups[-1] and group_pages + pages > volume_pages:
+                groups.append([])
+                group_pages = 0
+            groups[-1].append(part_path)
+            group_pages += pages
+
+        outputs = [output_path] if len(groups) == 1 else [_volume_name(output_path, i + 1) for i in range(len(groups))]
+        total_pages = 0
+        if good:
+            report(f"📎 Writing {len(outputs)} output file(s)...")
+            for pages in pool.map(concatenate_pdfs, groups, outputs):
+                total_pages += pages
+        else:
+            outputs = []
+
+    if not keep_parts:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        try:
+            os.remove(manifest_path)
+        except OSError:
+            pass
+
+    result = MergeResult(
+        outputs=outputs,
+        pages=total_pages,
+        files_merged=len(good) - len(skipped.keys() & set(good)),
+        skipped=skipped,
+        elapsed_seconds=time.perf_counter() - started,
+        resumed_chunks=resumed,
+    )
+    report(
+        f"🏁 Merged {result.files_merged} PDFs, {result.pages} pages in "
+        f"{result.elapsed_seconds:.1f}s ({result.pages_per_second:.0f} pages/s), {len(skipped)} skipped"
+    )
+    return result
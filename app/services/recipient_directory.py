@@ -0,0 +1,140 @@
+# app/services/recipient_directory.py
+import asyncio
+import logging
+import re
+import time
+from sqlalchemy import union_all, cast, null, String, Integer
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.models.vessel import Vessel
+from app.models.enums import UserRole
+
+logger = logging.getLogger(__name__)
+
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+BLOCKED_DOMAINS = {"example.com", "test.com", "localhost"}
+
+def is_valid_email(email: str) -> bool:
+    if not email: return False
+    if not EMAIL_REGEX.match(email): return False
+    if email.split('@')[-1] in BLOCKED_DOMAINS: return False
+    return True
+
+def resolve_digest_minutes(role: str | None, user_minutes: int | None) -> int:
+    """Per-user override wins, otherwise the role default. 0 = send immediately."""
+    if user_minutes is not None:
+        return max(0, user_minutes)
+    if role is None:
+        return 0
+    return max(0, settings.EMAIL_DIGEST_ROLE_MINUTES.get(role, 0))
+
+def _merge(*profiles: dict[str, int]) -> dict[str, int]:
+    # Same address via several routes: the most urgent delivery wins
+    merged: dict[str, int] = {}
+    for profile in profiles:
+        for email, minutes in profile.items():
+            merged[email] = min(minutes, merged.get(email, minutes))
+    return merged
+
+
+class RecipientDirectory:
+    """
+    Cache of validated, de-duplicated email recipients per vessel IMO,
+    each with its resolved digest interval in minutes.
+
+    The ADMIN/SHORE set is shared by every vessel and loaded once. Entries
+    are dropped by invalidate() when users, vessels or assignments change
+    in this process; the TTL bounds staleness for changes made elsewhere
+    (other API workers, the standalone email worker).
+    """
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._vessels: dict[str, tuple[float, dict[str, int]]] = {}
+        self._shore: tuple[float, dict[str, int]] | None = None
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._generation = 0  # Bumped by invalidate(): loads that straddle it are not cached
+
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and time.monotonic() - entry[0] < self.ttl_seconds
+
+    @staticmethod
+    def _to_profile(rows) -> dict[str, int]:
+        return _merge(*(
+            {email: resolve_digest_minutes(role, minutes)}
+            for email, role, minutes in rows if is_valid_email(email)
+        ))
+
+    async def _load_vessel(self, db, vessel_imo: str) -> dict[str, int]:
+        # Vessel mailbox + active assigned users in one round trip
+        stmt = union_all(
+            select(Vessel.email, cast(null(), String), cast(null(), Integer)).where(Vessel.imo == vessel_imo),
+            select(User.email, User.role, User.email_digest_minutes).join(User.vessels).where(
+                Vessel.imo == vessel_imo,
+                User.is_active == True
+            )
+        )
+        result = await db.execute(stmt)
+        return self._to_profile(result.all())
+
+    async def _load_shore(self, db) -> dict[str, int]:
+        target_roles = [UserRole.ADMIN.value, UserRole.SHORE.value]
+        stmt = select(User.email, User.role, User.email_digest_minutes).where(
+            User.role.in_(target_roles), User.is_active == True
+        )
+        result = await db.execute(stmt)
+        return self._to_profile(result.all())
+
+    async def get_recipients(self, vessel_imo: str) -> list[str]:
+        return sorted(await self.get_recipient_profiles(vessel_imo))
+
+    async def get_recipient_profiles(self, vessel_imo: str) -> dict[str, int]:
+        """Maps each recipient address to its digest interval (0 = immediate)."""
+        # Entries are read into locals: invalidate() may clear the cache at any await
+        vessel_entry, shore_entry = self._vessels.get(vessel_imo), self._shore
+        if self._fresh(vessel_entry) and self._fresh(shore_entry):
+            self.hits += 1
+            return _merge(vessel_entry[1], shore_entry[1])
+
+        # Single flight per vessel: a burst of events waits on one load
+        lock = self._locks.setdefault(vessel_imo, asyncio.Lock())
+        async with lock:
+            vessel_entry, shore_entry = self._vessels.get(vessel_imo), self._shore
+            if not (self._fresh(vessel_entry) and self._fresh(shore_entry)):
+                self.misses += 1
+                generation = self._generation
+                async with SessionLocal() as db:
+                    if not self._fresh(shore_entry):
+                        shore_entry = (time.monotonic(), await self._load_shore(db))
+                    if not self._fresh(vessel_entry):
+                        vessel_entry = (time.monotonic(), await self._load_vessel(db, vessel_imo))
+                # An invalidate() during the load means it may predate the change:
+                # use it for this call, but let the next one load again
+                if generation == self._generation:
+                    self._shore = shore_entry
+                    self._vessels[vessel_imo] = vessel_entry
+            else:
+                self.hits += 1
+
+        return _merge(vessel_entry[1], shore_entry[1])
+
+    def invalidate(self, vessel_imo: str | None = None):
+        """Drops one vessel's entry, or everything (incl. the shore set)."""
+        self._generation += 1
+        if vessel_imo is None:
+            self._vessels.clear()
+            self._shore = None
+        else:
+            self._vessels.pop(vessel_imo, None)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "vessels_cached": len(self._vessels)}
+
+
+recipient_directory = RecipientDirectory(ttl_seconds=settings.RECIPIENT_CACHE_TTL_SECONDS)
@@ -0,0 +1,176 @@
+# app/services/report_render.py
+"""
+PDF rendering for defect reports, run inside the "reports" process pool.
+Works on plain dicts (no ORM / settings imports) and writes to file paths so
+large PDFs never travel back through the pool's pipes.
+"""
+import io
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import mm
+from reportlab.platypus import (
+    SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Image, KeepTogether
+)
+
+from app.services.pdf_merge import concatenate_pdfs
+
+PRIORITY_COLORS = {
+    "CRITICAL": colors.HexColor("#dc2626"),
+    "HIGH": colors.HexColor("#ea580c"),
+    "MEDIUM": colors.HexColor("#ca8a04"),
+    "NORMAL": colors.HexColor("#2563eb"),
+    "LOW": colors.HexColor("#16a34a"),
+}
+THUMB_BOX = 38 * mm
+PAGE_MARGIN = 15 * mm
+FRAME_WIDTH = A4[0] - 2 * PAGE_MARGIN
+THUMB_COLUMN = THUMB_BOX + 4 * mm
+THUMBS_PER_ROW = int(FRAME_WIDTH // THUMB_COLUMN)  # 4 on A4: more would be drawn off the page
+
+_styles = getSampleStyleSheet()
+STYLE_TITLE = _styles["Title"]
+STYLE_H2 = _styles["Heading2"]
+STYLE_H3 = _styles["Heading3"]
+STYLE_BODY = _styles["BodyText"]
+STYLE_SMALL = ParagraphStyle("Small", parent=STYLE_BODY, fontSize=8, leading=10, textColor=colors.HexColor("#475569"))
+STYLE_CELL = ParagraphStyle("Cell", parent=STYLE_BODY, fontSize=9, leading=11)
+
+
+def _p(text, style=STYLE_BODY) -> Paragraph:
+    # Paragraph parses mini-HTML: user text must be escaped, newlines kept
+    return Paragraph(escape(str(text or "-")).replace("\n", "<br/>"), style)
+
+def _thumb(data: bytes | None):
+    if not data:
+        return None
+    try:
+        return Image(io.BytesIO(data), width=THUMB_BOX, height=THUMB_BOX, kind="proportional")
+    except Exception:
+        return None
+
+def _thumb_row(images: list[tuple[str, bytes | None]]):
+    cells = []
+    for label, data in images:
+        img = _thumb(data)
+        if img:
+            cells.append([img, _p(label, STYLE_SMALL)])
+    if not cells:
+        return None
+    # Wrap into rows of THUMBS_PER_ROW: image row, then its label row
+    columns = min(len(cells), THUMBS_PER_ROW)
+    rows = []
+    for i in range(0, len(cells), columns):
+        group = cells[i:i + columns]
+        group += [["", ""]] * (columns - len(group))
+        rows += [[c[0] for c in group], [c[1] for c in group]]
+    table = Table(rows, colWidths=[THUMB_COLUMN] * columns, hAlign="LEFT")
+    table.setStyle(TableStyle([("VALIGN", (0, 0), (-1, -1), "TOP")]))
+    return table
+
+def _footer(title: str):
+    def draw(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 7)
+        canvas.setFillColor(colors.HexColor("#64748b"))
+        canvas.drawString(15 * mm, 10 * mm, title)
+        canvas.drawRightString(A4[0] - 15 * mm, 10 * mm, f"Page {doc.page}")
+        canvas.restoreState()
+    return draw
+
+def _doc(path: str, title: str) -> SimpleDocTemplate:
+    return SimpleDocTemplate(
+        path, pagesize=A4, title=title,
+        leftMargin=PAGE_MARGIN, rightMargin=PAGE_MARGIN, topMargin=15 * mm, bottomMargin=18 * mm
+    )
+
+def _defect_story(defect: dict) -> list:
+    story = []
+    priority = defect.get("priority") or "NORMAL"
+
+    header = Table(
+        [[_p(f"{defect['vessel_name']} ({defect['vessel_imo']})", STYLE_SMALL), _p(priority, STYLE_SMALL)]],
+        colWidths=[140 * mm, 40 * mm]
+    )
+    header.setStyle(TableStyle([
+        ("BACKGROUND", (1, 0), (1, 0), PRIORITY_COLORS.get(priority, colors.grey)),
+        ("TEXTCOLOR", (1, 0), (1, 0), colors.white),
+    ]))
+    story += [header, _p(defect["title"], STYLE_H2)]
+
+    fields = [
+        ("Equipment", defect.get("equipment_name")),
+        ("Status", defect.get("status")),
+        ("Source", defect.get("defect_source")),
+        ("Responsibility", defect.get("responsibility")),
+        ("PR Status", defect.get("pr_status")),
+        ("Identified", defect.get("date_identified")),
+        ("Target Close", defect.get("target_close_date")),
+        ("Closed", defect.get("closed_at")),
+    ]
+    table = Table([[_p(k, STYLE_CELL), _p(v, STYLE_CELL)] for k, v in fields], colWidths=[35 * mm, 145 * mm])
+    table.setStyle(TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1")),
+        ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#f1f5f9")),
+    ]))
+    story += [table, Spacer(1, 4 * mm), _p("Description", STYLE_H3), _p(defect.get("description"))]
+
+    if defect.get("closure_remarks"):
+        story += [_p("Closure Remarks", STYLE_H3), _p(defect["closure_remarks"])]
+
+    if defect.get("pr_entries"):
+        rows = [[_p("PR Number", STYLE_CELL), _p("Description", STYLE_CELL)]]
+        rows += [[_p(pr["pr_number"], STYLE_CELL), _p(pr.get("pr_description"), STYLE_CELL)] for pr in defect["pr_entries"]]
+        pr_table = Table(rows, colWidths=[40 * mm, 140 * mm])
+        pr_table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1"))]))
+        story += [_p("Purchase Requisitions", STYLE_H3), pr_table]
+
+    images = _thumb_row(defect.get("images", []))
+    if images:
+        story += [_p("Images", STYLE_H3), images]
+
+    if defect.get("threads"):
+        story.append(_p("History", STYLE_H3))
+        for thread in defect["threads"]:
+            block = [_p(f"{thread['created_at']} - {thread['author']}", STYLE_SMALL), _p(thread["body"])]
+            thumbs = _thumb_row(thread.get("images", []))
+            if thumbs:
+                block.append(thumbs)
+            if thread.get("files"):
+                block.append(_p("Attachments: " + ", ".join(thread["files"]), STYLE_SMALL))
+            block.append(Spacer(1, 2 * mm))
+            story.append(KeepTogether(block))
+    return story
+
+def render_defects_pdf(defects: list[dict], report_title: str, path: str) -> tuple[str, int]:
+    """Renders one part: each defect starts on a new page. Returns (path, defect count)."""
+    story = []
+    for i, defect in enumerate(defects):
+        if i:
+            story.append(PageBreak())
+        story += _defect_story(defect)
+    _doc(path, report_title).build(story, onFirstPage=_footer(report_title), onLaterPages=_footer(report_title))
+    return path, len(defects)
+
+def render_cover_pdf(meta: dict, path: str) -> str:
+    """Cover page: scope, generation time and a per-status / per-priority summary."""
+    story = [
+        Spacer(1, 40 * mm),
+        _p(meta["title"], STYLE_TITLE),
+        _p(f"Generated {meta['generated_at']} - {meta['defect_count']} defects", STYLE_SMALL),
+        Spacer(1, 10 * mm),
+    ]
+    for heading, counts in (("By Status", meta["by_status"]), ("By Priority", meta["by_priority"])):
+        if counts:
+            rows = [[_p(k, STYLE_CELL), _p(v, STYLE_CELL)] for k, v in counts.items()]
+            table = Table(rows, colWidths=[60 * mm, 30 * mm], hAlign="LEFT")
+            table.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#cbd5e1"))]))
+            story += [_p(heading, STYLE_H3), table]
+    _doc(path, meta["title"]).build(story)
+    return path
+
+def merge_pdf_files(paths: list[str], output_path: str) -> int:
+    """Concatenates rendered parts in order. Returns the page count."""
+    return concatenate_pdfs(paths, output_path)
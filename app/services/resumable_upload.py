@@ -0,0 +1,71 @@
+# app/services/resumable_upload.py
+import base64
+import logging
+import math
+import re
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobBlock, ContentSettings
+
+from app.core.blob_storage import get_container_client
+
+logger = logging.getLogger(__name__)
+
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+def upload_blob_path(prefix: str, attachment_id, file_name: str) -> str:
+    """
+    Server-chosen destination for a block upload: a fresh directory per
+    attachment under the defect's prefix, so a session can never commit
+    over an existing blob (another attachment, a report, cas/ content).
+    """
+    name = UNSAFE_NAME_CHARS.sub("_", file_name.replace("\\", "/").rsplit("/", 1)[-1]).strip("._")
+    return f"{prefix}/attachments/{attachment_id}/{name[-120:] or 'file'}"
+
+# Azure requires every block id of a blob to have the same length
+def block_id(index: int) -> str:
+    """Raw block id for block `index` (the SDK base64-encodes it on the wire)."""
+    return f"{index:08d}"
+
+def encoded_block_id(index: int) -> str:
+    """The `blockid` value a client puts in `?comp=block&blockid=...`."""
+    return base64.b64encode(block_id(index).encode()).decode()
+
+def block_count(file_size: int, block_size: int) -> int:
+    return max(1, math.ceil(file_size / block_size))
+
+async def list_uploaded_blocks(blob_path: str) -> dict[int, int]:
+    """
+    Maps block index -> size for every block staged (uncommitted) on the
+    blob so far. Blocks with ids we did not issue are ignored.
+    """
+    container = await get_container_client()
+    try:
+        _, uncommitted = await container.get_blob_client(blob_path).get_block_list("uncommitted")
+    except ResourceNotFoundError:
+        # Nothing staged yet
+        return {}
+
+    uploaded = {}
+    for block in uncommitted:
+        if block.id and block.id.isdigit() and len(block.id) == 8:
+            uploaded[int(block.id)] = block.size
+    return uploaded
+
+def missing_blocks(uploaded: dict[int, int], file_size: int, block_size: int) -> list[int]:
+    """Indexes still to upload (absent or with an unexpected size)."""
+    count = block_count(file_size, block_size)
+    missing = []
+    for index in range(count):
+        expected = block_size if index < count - 1 else file_size - block_size * (count - 1)
+        if uploaded.get(index) != expected:
+            missing.append(index)
+    return missing
+
+async def commit_blocks(blob_path: str, count: int, content_type: str | None = None):
+    """Put Block List: turns the staged blocks 0..count-1 into the final blob."""
+    container = await get_container_client()
+    await container.get_blob_client(blob_path).commit_block_list(
+        [BlobBlock(block_id=block_id(i)) for i in range(count)],
+        content_settings=ContentSettings(content_type=content_type) if content_type else None
+    )
+    logger.info(f"✅ Committed {count} blocks to {blob_path}")
@@ -0,0 +1,88 @@
+# app/services/thread_pages.py
+from dataclasses import dataclass
+from uuid import UUID
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from app.models.defect import Thread
+from app.models.user import User
+from app.schemas.defect import ThreadResponse
+from app.services.image_derivatives import sign_attachments
+
+
+class InvalidCursor(ValueError):
+    """The cursor thread does not exist or belongs to another defect."""
+
+
+@dataclass
+class ThreadPage:
+    threads: list[ThreadResponse]  # Oldest first
+    older_cursor: UUID | None      # Pass as before= to load the previous page
+    newer_cursor: UUID | None      # Pass as after= while more new messages remain
+
+
+async def _anchor(db: AsyncSession, defect_id: UUID, thread_id: UUID):
+    result = await db.execute(
+        select(Thread.created_at, Thread.id).where(Thread.id == thread_id, Thread.defect_id == defect_id)
+    )
+    row = result.first()
+    if row is None:
+        raise InvalidCursor(f"Unknown cursor {thread_id}")
+    return tuple(row)
+
+async def fetch_thread_page(
+    db: AsyncSession,
+    defect_id: UUID,
+    limit: int,
+    before: UUID | None = None,
+    after: UUID | None = None,
+) -> ThreadPage:
+    """
+    Keyset page over (created_at, id), served by ix_threads_defect_created:
+    - no cursor: the latest `limit` messages
+    - before=<id>: the `limit` messages older than that one
+    - after=<id>: up to `limit` messages newer than that one (polling)
+    Author names come from a join on users; attachments from one IN query.
+    """
+    key = tuple_(Thread.created_at, Thread.id)
+    query = select(Thread, User.full_name)\
+            .join(User, Thread.user_id == User.id)\
+            .where(Thread.defect_id == defect_id)\
+            .options(selectinload(Thread.attachments))\
+            .limit(limit + 1)
+
+    if after is not None:
+        query = query.where(key > tuple_(*await _anchor(db, defect_id, after)))\
+                     .order_by(Thread.created_at.asc(), Thread.id.asc())
+    else:
+        if before is not None:
+            query = query.where(key < tuple_(*await _anchor(db, defect_id, before)))
+        query = query.order_by(Thread.created_at.desc(), Thread.id.desc())
+
+    rows = (await db.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None:
+        rows.reverse()
+    sign_attachments(a for thread, _ in rows for a in thread.attachments)
+
+    threads = [
+        ThreadResponse(
+            id=thread.id,
+            defect_id=thread.defect_id,
+            author_role=full_name or thread.author_role,
+            body=thread.body,
+            created_at=thread.created_at,
+            user_id=thread.user_id,
+            is_system_message=bool(thread.is_system_message),
+            tagged_user_ids=thread.tagged_user_ids or [],
+            attachments=thread.attachments,
+        )
+        for thread, full_name in rows
+    ]
+
+    older_cursor = threads[0].id if threads and has_more and after is None else None
+    newer_cursor = threads[-1].id if threads and has_more and after is not None else None
+    return ThreadPage(threads=threads, older_cursor=older_cursor, newer_cursor=newer_cursor)
@@ -0,0 +1,189 @@
+# app/services/thread_sync.py
+import logging
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.defect import Defect, Thread, Attachment
+from app.models.user import User
+from app.models.enums import UserRole
+from app.schemas.defect import ThreadSyncItem, ThreadSyncResult, SyncItemResult
+from app.services.blob_dedup import normalize_sha256, attach_content, release_reference, ContentPathMismatch
+from app.services.notification_service import create_task_for_mentions
+
+logger = logging.getLogger(__name__)
+
+MAX_DIRECT_ATTACHMENT_BYTES = 1024 * 1024  # Same 1MB rule as POST /defects/attachments
+INSERT_CHUNK_ROWS = 1000                   # Keeps each statement well under asyncpg's bind limit
+
+CREATED = "created"
+EXISTING = "existing"
+REJECTED = "rejected"
+CONFLICT = "conflict"  # The id is taken by a thread that isn't this one: pick a new id
+
+
+async def _insert_ignore(db: AsyncSession, model, rows: list[dict]) -> set[UUID]:
+    """Multi-row INSERT ... ON CONFLICT (id) DO NOTHING; returns the ids actually inserted."""
+    inserted: set[UUID] = set()
+    for i in range(0, len(rows), INSERT_CHUNK_ROWS):
+        stmt = pg_insert(model).values(rows[i:i + INSERT_CHUNK_ROWS])\
+               .on_conflict_do_nothing(index_elements=[model.id])\
+               .returning(model.id)
+        result = await db.execute(stmt)
+        inserted.update(result.scalars().all())
+    return inserted
+
+def _attachment_error(item) -> str | None:
+    """Same rules as POST /defects/attachments, reported instead of raised."""
+    if item.file_size and item.file_size > MAX_DIRECT_ATTACHMENT_BYTES:
+        return "exceeds 1MB limit, use /attachments/uploads"
+    if item.content_sha256:
+        try:
+            normalize_sha256(item.content_sha256)
+        except ValueError as e:
+            return str(e)
+        if not item.file_size:
+            return "file_size is required with content_sha256"
+    return None
+
+async def sync_threads(
+    db: AsyncSession,
+    items: list[ThreadSyncItem],
+    current_user: User
+) -> tuple[list[ThreadSyncResult], list[Attachment]]:
+    """
+    Idempotent replay of offline threads + attachments, all in the
+    caller's transaction: one defect lookup, one multi-row insert per
+    table, mention tasks only for threads that are new. Returns the
+    per-item results and the newly inserted attachments.
+    """
+    # 1. One lookup for every referenced defect
+    defect_ids = {item.defect_id for item in items}
+    result = await db.execute(select(Defect).where(Defect.id.in_(defect_ids)))
+    defects = {d.id: d for d in result.scalars().all()}
+    authorized_imos = (
+        {v.imo for v in current_user.vessels} if current_user.role == UserRole.VESSEL else None
+    )
+
+    # One multi-row INSERT would give every thread the same now(): step a
+    # microsecond per row so the (created_at, id) page order is the request order
+    now = datetime.now(timezone.utc)
+    results: dict[UUID, ThreadSyncResult] = {}
+    thread_rows, accepted = [], []
+    for item in items:
+        defect = defects.get(item.defect_id)
+        error = None
+        if item.id in results:
+            error = "duplicate id in request"
+        elif not defect or defect.is_deleted:
+            error = "defect not found"
+        elif authorized_imos is not None and defect.vessel_imo not in authorized_imos:
+            error = "not authorized for this vessel"
+        if error:
+            results.setdefault(item.id, ThreadSyncResult(id=item.id, status=REJECTED, error=error))
+            continue
+
+        accepted.append(item)
+        results[item.id] = ThreadSyncResult(id=item.id, status=EXISTING)
+        thread_rows.append({
+            "id": item.id,
+            "defect_id": item.defect_id,
+            "user_id": current_user.id,
+            "author_role": item.author,
+            "body": item.body,
+            "is_system_message": False,
+            "tagged_user_ids": item.tagged_user_ids,
+            "created_at": now + timedelta(microseconds=len(thread_rows)),
+        })
+
+    # 2. Threads: one multi-row upsert
+    created_threads = await _insert_ignore(db, Thread, thread_rows) if thread_rows else set()
+    for thread_id in created_threads:
+        results[thread_id].status = CREATED
+
+    # An id that already existed must be this user's thread on the same
+    # defect: otherwise a replay would report someone else's thread as
+    # "already synced" and hang its attachments on it
+    existing_ids = {item.id for item in accepted} - created_threads
+    if existing_ids:
+        result = await db.execute(
+            select(Thread.id, Thread.defect_id, Thread.user_id).where(Thread.id.in_(existing_ids))
+        )
+        owners = {thread_id: (defect_id, user_id) for thread_id, defect_id, user_id in result.all()}
+        for item in accepted:
+            if item.id not in existing_ids:
+                continue
+            defect_id, user_id = owners.get(item.id, (None, None))
+            if defect_id != item.defect_id:
+                results[item.id] = ThreadSyncResult(id=item.id, status=CONFLICT, error="id belongs to another defect")
+            elif user_id != current_user.id:
+                results[item.id] = ThreadSyncResult(id=item.id, status=CONFLICT, error="id belongs to another user's thread")
+        accepted = [item for item in accepted if results[item.id].status != CONFLICT]
+
+    # 3. Attachments of accepted threads (new or already on the server)
+    attachment_rows, attachment_items = [], {}
+    for item in accepted:
+        for att in item.attachments:
+            error = _attachment_error(att)
+            if att.id in attachment_items:
+                error = "duplicate id in request"
+            sha = None
+            if not error:
+                # Content hashes must exist in blob_contents before the FK'd rows go in
+                try:
+                    sha = await attach_content(
+                        db, normalize_sha256(att.content_sha256) if att.content_sha256 else None,
+                        att.blob_path, att.file_size, att.content_type
+                    )
+                except ContentPathMismatch as e:
+                    error = str(e)
+            if error:
+                results[item.id].attachments.append(SyncItemResult(id=att.id, status=REJECTED, error=error))
+                continue
+            attachment_items[att.id] = (item.id, att, sha)
+            attachment_rows.append({
+                "id": att.id,
+                "thread_id": item.id,
+                "file_name": att.file_name,
+                "file_size": att.file_size,
+                "content_type": att.content_type,
+                "blob_path": att.blob_path,
+                "content_sha256": sha,
+            })
+
+    created_attachments = await _insert_ignore(db, Attachment, attachment_rows) if attachment_rows else set()
+
+    # Re-sent attachments must not count twice: give their references back
+    for attachment_id, (_, att, sha) in attachment_items.items():
+        if sha and attachment_id not in created_attachments:
+            await release_reference(db, sha)
+
+    for attachment_id, (thread_id, _, _) in attachment_items.items():
+        status = CREATED if attachment_id in created_attachments else EXISTING
+        results[thread_id].attachments.append(SyncItemResult(id=attachment_id, status=status))
+
+    # 4. Mentions only for threads that did not exist yet
+    for item in accepted:
+        if item.id in created_threads and item.tagged_user_ids:
+            await create_task_for_mentions(
+                db=db,
+                defect_id=item.defect_id,
+                defect_title=defects[item.defect_id].title,
+                creator_id=current_user.id,
+                tagged_user_ids=item.tagged_user_ids
+            )
+
+    new_attachments = []
+    if created_attachments:
+        result = await db.execute(select(Attachment).where(Attachment.id.in_(created_attachments)))
+        new_attachments = list(result.scalars().all())
+
+    ordered = []
+    seen = set()
+    for item in items:
+        if item.id not in seen:
+            seen.add(item.id)
+            ordered.append(results[item.id])
+    return ordered, new_attachments
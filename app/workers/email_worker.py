@@ -0,0 +1,38 @@
+# app/workers/email_worker.py
+"""
+Standalone email outbox worker.
+
+    python -m app.workers.email_worker
+
+Run as many replicas as needed; rows are claimed with SKIP LOCKED so
+workers never send the same email twice. Set EMAIL_WORKER_EMBEDDED=false
+on the API when workers run separately.
+"""
+import asyncio
+import logging
+import signal
+
+from app.core.log_config import setup_logging, shutdown_logging
+from app.services.email_outbox import OutboxWorker
+from app.services.email_service import token_provider, graph_client, mail_transport
+
+async def main():
+    worker = OutboxWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await worker.run()
+    finally:
+        await mail_transport.aclose()
+        await graph_client.aclose()
+        await token_provider.aclose()
+        shutdown_logging()
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main())
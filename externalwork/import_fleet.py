@@ -0,0 +1,72 @@
+"""
+Bulk-create vessels, users and their vessel assignments from CSV / JSON.
+
+    python externalwork/import_fleet.py vessels.csv users.csv --dry-run
+    python externalwork/import_fleet.py onboarding.json --allow-partial
+
+Same rules as POST /api/v1/users/import: every row is validated first,
+existing emails / IMOs are reported and skipped (re-runs are safe), and
+unless --allow-partial any error means nothing is written. Running API
+workers pick the new users up within FLEET_CACHE_TTL_SECONDS.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add the project root so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal
+from app.core.process_pools import shutdown_process_pools
+from app.models import defect, tasks  # noqa: F401  (registers every mapper relationship)
+from app.services.bulk_import import parse_import_file, import_fleet, ImportFileError
+
+
+async def run(paths: list[str], dry_run: bool, allow_partial: bool) -> int:
+    vessel_rows, user_rows = [], []
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        try:
+            vessels, users = parse_import_file(os.path.basename(path), content)
+        except ImportFileError as e:
+            print(f"❌ {e}")
+            return 1
+        vessel_rows += vessels
+        user_rows += users
+
+    print(f"📚 {len(vessel_rows)} vessel rows, {len(user_rows)} user rows")
+    async with SessionLocal() as db:
+        report = await import_fleet(db, vessel_rows, user_rows, dry_run=dry_run, allow_partial=allow_partial)
+        if report.imported:
+            await db.commit()
+
+    for row in report.rows:
+        if row.status == "error":
+            print(f"❌ {row.kind} row {row.row} ({row.key or '-'}): {row.error}")
+    if report.imported:
+        print(
+            f"✅ Created {report.vessels_created} vessels, {report.users_created} users, "
+            f"{report.assignments_created} assignments in {report.elapsed_seconds}s"
+        )
+    elif dry_run:
+        print(f"🔍 Dry run: {report.errors} errors, nothing written")
+    else:
+        print(f"⚠️ {report.errors} errors, nothing written (fix the file or use --allow-partial)")
+    return 0 if report.errors == 0 else 1
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk user / vessel import")
+    parser.add_argument("files", nargs="+", help="users.csv, vessels.csv or a JSON file")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing")
+    parser.add_argument("--allow-partial", action="store_true", help="Import valid rows even if some rows fail")
+    args = parser.parse_args()
+    try:
+        return asyncio.run(run(args.files, args.dry_run, args.allow_partial))
+    finally:
+        shutdown_process_pools()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,83 @@
+"""
+Merge every PDF in a folder (sorted alphabetically) into one file, or
+into volumes of roughly N pages.
+
+    python externalwork/pdfmerge.py "D:\\Ozellar Project\\PDFs"
+    python externalwork/pdfmerge.py ./surveys -o merged.pdf --chunk-size 100 --volume-pages 5000
+
+Interrupted runs resume from the last finished chunk when re-run with the
+same arguments; unreadable PDFs are skipped and listed at the end.
+"""
+import argparse
 import os
-from PyPDF2 import PdfMerger
+import sys
+
+# Add the project root so we can import 'app'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.pdf_merge import merge_pdfs
+
+
+def is_own_output(path: str, output_path: str) -> bool:
+    """The merged file, its volumes (merged_all_001.pdf ...) or work files."""
+    stem = os.path.splitext(output_path)[0]
+    path = os.path.abspath(path)
+    if path == output_path or path.startswith(output_path + "."):
+        return True
+    suffix = path[len(stem) + 1:-4] if path.startswith(stem + "_") else ""
+    return suffix.isdigit()
+
+def collect_pdfs(folder: str, recursive: bool, output_path: str) -> list[str]:
+    if recursive:
+        found = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(folder)
+            for name in names
+        ]
+    else:
+        found = [os.path.join(folder, name) for name in os.listdir(folder)]
+    return sorted(
+        p for p in found
+        if p.lower().endswith(".pdf") and not is_own_output(p, output_path)
+    )
 
-# Folder containing all your PDFs
-pdf_folder = r"D:\Ozellar Project\PDFs"
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Memory-bounded, resumable PDF merge")
+    parser.add_argument("folder", help="Folder containing the PDFs")
+    parser.add_argument("-o", "--output", help="Output file (default: <folder>/merged_all.pdf)")
+    parser.add_argument("--chunk-size", type=int, default=50, help="Files per intermediate part (default: 50)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--volume-pages", type=int, default=None, help="Split the output into volumes of ~N pages")
+    parser.add_argument("--recursive", action="store_true", help="Include PDFs in sub-folders")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing manifest and start over")
+    parser.add_argument("--keep-parts", action="store_true", help="Keep intermediate parts and the manifest")
+    args = parser.parse_args()
 
-# Output file name
-output_path = os.path.join(pdf_folder, "merged_all.pdf")
+    output_path = os.path.abspath(args.output or os.path.join(args.folder, "merged_all.pdf"))
 
-# Initialize merger
-merger = PdfMerger()
+    pdf_files = collect_pdfs(args.folder, args.recursive, output_path)
+    if not pdf_files:
+        print(f"⚠️ No PDFs found in {args.folder}")
+        return 1
 
-# Get all PDF files sorted alphabetically
-pdf_files = sorted([f for f in os.listdir(pdf_folder) if f.endswith(".pdf")])
+    print(f"📚 {len(pdf_files)} PDFs found")
+    result = merge_pdfs(
+        pdf_files,
+        output_path,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        volume_pages=args.volume_pages,
+        resume=not args.no_resume,
+        keep_parts=args.keep_parts,
+        progress=print,
+    )
 
-for pdf in pdf_files:
-    merger.append(os.path.join(pdf_folder, pdf))
-    print(f"Added: {pdf}")
+    for path, reason in sorted(result.skipped.items()):
+        print(f"❌ Skipped: {path} ({reason})")
+    for path in result.outputs:
+        print(f"✅ Written: {path}")
+    return 0 if result.outputs else 1
 
-# Write out the merged file
-merger.write(output_path)
-merger.close()
 
-print(f"✅ Merged {len(pdf_files)} PDFs successfully into {output_path}")
+if __name__ == "__main__":
+    sys.exit(main())
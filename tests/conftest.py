@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+
+# Settings are read at import time: give the required ones harmless local
+# values (real env / .env still win) so app modules import without secrets.
+for key, value in {
+    "SECRET_KEY": "test-secret",
+    "DB_USER": "drs",
+    "DB_PASSWORD": "drs",
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "drs_test",
+    "MAIL_USERNAME": "drs@fleet.test",
+    "MAIL_PASSWORD": "unused",
+    "MAIL_FROM": "drs@fleet.test",
+    "MAIL_PORT": "25",
+    "MAIL_SERVER": "localhost",
+    "AZURE_STORAGE_CONNECTION_STRING": "UseDevelopmentStorage=true",
+    "AZURE_CONTAINER_NAME": "drs-test",
+}.items():
+    os.environ.setdefault(key, value)
+
+# Every model, as alembic/env.py does, so relationship("Vessel") etc. resolve
+# whichever test module constructs a model first
+from app.models.user import User  # noqa: E402,F401
+from app.models.vessel import Vessel  # noqa: E402,F401
+from app.models.defect import Defect  # noqa: E402,F401
+from app.models.tasks import Task, Notification  # noqa: E402,F401
+from app.models.outbox import EmailOutbox, EmailDigestEntry  # noqa: E402,F401
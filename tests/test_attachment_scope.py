@@ -0,0 +1,64 @@
+# tests/test_attachment_scope.py
+"""
+Read-scope SAS for a defect: the directory token covers defects/<id>/,
+and every blob outside it (de-duplicated cas/ content) gets its own URL.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+
+import app.api.v1.endpoints.attachments as attachments
+from app.api.v1.endpoints.attachments import paths_outside_scope, get_defect_read_scope
+from app.models.defect import Defect
+
+
+class FakeSigner:
+    def read_scope(self, prefix):
+        return "sv=dir-token", datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+    def blob_url(self, path):
+        return f"https://acct.blob/drs/{path}"
+
+    def read_url(self, path):
+        return f"https://acct.blob/drs/{path}?sv=blob-token"
+
+
+class RowsSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def execute(self, stmt):
+        rows = self.rows
+
+        class Result:
+            def all(self):
+                return rows
+        return Result()
+
+
+def test_paths_outside_scope():
+    paths = [
+        "defects/d1/attachments/a/photo.jpg", "cas/ab/abcdef.jpg", "cas/ab/abcdef.jpg", None,
+        "defects/d10/attachments/x.pdf",  # Sibling defect whose id shares a prefix
+    ]
+    assert paths_outside_scope("defects/d1", paths) == ["cas/ab/abcdef.jpg", "defects/d10/attachments/x.pdf"]
+
+
+def test_read_scope_signs_cas_content_individually(monkeypatch):
+    monkeypatch.setattr(attachments.settings, "AZURE_STORAGE_HNS_ENABLED", True)
+    monkeypatch.setattr(attachments, "get_sas_signer", lambda: FakeSigner())
+
+    defect = Defect(id=uuid.uuid4(), vessel_imo="9000001", before_image_path=None, image_derivatives={})
+    prefix = f"defects/{defect.id}"
+    db = RowsSession([
+        (f"{prefix}/attachments/a1/report.pdf", None, None),
+        ("cas/12/1234.jpg", "cas/12/1234.jpg.thumb.webp", "cas/12/1234.jpg.preview.webp"),
+    ])
+
+    response = asyncio.run(get_defect_read_scope(defect=defect, db=db))
+
+    assert response.sas_token == "sv=dir-token" and response.prefix == f"{prefix}/"
+    assert sorted(response.signed_urls) == [
+        "cas/12/1234.jpg", "cas/12/1234.jpg.preview.webp", "cas/12/1234.jpg.thumb.webp"
+    ]
+    assert all(url.endswith("?sv=blob-token") for url in response.signed_urls.values())
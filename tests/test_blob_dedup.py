@@ -0,0 +1,75 @@
+# tests/test_blob_dedup.py
+"""Reference counting rules for content-addressed attachments (no database: statements are captured)."""
+import asyncio
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.blob_dedup import attach_content, cas_blob_path, ContentPathMismatch
+
+SHA = "ab" + "0" * 62
+OTHER_SHA = "cd" + "1" * 62
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    """Answers the upsert like Postgres would for a hash registered at `registered_path`."""
+
+    def __init__(self, registered_path: str | None = None):
+        self.registered_path = registered_path
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        path = stmt.compile(dialect=postgresql.dialect()).params["blob_path"]
+        counted = self.registered_path is None or self.registered_path == path
+        return FakeResult(SHA if counted else None)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_upsert_only_counts_same_path():
+    db = FakeSession()
+    run(attach_content(db, SHA, cas_blob_path(SHA, "a.jpg"), 10, "image/jpeg"))
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (sha256) DO UPDATE" in sql
+    assert "WHERE blob_contents.blob_path = excluded.blob_path" in sql
+    assert "RETURNING blob_contents.sha256" in sql
+
+
+def test_first_reference_is_counted():
+    assert run(attach_content(FakeSession(), SHA, cas_blob_path(SHA, "a.jpg"), 10, None)) == SHA
+
+
+def test_private_blob_with_hash_registered_elsewhere_stays_unshared():
+    db = FakeSession(registered_path=cas_blob_path(SHA, "a.jpg"))
+    assert run(attach_content(db, SHA, "defects/d1/attachments/x/a.jpg", 10, None)) is None
+
+
+def test_cas_path_with_hash_registered_elsewhere_is_rejected():
+    db = FakeSession(registered_path=cas_blob_path(SHA, "a.png"))
+    with pytest.raises(ContentPathMismatch):
+        run(attach_content(db, SHA, cas_blob_path(SHA, "a.jpg"), 10, None))
+
+
+@pytest.mark.parametrize("sha", [None, OTHER_SHA])
+def test_cas_path_must_carry_its_own_hash(sha):
+    db = FakeSession()
+    with pytest.raises(ContentPathMismatch):
+        run(attach_content(db, sha, cas_blob_path(SHA, "a.jpg"), 10, None))
+    assert db.statements == []
+
+
+def test_plain_attachment_without_hash_is_untouched():
+    db = FakeSession()
+    assert run(attach_content(db, None, "defects/d1/photo.jpg", 10, None)) is None
+    assert db.statements == []
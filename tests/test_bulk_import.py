@@ -0,0 +1,156 @@
+# tests/test_bulk_import.py
+"""
+Bulk import validation: file parsing (JSON / CSV, whole-file errors) and
+import_fleet against a stand-in session that knows which vessels and
+emails already exist and records the multi-row inserts.
+"""
+import asyncio
+
+import pytest
+
+import app.services.bulk_import as bulk_import
+from app.services.bulk_import import parse_import_file, import_fleet, ImportFileError
+
+BCRYPT = "$2b$12$" + "a" * 53
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FleetStore:
+    """Existing IMOs / emails; inserts return every key as newly created."""
+
+    def __init__(self, imos=(), emails=()):
+        self.imos = set(imos)
+        self.emails = {e.lower() for e in emails}
+        self.inserts = {}
+
+    async def execute(self, stmt):
+        if stmt.is_insert:
+            rows = [{getattr(column, "key", column): value for column, value in row.items()} for row in stmt._multi_values[0]]
+            self.inserts.setdefault(stmt.table.name, []).extend(rows)
+            key = {"vessels": "imo", "users": "id", "user_vessel_link": "user_id"}[stmt.table.name]
+            return Result([row[key] for row in rows])
+        (wanted,) = [p for p in stmt.compile().params.values() if isinstance(p, (list, tuple, set))]
+        if stmt.column_descriptions[0]["name"] == "imo":
+            return Result([imo for imo in self.imos if imo in wanted])
+        return Result([email for email in self.emails if email in wanted])
+
+
+def vessel(imo="9000001", name="MV Test") -> dict:
+    return {"imo_number": imo, "name": name, "vessel_type": "Tanker"}
+
+
+def person(email="a@fleet.io", imos=(), **extra) -> dict:
+    return {"email": email, "full_name": "Ann Able", "password_hash": BCRYPT, "assigned_vessel_imos": list(imos), **extra}
+
+
+def run(store, vessels=(), users=(), **kwargs):
+    return asyncio.run(import_fleet(store, list(enumerate(vessels, 1)), list(enumerate(users, 1)), **kwargs))
+
+
+def statuses(report) -> list[tuple[str, int, str]]:
+    return [(r.kind, r.row, r.status) for r in report.rows]
+
+
+# --- 1. PARSING ---
+def test_json_object_and_bare_list():
+    vessels, users = parse_import_file("fleet.json", b'{"vessels": [{"imo_number": "9000001"}], "users": [{}]}')
+    assert vessels == [(1, {"imo_number": "9000001"})] and users == [(1, {})]
+
+    vessels, users = parse_import_file("users.txt", b'[{"email": "a@fleet.io"}]')
+    assert vessels == [] and users == [(1, {"email": "a@fleet.io"})]
+
+
+def test_csv_kind_comes_from_the_header():
+    vessels, users = parse_import_file("v.csv", b"IMO_Number,Name\n9000001, MV Test \n")
+    assert vessels == [(2, {"imo_number": "9000001", "name": "MV Test"})] and users == []
+
+    vessels, users = parse_import_file("u.csv", "﻿email,full_name,job_title\na@fleet.io,Ann,\n".encode())
+    assert vessels == [] and users == [(2, {"email": "a@fleet.io", "full_name": "Ann"})]  # Empty cell dropped
+
+
+@pytest.mark.parametrize("filename, content, message", [
+    ("f.json", b"{not json", "invalid JSON"),
+    ("f.json", b'"text"', "expected an object"),
+    ("f.csv", b"", "no header row"),
+    ("f.csv", b"name,phone\nx,y\n", "needs 'email'"),
+    ("f.csv", "name\n\xe9\n".encode("latin-1"), "UTF-8"),
+])
+def test_unreadable_files_raise(filename, content, message):
+    with pytest.raises(ImportFileError, match=message):
+        parse_import_file(filename, content)
+
+
+# --- 2. VALIDATION (dry run) ---
+def test_dry_run_reports_without_writing():
+    store = FleetStore(imos={"9000002"}, emails={"Old@Fleet.io"})
+
+    report = run(
+        store,
+        vessels=[vessel(), vessel("9000002"), vessel("9000001"), vessel("12")],
+        users=[person(imos=["9000001"]), person("old@fleet.io"), person("A@FLEET.IO"), person("b@fleet.io", imos=["9999999"])],
+        dry_run=True,
+    )
+
+    assert statuses(report) == [
+        ("vessel", 1, "valid"), ("vessel", 2, "exists"), ("vessel", 3, "error"), ("vessel", 4, "error"),
+        ("user", 1, "valid"), ("user", 2, "exists"), ("user", 3, "error"), ("user", 4, "error"),
+    ]
+    errors = [r.error for r in report.rows if r.status == "error"]
+    assert errors[0] == "duplicate IMO in file" and errors[1].startswith("imo_number:")
+    assert errors[2] == "duplicate email in file" and errors[3] == "unknown vessel IMO(s): 9999999"
+    assert report.errors == 4 and report.dry_run and not report.imported
+    assert store.inserts == {}
+
+
+def test_row_level_schema_errors():
+    report = run(FleetStore(), users=[
+        "not a row",
+        {"email": "x@fleet.io", "full_name": "X"},
+        person(role="captain"),
+        person(password_hash="plain"),
+    ], dry_run=True)
+
+    assert [r.error.split(":")[0] for r in report.rows] == [
+        "row must be an object",
+        "Value error, password or password_hash is required",
+        "role",
+        "Value error, password_hash must be a bcrypt hash",
+    ]
+
+
+def test_imos_split_on_any_separator():
+    report = run(FleetStore(imos={"9000001", "9000002", "9000003"}), users=[
+        person() | {"assigned_vessel_imos": "9000001; 9000002|9000003"}
+    ], dry_run=True)
+
+    assert statuses(report) == [("user", 1, "valid")]
+
+
+# --- 3. WRITING ---
+def test_errors_block_the_import_unless_allow_partial(monkeypatch):
+    async def no_hashing(passwords):
+        assert passwords == []
+        return []
+    monkeypatch.setattr(bulk_import, "hash_passwords_parallel", no_hashing)
+    rows = dict(vessels=[vessel(), vessel("12")], users=[person(imos=["9000001"])])
+
+    store = FleetStore()
+    report = run(store, **rows)
+    assert not report.imported and store.inserts == {}
+
+    report = run(store, allow_partial=True, **rows)
+    assert report.imported and report.errors == 1
+    assert (report.vessels_created, report.users_created, report.assignments_created) == (1, 1, 1)
+    assert [r.status for r in report.rows] == ["created", "error", "created"]
+    assert store.inserts["users"][0]["password_hash"] == BCRYPT
+    assert store.inserts["user_vessel_link"] == [{"user_id": store.inserts["users"][0]["id"], "vessel_imo": "9000001"}]
@@ -0,0 +1,136 @@
+# tests/test_defect_detail.py
+"""
+Defect detail aggregate: the endpoint is called directly with the thread
+page, roster and signer swapped for stand-ins, so the assembly (vessel
+name, page size clamp, one signed URL per blob on screen) runs for real.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import app.api.v1.endpoints.defects as defects
+from app.core.config import settings
+from app.models.defect import Defect
+from app.models.enums import DefectPriority, DefectStatus
+from app.models.vessel import Vessel
+from app.schemas.defect import AttachmentResponse, ThreadResponse
+from app.services.thread_pages import ThreadPage
+
+DEFECT_ID = uuid.uuid4()
+
+
+class RefreshSession:
+    """refresh() loads the relationships the endpoint asks for."""
+
+    def __init__(self, vessel=None):
+        self.vessel = vessel
+        self.refreshed = []
+
+    async def refresh(self, obj, attribute_names=None):
+        self.refreshed.append(tuple(attribute_names or ()))
+        obj.pr_entries = []
+        obj.vessel = self.vessel
+
+
+def make_defect(**images) -> Defect:
+    return Defect(
+        id=DEFECT_ID, vessel_imo="9000001", reported_by_id=uuid.uuid4(), title="Bilge pump",
+        equipment_name="Pump", description="Leaking seal", priority=DefectPriority.HIGH,
+        status=DefectStatus.OPEN, defect_source="Internal Audit", created_at=datetime(2026, 1, 1),
+        before_image_required=False, after_image_required=False,
+        **images,
+    )
+
+
+def thread_with(*blob_paths) -> ThreadResponse:
+    thread_id = uuid.uuid4()
+    return ThreadResponse(
+        id=thread_id, defect_id=DEFECT_ID, author_role="Chief Engineer", body="See photos",
+        created_at=datetime(2026, 1, 2), user_id=uuid.uuid4(),
+        attachments=[
+            AttachmentResponse(
+                id=uuid.uuid4(), thread_id=thread_id, file_name=path.rsplit("/", 1)[-1],
+                blob_path=path, created_at=datetime(2026, 1, 2),
+            )
+            for path in blob_paths
+        ],
+    )
+
+
+@pytest.fixture
+def detail(monkeypatch):
+    """detail(defect, threads, roster, limit=None, vessel=None) -> (response, calls)."""
+
+    def run(defect, threads, roster, limit=None, vessel=None):
+        calls = {}
+
+        async def fetch_thread_page(db, defect_id, page_limit, before=None, after=None):
+            calls["page"] = (defect_id, page_limit)
+            return ThreadPage(threads=threads, older_cursor=threads[0].id if threads else None, newer_cursor=None)
+
+        async def get_roster(vessel_imo, active_only=False):
+            calls["roster"] = (vessel_imo, active_only)
+            if isinstance(roster, Exception):
+                raise roster
+            return roster
+
+        def sign(path):
+            return f"https://blob/{path}?sig" if path else None
+
+        monkeypatch.setattr(defects, "fetch_thread_page", fetch_thread_page)
+        monkeypatch.setattr(defects.fleet_registry, "get_roster", get_roster)
+        monkeypatch.setattr(defects, "generate_read_sas_url_or_none", sign)
+        monkeypatch.setattr(defects, "sign_defects", lambda items: None)
+        session = RefreshSession(vessel)
+        response = asyncio.run(defects.get_defect_detail(limit=limit, defect=defect, db=session))
+        calls["refreshed"] = session.refreshed
+        return response, calls
+
+    return run
+
+
+def test_detail_bundles_defect_threads_roster_and_urls(detail):
+    threads = [thread_with("defects/a.jpg"), thread_with("defects/b.pdf", "cas/ab/abcd")]
+    roster = [
+        {"id": uuid.uuid4(), "full_name": "Ann Able", "job_title": "Master", "is_active": True},
+        {"id": uuid.uuid4(), "full_name": "Ben Best", "job_title": None, "is_active": True},
+    ]
+    defect = make_defect(before_image_path="defects/before.jpg")
+
+    response, calls = detail(defect, threads, roster, vessel=Vessel(imo="9000001", name="MV Test"))
+
+    assert response.defect.id == DEFECT_ID and response.defect.vessel_name == "MV Test"
+    assert [t.id for t in response.threads] == [t.id for t in threads]
+    assert response.older_cursor == threads[0].id
+    assert [u.full_name for u in response.vessel_users] == ["Ann Able", "Ben Best"]
+    assert calls["roster"] == ("9000001", True)
+    assert calls["refreshed"] == [("pr_entries", "vessel")]
+    assert response.signed_urls == {
+        path: f"https://blob/{path}?sig"
+        for path in ("defects/before.jpg", "defects/a.jpg", "defects/b.pdf", "cas/ab/abcd")
+    }
+
+
+def test_empty_image_fields_are_not_signed(detail):
+    response, _ = detail(make_defect(), [], [])
+
+    assert response.signed_urls == {} and response.threads == [] and response.older_cursor is None
+    assert response.defect.vessel_name is None
+
+
+def test_page_size_defaults_and_is_clamped(detail):
+    _, calls = detail(make_defect(), [], [])
+    assert calls["page"] == (DEFECT_ID, settings.THREAD_PAGE_SIZE)
+
+    _, calls = detail(make_defect(), [], [], limit=settings.THREAD_PAGE_MAX + 1)
+    assert calls["page"] == (DEFECT_ID, settings.THREAD_PAGE_MAX)
+
+
+def test_failure_surfaces_as_500(detail):
+    with pytest.raises(HTTPException) as exc:
+        detail(make_defect(), [], RuntimeError("registry down"))
+
+    assert exc.value.status_code == 500 and "registry down" in exc.value.detail
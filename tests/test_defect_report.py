@@ -0,0 +1,110 @@
+# tests/test_defect_report.py
+"""RenderedReport lifecycle: streaming, idempotent cleanup, disconnects."""
+import asyncio
+import os
+from pathlib import Path
+
+from starlette.requests import ClientDisconnect
+
+from app.api.v1.endpoints.reports import ReportStreamingResponse
+from app.services.defect_report import RenderedReport, REPORT_STREAM_CHUNK
+
+
+def rendered(tmp_path, size: int) -> RenderedReport:
+    workdir = tmp_path / "drs_report_x"
+    workdir.mkdir()
+    path = workdir / "report.pdf"
+    path.write_bytes(os.urandom(size))
+    return RenderedReport(path=str(path), workdir=str(workdir), page_count=1, defect_count=1)
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+def test_iter_bytes_streams_everything_then_cleans_up(tmp_path):
+    report = rendered(tmp_path, REPORT_STREAM_CHUNK * 2 + 10)
+    expected = Path(report.path).read_bytes()
+
+    assert asyncio.run(collect(report.iter_bytes())) == expected
+    assert not os.path.exists(report.workdir)
+
+
+def test_read_chunks_leaves_the_file(tmp_path):
+    report = rendered(tmp_path, 1000)
+
+    assert len(asyncio.run(collect(report.read_chunks()))) == 1000
+    assert os.path.exists(report.path)
+
+
+def test_cleanup_is_idempotent(tmp_path):
+    report = rendered(tmp_path, 10)
+    report.cleanup()
+    report.cleanup()
+
+    assert report.cleaned and not os.path.exists(report.workdir)
+
+
+def test_disconnect_before_body_still_cleans_up(tmp_path):
+    report = rendered(tmp_path, 10)
+    response = ReportStreamingResponse(report, media_type="application/pdf")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client gone")  # Nothing can be sent
+
+    async def run():
+        try:
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+        except ClientDisconnect:
+            pass
+
+    asyncio.run(run())
+    assert report.cleaned and not os.path.exists(report.workdir)
+
+
+def test_full_send_cleans_up(tmp_path):
+    report = rendered(tmp_path, REPORT_STREAM_CHUNK + 5)
+    response = ReportStreamingResponse(report, media_type="application/pdf")
+    body = []
+
+    async def receive():
+        await asyncio.sleep(10)
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message["body"])
+
+    asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    assert len(b"".join(body)) == REPORT_STREAM_CHUNK + 5
+    assert not os.path.exists(report.workdir)
+
+
+def test_upload_report_streams_chunks_and_cleans_up(tmp_path, monkeypatch):
+    import app.services.defect_report as defect_report
+
+    report = rendered(tmp_path, REPORT_STREAM_CHUNK * 3)
+    expected = Path(report.path).read_bytes()
+    uploaded = {}
+
+    class FakeBlob:
+        async def upload_blob(self, data, **kwargs):
+            assert hasattr(data, "__aiter__")  # No sync file handed to the aio SDK
+            uploaded["data"] = await collect(data)
+            uploaded["length"] = kwargs["length"]
+
+    class FakeContainer:
+        def get_blob_client(self, path):
+            uploaded["path"] = path
+            return FakeBlob()
+
+    async def fake_container():
+        return FakeContainer()
+
+    monkeypatch.setattr(defect_report, "get_container_client", fake_container)
+    asyncio.run(defect_report.upload_report(report, "reports/fleet/r.pdf"))
+
+    assert uploaded == {"path": "reports/fleet/r.pdf", "data": expected, "length": len(expected)}
+    assert report.cleaned
@@ -0,0 +1,145 @@
+# tests/test_email_digest.py
+"""
+Digest flush with a stand-in session and transport: one mail per
+recipient, backoff on failure, give-up after the attempts cap, and no
+automatic re-send when delivery is unknown.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.services.email_digest as email_digest
+import app.services.email_service as email_service
+from app.core.config import settings
+from app.models.outbox import EmailDigestEntry
+from app.services.email_outbox import retry_delay
+from app.services.graph_client import GraphSendError
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class DigestSession:
+    """First query: due recipients; second: their pending entries."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        if stmt.column_descriptions[0]["name"] == "recipient":
+            return Result(sorted({e.recipient for e in self.entries}))
+        return Result(self.entries)
+
+    async def commit(self):
+        self.commits += 1
+
+
+def entry(recipient: str, attempts: int = 0) -> EmailDigestEntry:
+    return EmailDigestEntry(
+        id=uuid.uuid4(), recipient=recipient, event_type="UPDATED", attempts=attempts,
+        payload={"vessel_imo": "9000001", "title": "Bilge pump", "priority": "HIGH", "status": "OPEN"},
+        created_at=datetime.utcnow() - timedelta(minutes=30), due_at=datetime.utcnow() - timedelta(minutes=1),
+    )
+
+
+@pytest.fixture
+def flush(monkeypatch):
+    """flush(entries, outcomes) -> (sent count, mails handed to the transport)."""
+
+    def run(entries, outcomes: dict[str, Exception | None]):
+        session = DigestSession(entries)
+        mails = []
+
+        async def send_email_batch(batch):
+            mails.extend(batch)
+            return [outcomes.get(mail.recipients[0]) for mail in batch]
+
+        monkeypatch.setattr(email_digest, "SessionLocal", lambda: session)
+        monkeypatch.setattr(email_service, "send_email_batch", send_email_batch)
+        monkeypatch.setattr(email_service, "render_digest_email", lambda events: (f"{len(events)} updates", "<p/>"))
+        sent = asyncio.run(email_digest.flush_due_digests())
+        assert session.commits == 1
+        return sent, mails
+
+    return run
+
+
+def test_one_mail_per_recipient_and_entries_marked_sent(flush):
+    entries = [entry("a@fleet.io"), entry("a@fleet.io"), entry("b@fleet.io")]
+
+    sent, mails = flush(entries, {})
+
+    assert sent == 2
+    assert sorted((m.recipients[0], m.subject) for m in mails) == [("a@fleet.io", "2 updates"), ("b@fleet.io", "1 updates")]
+    assert all(e.sent_at is not None for e in entries)
+
+
+def test_failure_backs_off_like_the_outbox(flush):
+    entries = [entry("a@fleet.io", attempts=1)]
+    before = datetime.utcnow()
+
+    sent, _ = flush(entries, {"a@fleet.io": GraphSendError(503, "busy")})
+
+    (e,) = entries
+    assert sent == 0 and e.sent_at is None and e.failed_at is None
+    assert e.attempts == 2 and e.due_at >= before + retry_delay(2)
+    assert "busy" in e.last_error
+
+
+def test_gives_up_after_max_attempts(flush):
+    entries = [entry("a@fleet.io", attempts=settings.EMAIL_DIGEST_MAX_ATTEMPTS - 1)]
+
+    flush(entries, {"a@fleet.io": GraphSendError(400, "bad recipient")})
+
+    assert entries[0].failed_at is not None
+
+
+def test_delivery_unknown_is_not_retried(flush):
+    entries = [entry("a@fleet.io")]
+
+    flush(entries, {"a@fleet.io": GraphSendError(0, "No response for batch item", delivery_unknown=True)})
+
+    assert entries[0].failed_at is not None and entries[0].attempts == 1
+
+
+def test_one_failure_does_not_hold_back_others(flush):
+    entries = [entry("a@fleet.io"), entry("b@fleet.io")]
+
+    sent, _ = flush(entries, {"a@fleet.io": GraphSendError(503, "busy")})
+
+    assert sent == 1
+    assert entries[0].sent_at is None and entries[1].sent_at is not None
+
+
+def test_requeue_of_the_same_event_is_a_no_op(monkeypatch):
+    from sqlalchemy.dialects import postgresql
+
+    session = DigestSession([])
+    statements = []
+
+    async def capture(stmt):
+        statements.append(stmt)
+    session.execute = capture
+    monkeypatch.setattr(email_digest, "SessionLocal", lambda: session)
+
+    asyncio.run(email_digest.queue_digest_entries({"a@fleet.io": 60}, {"title": "x"}, "UPDATED", uuid.uuid4()))
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (event_id, recipient) DO NOTHING" in sql
@@ -0,0 +1,132 @@
+# tests/test_email_outbox.py
+"""
+Outbox bookkeeping without a database: record_result() is driven with a
+session that only captures the UPDATE it is given.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+from app.models.outbox import EmailOutbox, OutboxStatus
+from app.services.email_outbox import claim_batch, renew_leases, record_result, retry_delay, delivery_unknown
+from app.services.graph_client import GraphSendError
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+
+
+def recorded_values(row: EmailOutbox, error: Exception | None) -> dict:
+    db = CapturingSession()
+    asyncio.run(record_result(db, row, error))
+    (stmt,) = db.statements
+    return {column.key: value.value for column, value in stmt._values.items()}
+
+
+def outbox_row(attempts: int) -> EmailOutbox:
+    return EmailOutbox(id=uuid.uuid4(), event_type="CREATED", payload={}, attempts=attempts)
+
+
+# --- 1. RESULT CLASSIFICATION ---
+def test_success_marks_sent():
+    values = recorded_values(outbox_row(1), None)
+
+    assert values["status"] == OutboxStatus.SENT
+    assert values["locked_at"] is None and values["last_error"] is None
+
+
+def test_ordinary_error_is_retried_with_backoff():
+    before = datetime.utcnow()
+    values = recorded_values(outbox_row(2), GraphSendError(400, "bad recipient"))
+
+    assert values["status"] == OutboxStatus.PENDING
+    assert values["next_attempt_at"] >= before + retry_delay(2)
+    assert "bad recipient" in values["last_error"]
+
+
+def test_error_on_last_attempt_fails():
+    values = recorded_values(outbox_row(settings.EMAIL_OUTBOX_MAX_ATTEMPTS), GraphSendError(503, "busy"))
+
+    assert values["status"] == OutboxStatus.FAILED
+
+
+@pytest.mark.parametrize("error", [
+    GraphSendError(0, "Transport error (delivery unknown): read timeout", delivery_unknown=True),
+    GraphSendError(0, "No response for batch item", delivery_unknown=True),
+])
+def test_delivery_unknown_is_never_retried(error):
+    values = recorded_values(outbox_row(1), error)
+
+    assert values["status"] == OutboxStatus.FAILED
+    assert "next_attempt_at" not in values
+    assert values["last_error"].startswith("Delivery unknown")
+
+
+def test_connect_failure_is_not_delivery_unknown():
+    # Nothing reached Graph: safe to retry later
+    assert not delivery_unknown(GraphSendError(0, "Connection error: refused"))
+    assert not delivery_unknown(RuntimeError("template missing"))
+
+
+# --- 2. BACKOFF ---
+def test_retry_delay_doubles_and_caps():
+    assert [retry_delay(n) for n in (1, 2, 3)] == [timedelta(seconds=30), timedelta(seconds=60), timedelta(seconds=120)]
+    assert retry_delay(50) == timedelta(hours=1)
+
+
+# --- 3. CLAIM + LEASE ---
+class ClaimSession(CapturingSession):
+    """Hands back `rows` for the claim SELECT and records commits."""
+
+    def __init__(self, rows):
+        super().__init__()
+        self.rows = rows
+        self.commits = 0
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        rows = self.rows
+
+        class Result:
+            rowcount = len(rows)
+
+            def scalars(self):
+                return self
+
+            def all(self):
+                return rows
+        return Result()
+
+    async def commit(self):
+        self.commits += 1
+
+
+def test_claim_batch_locks_rows_and_counts_the_attempt():
+    rows = [outbox_row(0), outbox_row(2)]
+    db = ClaimSession(rows)
+
+    claimed = asyncio.run(claim_batch(db, 10))
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert claimed == rows and db.commits == 1
+    assert all(r.status == OutboxStatus.SENDING and r.locked_at is not None for r in rows)
+    assert [r.attempts for r in rows] == [1, 3]
+
+
+def test_renew_leases_only_touches_rows_still_sending():
+    db = ClaimSession([])
+    ids = [uuid.uuid4()]
+
+    asyncio.run(renew_leases(db, ids))
+
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "email_outbox.status = " in sql and "locked_at" in sql
@@ -0,0 +1,127 @@
+# tests/test_fleet_registry.py
+"""FleetRegistry caching without a database (_load is stubbed) and @mention ranking."""
+import asyncio
+import time
+import uuid
+
+from app.services.fleet_registry import FleetRegistry, FleetSnapshot, MentionEntry, search_mentionable
+
+
+def snapshot_named(marker: str) -> FleetSnapshot:
+    return FleetSnapshot(vessels={marker: {}}, rosters={}, user_vessels={}, shore=[], loaded_at=time.monotonic())
+
+
+class ScriptedRegistry(FleetRegistry):
+    """Each _load() returns load_1, load_2 ...; `during_load` runs mid-load."""
+
+    def __init__(self, during_load=None):
+        super().__init__(ttl_seconds=300)
+        self.loads = 0
+        self.during_load = during_load
+
+    async def _load(self) -> FleetSnapshot:
+        self.loads += 1
+        marker = f"load_{self.loads}"
+        await asyncio.sleep(0)
+        if self.during_load:
+            self.during_load(self)
+        return snapshot_named(marker)
+
+
+# --- 1. CACHE + INVALIDATION ---
+def test_snapshot_is_cached_until_invalidated():
+    registry = ScriptedRegistry()
+
+    async def run():
+        first = await registry.snapshot()
+        assert await registry.snapshot() is first
+        registry.invalidate()
+        return await registry.snapshot()
+
+    assert list(asyncio.run(run()).vessels) == ["load_2"]
+    assert registry.hits == 1 and registry.misses == 2
+
+
+def test_invalidate_during_load_is_not_lost():
+    invalidated = []
+
+    def invalidate_once(registry):
+        if not invalidated:
+            invalidated.append(True)
+            registry.invalidate()  # e.g. a user was created while the first load ran
+
+    registry = ScriptedRegistry(during_load=invalidate_once)
+    snapshot = asyncio.run(registry.snapshot())
+
+    assert list(snapshot.vessels) == ["load_2"]
+    assert registry._snapshot is snapshot
+
+
+def test_constant_invalidation_serves_but_does_not_cache():
+    registry = ScriptedRegistry(during_load=lambda r: r.invalidate())
+    snapshot = asyncio.run(registry.snapshot())
+
+    assert list(snapshot.vessels) == ["load_3"]
+    assert registry._snapshot is None
+
+
+def test_concurrent_callers_share_one_load():
+    registry = ScriptedRegistry()
+
+    async def run():
+        return await asyncio.gather(*(registry.snapshot() for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert registry.loads == 1 and all(r is results[0] for r in results)
+
+
+# --- 2. MENTION RANKING ---
+def user(name: str, job: str = "", active: bool = True) -> dict:
+    return {"id": uuid.uuid4(), "full_name": name, "job_title": job, "role": "VESSEL", "is_active": active}
+
+
+ENTRIES = [
+    MentionEntry.build(user("Anna Berg", "Chief Officer"), True),
+    MentionEntry.build(user("Bernd Chiefson", "Fitter"), True),
+    MentionEntry.build(user("Chiara Olsen", "Superintendent"), False),
+    MentionEntry.build(user("Dmitri Arch", "Second Engineer"), True),
+]
+
+
+def names(entries) -> list[str]:
+    return [e.user["full_name"] for e in entries]
+
+
+def test_rank_order_name_prefix_word_prefix_job_word():
+    # "chi": Chiara (name prefix), Bernd Chiefson (name word), Anna Berg (job word "chief"); Dmitri Arch has no match
+    assert names(search_mentionable(ENTRIES, "chi", 10)) == ["Chiara Olsen", "Bernd Chiefson", "Anna Berg"]
+    assert ENTRIES[3].rank("rch") == 3  # Substring of the name
+    assert ENTRIES[3].rank("chi") is None
+
+
+def test_equal_ranks_keep_roster_order():
+    assert names(search_mentionable(ENTRIES, "er", 10)) == names(ENTRIES)  # All substring matches
+
+
+def test_search_is_case_insensitive_and_limited():
+    assert names(search_mentionable(ENTRIES, "  BER ", 1)) == ["Bernd Chiefson"]
+
+
+def test_empty_query_keeps_roster_order():
+    assert names(search_mentionable(ENTRIES, None, 2)) == ["Anna Berg", "Bernd Chiefson"]
+    assert search_mentionable(ENTRIES, "zzz", 10) == []
+
+
+def test_mentionable_is_active_crew_then_shore_without_duplicates():
+    crew, retired, both = user("Anna Berg"), user("Old Hand", active=False), user("Chiara Olsen")
+    shore = [both, user("Zed Office")]
+    snapshot = FleetSnapshot(
+        vessels={}, rosters={"9000001": [crew, retired, both]}, user_vessels={}, shore=shore, loaded_at=0.0
+    )
+
+    entries = snapshot.mentionable("9000001")
+
+    assert [(e.user["full_name"], e.on_vessel) for e in entries] == [
+        ("Anna Berg", True), ("Chiara Olsen", True), ("Zed Office", False)
+    ]
+    assert snapshot.mentionable("9000001") is entries
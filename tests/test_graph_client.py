@@ -0,0 +1,200 @@
+# tests/test_graph_client.py
+"""
+GraphClient against a local Graph stand-in (httpx.MockTransport):
+throttling with Retry-After, per-item failures inside $batch and the
+retry-then-give-up path. No network, no Azure AD.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services.graph_client import GraphClient, GraphSendError, GRAPH_BATCH_LIMIT
+
+SENDER = "drs@fleet.test"
+
+
+class FakeTokenProvider:
+    def __init__(self):
+        self.invalidated = 0
+
+    async def get_token(self) -> str:
+        return "token"
+
+    def invalidate(self):
+        self.invalidated += 1
+
+
+class GraphStandIn:
+    """Answers sendMail and $batch from scripted per-message outcomes."""
+
+    def __init__(self, outcomes: dict[str, list] | None = None, batch_statuses: list[int] | None = None):
+        # subject -> queue of (status, headers) returned for that message, one per attempt
+        self.outcomes = outcomes or {}
+        self.batch_statuses = list(batch_statuses or [])
+        self.calls: list[tuple[str, list[str]]] = []  # (path, subjects in the request)
+
+    def _next(self, subject: str) -> tuple[int, dict]:
+        queue = self.outcomes.get(subject)
+        return queue.pop(0) if queue else (202, {})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if request.url.path.endswith("/$batch"):
+            subjects = [item["body"]["message"]["subject"] for item in body["requests"]]
+            self.calls.append(("$batch", subjects))
+            if self.batch_statuses:
+                status = self.batch_statuses.pop(0)
+                if status != 200:
+                    return httpx.Response(status, headers={"Retry-After": "0"}, text="batch rejected")
+            responses = []
+            for item, subject in zip(body["requests"], subjects):
+                status, headers = self._next(subject)
+                responses.append({"id": item["id"], "status": status, "headers": headers, "body": {"subject": subject}})
+            return httpx.Response(200, json={"responses": responses})
+
+        subject = body["message"]["subject"]
+        self.calls.append(("sendMail", [subject]))
+        status, headers = self._next(subject)
+        return httpx.Response(status, headers=headers)
+
+
+def make_client(handler, max_retries: int = 3) -> GraphClient:
+    client = GraphClient(
+        FakeTokenProvider(),
+        base_url="https://graph.test/v1.0",
+        max_retries=max_retries,
+        transport=httpx.MockTransport(handler),
+    )
+    client._backoff = lambda attempt: 0.0  # No real sleeping in tests
+    return client
+
+
+def mail(subject: str) -> dict:
+    return {"message": {"subject": subject, "toRecipients": []}, "saveToSentItems": False}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+# --- 1. SINGLE SEND ---
+def test_send_mail_retries_429_with_retry_after():
+    graph = GraphStandIn({"a": [(429, {"Retry-After": "0"}), (429, {"Retry-After": "0"})]})
+    client = make_client(graph)
+
+    run(client.send_mail(SENDER, mail("a")))
+
+    assert len(graph.calls) == 3
+    assert client.throttled == 2
+
+
+def test_send_mail_gives_up_after_max_retries():
+    graph = GraphStandIn({"a": [(503, {"Retry-After": "0"})] * 10})
+    client = make_client(graph, max_retries=2)
+
+    with pytest.raises(GraphSendError) as exc:
+        run(client.send_mail(SENDER, mail("a")))
+
+    assert exc.value.status_code == 503
+    assert len(graph.calls) == 3  # First try + 2 retries
+
+
+@pytest.mark.parametrize("status, headers", [(504, {}), (503, {}), (500, {})])
+def test_send_mail_does_not_retry_possibly_delivered(status, headers):
+    graph = GraphStandIn({"a": [(status, headers)]})
+    client = make_client(graph)
+
+    with pytest.raises(GraphSendError):
+        run(client.send_mail(SENDER, mail("a")))
+
+    assert len(graph.calls) == 1
+
+
+def test_send_mail_does_not_retry_read_timeout():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    with pytest.raises(GraphSendError) as exc:
+        run(make_client(handler).send_mail(SENDER, mail("a")))
+    assert len(calls) == 1
+    assert exc.value.delivery_unknown
+
+
+def test_send_mail_retries_connect_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(202)
+
+    run(make_client(handler).send_mail(SENDER, mail("a")))
+    assert len(calls) == 3
+
+
+# --- 2. $BATCH ---
+def test_batch_resends_only_throttled_items():
+    graph = GraphStandIn({
+        "b": [(429, {"Retry-After": "0"})],
+        "d": [(429, {"Retry-After": "0"}), (429, {"Retry-After": "0"})],
+    })
+    client = make_client(graph)
+
+    results = run(client.send_mail_batch(SENDER, [mail(s) for s in "abcd"]))
+
+    assert results == [None, None, None, None]
+    assert graph.calls == [("$batch", ["a", "b", "c", "d"]), ("$batch", ["b", "d"]), ("$batch", ["d"])]
+    assert client.batch_items_throttled == 3
+
+
+def test_batch_reports_partial_failures_per_item():
+    graph = GraphStandIn({
+        "b": [(400, {})],   # Bad recipient: fails alone
+        "c": [(504, {})],   # May have been sent: not retried
+    })
+    client = make_client(graph)
+
+    results = run(client.send_mail_batch(SENDER, [mail(s) for s in "abc"]))
+
+    assert results[0] is None
+    assert isinstance(results[1], GraphSendError) and results[1].status_code == 400
+    assert isinstance(results[2], GraphSendError) and results[2].status_code == 504
+    assert len(graph.calls) == 1
+
+
+def test_batch_gives_up_on_items_still_throttled():
+    graph = GraphStandIn({"b": [(429, {"Retry-After": "0"})] * 10})
+    client = make_client(graph, max_retries=2)
+
+    results = run(client.send_mail_batch(SENDER, [mail("a"), mail("b")]))
+
+    assert results[0] is None
+    assert isinstance(results[1], GraphSendError) and results[1].status_code == 429
+    assert [subjects for _, subjects in graph.calls] == [["a", "b"], ["b"], ["b"]]
+
+
+def test_batch_retries_throttled_batch_request():
+    graph = GraphStandIn(batch_statuses=[429, 200])
+    client = make_client(graph)
+
+    results = run(client.send_mail_batch(SENDER, [mail("a"), mail("b")]))
+
+    assert results == [None, None]
+    assert len(graph.calls) == 2
+
+
+def test_batch_splits_into_graph_sized_chunks():
+    graph = GraphStandIn()
+    client = make_client(graph)
+    subjects = [f"m{i}" for i in range(GRAPH_BATCH_LIMIT * 2 + 5)]
+
+    results = run(client.send_mail_batch(SENDER, [mail(s) for s in subjects]))
+
+    assert results == [None] * len(subjects)
+    assert sorted(len(s) for _, s in graph.calls) == [5, GRAPH_BATCH_LIMIT, GRAPH_BATCH_LIMIT]
@@ -0,0 +1,48 @@
+# tests/test_image_derivatives.py
+"""Defect thumbnails link the rendered derivative, or the original when none exists."""
+from types import SimpleNamespace
+
+from app.services.image_derivatives import defect_thumbnail_urls, sign_attachments, THUMBNAIL
+
+
+def make_defect(**fields):
+    values = {"before_image_path": None, "after_image_path": None,
+              "closure_image_before": None, "closure_image_after": None, "image_derivatives": None}
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_thumbnail_used_when_recorded():
+    defect = make_defect(
+        before_image_path="defects/d1/before.jpg",
+        image_derivatives={"defects/d1/before.jpg": {THUMBNAIL: "defects/d1/before.jpg.thumb.webp"}},
+    )
+    urls = defect_thumbnail_urls(defect)
+    assert "/defects/d1/before.jpg.thumb.webp?" in urls["before_image_path"]
+
+
+def test_original_used_when_not_rendered():
+    # Too large, undecodable HEIC or a failed render: nothing recorded
+    defect = make_defect(after_image_path="defects/d1/after.heic", image_derivatives={})
+    urls = defect_thumbnail_urls(defect)
+    assert "/defects/d1/after.heic?" in urls["after_image_path"]
+
+
+def test_stale_entry_for_replaced_image_is_ignored():
+    defect = make_defect(
+        before_image_path="defects/d1/new.jpg",
+        image_derivatives={"defects/d1/old.jpg": {THUMBNAIL: "defects/d1/old.jpg.thumb.webp"}},
+    )
+    assert "/defects/d1/new.jpg?" in defect_thumbnail_urls(defect)["before_image_path"]
+
+
+def test_non_images_are_skipped():
+    assert defect_thumbnail_urls(make_defect(before_image_path="defects/d1/report.pdf")) == {}
+
+
+def test_attachment_urls_only_for_rendered_variants():
+    rendered = SimpleNamespace(thumbnail_path="cas/ab/x.jpg.thumb.webp", preview_path=None)
+    pending = SimpleNamespace(thumbnail_path=None, preview_path=None)
+    sign_attachments([rendered, pending])
+    assert rendered.thumbnail_url and rendered.preview_url is None
+    assert pending.thumbnail_url is None
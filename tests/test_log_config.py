@@ -0,0 +1,158 @@
+# tests/test_log_config.py
+"""
+Request-id log context: RequestContextMiddleware driven as a bare ASGI
+app, with records captured by a handler that carries the same
+RequestContextFilter the queue handler uses. Plus the formatters and the
+sampling / dropping handlers.
+"""
+import asyncio
+import json
+import logging
+import queue
+
+import pytest
+
+from app.core.config import settings
+from app.core.log_config import (
+    RequestContextMiddleware, RequestContextFilter, SamplingFilter, DroppingQueueHandler,
+    JsonFormatter, TextFormatter, request_id_var,
+)
+
+app_logger = logging.getLogger("app.test_endpoint")
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(RequestContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    handler = ListHandler()
+    root = logging.getLogger()
+    previous = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    yield handler.records
+    root.removeHandler(handler)
+    root.setLevel(previous)
+
+
+async def background_work():
+    app_logger.info("in task")
+
+
+async def endpoint(scope, receive, send):
+    app_logger.info("handling")
+    # Tasks copy the context, so background work keeps the request id
+    await asyncio.create_task(background_work())
+    await send({"type": "http.response.start", "status": 201, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def call(app, headers=()) -> list[dict]:
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/defects", "headers": list(headers)}
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def response_id(sent) -> str:
+    return dict(sent[0]["headers"])[b"x-request-id"].decode()
+
+
+# --- 1. MIDDLEWARE ---
+def test_incoming_id_is_echoed_and_stamped_on_every_record(captured):
+    sent = call(RequestContextMiddleware(endpoint), [(b"x-request-id", b"abc-123.x_y")])
+
+    assert response_id(sent) == "abc-123.x_y"
+    assert [(r.name, r.request_id) for r in captured] == [
+        ("app.test_endpoint", "abc-123.x_y"), ("app.test_endpoint", "abc-123.x_y"), ("app.request", "abc-123.x_y")
+    ]
+    access = captured[-1]
+    assert (access.method, access.path, access.status) == ("POST", "/api/v1/defects", 201)
+    assert request_id_var.get() is None  # Reset once the request is done
+
+
+@pytest.mark.parametrize("incoming", [b"", b"has space", b"x" * 65, b"semi;colon"])
+def test_unusable_incoming_id_is_replaced(captured, incoming):
+    sent = call(RequestContextMiddleware(endpoint), [(b"x-request-id", incoming)])
+
+    generated = response_id(sent)
+    assert len(generated) == 32 and generated != incoming.decode()
+    assert {r.request_id for r in captured} == {generated}
+
+
+def test_each_request_gets_its_own_id(captured):
+    app = RequestContextMiddleware(endpoint)
+
+    assert response_id(call(app)) != response_id(call(app))
+
+
+def test_failure_is_logged_as_500_and_context_reset(captured):
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        call(RequestContextMiddleware(broken))
+
+    assert captured[-1].status == 500 and captured[-1].request_id
+    assert request_id_var.get() is None
+
+
+def test_request_line_can_be_switched_off(captured, monkeypatch):
+    monkeypatch.setattr(settings, "LOG_REQUESTS", False)
+
+    call(RequestContextMiddleware(endpoint))
+
+    assert [r.name for r in captured] == ["app.test_endpoint", "app.test_endpoint"]
+
+
+# --- 2. FORMATTERS ---
+def record(name="app.x", level=logging.INFO, request_id=None, **extra) -> logging.LogRecord:
+    rec = logging.LogRecord(name, level, __file__, 1, "saved %s", ("defect",), None)
+    rec.request_id = request_id
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_json_formatter_carries_request_id_and_extras():
+    entry = json.loads(JsonFormatter().format(record(request_id="r1", status=200)))
+
+    assert (entry["msg"], entry["request_id"], entry["status"], entry["logger"]) == ("saved defect", "r1", 200, "app.x")
+
+
+def test_text_formatter_marks_records_outside_a_request():
+    assert "[-] saved defect" in TextFormatter().format(record())
+    assert "[r1] saved defect" in TextFormatter().format(record(request_id="r1"))
+
+
+# --- 3. SAMPLING + DROPPING ---
+def test_sampling_uses_the_longest_prefix_and_keeps_warnings():
+    sampler = SamplingFilter({"app": 1.0, "app.services.noisy": 0.0})
+
+    assert not sampler.filter(record("app.services.noisy.sub"))
+    assert sampler.filter(record("app.services.noisy", level=logging.WARNING))
+    assert sampler.filter(record("app.services.noisy_other"))
+    assert sampler.filter(record("sqlalchemy"))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+
+    handler.handle(record())
+    handler.handle(record())
+
+    assert handler.queue.qsize() == 1 and handler.dropped == 1
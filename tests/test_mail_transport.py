@@ -0,0 +1,136 @@
+# tests/test_mail_transport.py
+"""
+SMTP pool hygiene with a stand-in connection: a slot that failed in any
+way goes back to the pool disconnected, so the next send starts clean.
+"""
+import asyncio
+
+import aiosmtplib
+import pytest
+
+from app.services.mail_transport import SmtpMailTransport, OutgoingMail
+
+
+class FakeSMTP:
+    """Scripted aiosmtplib.SMTP: `failures` is a queue of exceptions raised by send_message."""
+
+    def __init__(self, failures=(), login_error=None):
+        self.is_connected = False
+        self.failures = list(failures)
+        self.login_error = login_error
+        self.logins = 0
+        self.closes = 0
+        self.sent = 0
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def login(self, username, password):
+        self.logins += 1
+        if self.login_error:
+            error, self.login_error = self.login_error, None
+            raise error
+
+    async def send_message(self, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent += 1
+
+    def close(self):
+        self.is_connected = False
+        self.closes += 1
+
+
+def transport_with(smtp: FakeSMTP, username: str | None = "drs") -> SmtpMailTransport:
+    transport = SmtpMailTransport("localhost", 25, username, "secret", "drs@fleet.test", pool_size=1)
+    transport._pool = asyncio.Queue()
+    transport._pool.put_nowait(smtp)
+    return transport
+
+
+MAIL = OutgoingMail("Subject", ["crew@fleet.test"], "<p>hi</p>")
+
+
+def test_response_error_closes_the_session():
+    smtp = FakeSMTP(failures=[aiosmtplib.SMTPResponseException(452, "mailbox full")])
+
+    async def run():
+        transport = transport_with(smtp)
+        with pytest.raises(aiosmtplib.SMTPResponseException):
+            await transport.send(MAIL)
+        assert not smtp.is_connected
+        await transport.send(MAIL)  # Fresh connection, logs in again
+
+    asyncio.run(run())
+    assert smtp.sent == 1 and smtp.logins == 2
+
+
+def test_failed_login_is_not_reused_unauthenticated():
+    smtp = FakeSMTP(login_error=aiosmtplib.SMTPAuthenticationError(535, "bad credentials"))
+
+    async def run():
+        transport = transport_with(smtp)
+        with pytest.raises(aiosmtplib.SMTPAuthenticationError):
+            await transport.send(MAIL)
+        await transport.send(MAIL)
+
+    asyncio.run(run())
+    assert smtp.logins == 2 and smtp.sent == 1
+
+
+def test_cancelled_send_closes_the_session():
+    smtp = FakeSMTP()
+
+    async def slow_send(message):
+        await asyncio.sleep(10)
+    smtp.send_message = slow_send
+
+    async def run():
+        transport = transport_with(smtp)
+        task = asyncio.create_task(transport.send(MAIL))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert transport._pool.qsize() == 1
+
+    asyncio.run(run())
+    assert not smtp.is_connected and smtp.closes == 1
+
+
+def test_idle_disconnect_reconnects_once():
+    smtp = FakeSMTP(failures=[aiosmtplib.SMTPServerDisconnected("idle")])
+
+    asyncio.run(transport_with(smtp).send(MAIL))
+    assert smtp.sent == 1 and smtp.logins == 2
+
+
+def test_success_keeps_the_connection():
+    smtp = FakeSMTP()
+
+    async def run():
+        transport = transport_with(smtp)
+        await transport.send(MAIL)
+        await transport.send(MAIL)
+
+    asyncio.run(run())
+    assert smtp.sent == 2 and smtp.logins == 1 and smtp.closes == 0
+
+
+# --- STARTTLS negotiation ---
+@pytest.mark.parametrize("start_tls, use_tls, expected", [
+    (None, False, None),    # Default: upgrade only if the server offers STARTTLS
+    (True, False, True),
+    (False, False, False),
+    (None, True, False),    # Implicit TLS never also does STARTTLS
+])
+def test_start_tls_is_passed_through(start_tls, use_tls, expected):
+    transport = SmtpMailTransport("localhost", 25, None, None, "drs@fleet.test", use_tls=use_tls, start_tls=start_tls, pool_size=1)
+
+    smtp = transport._get_pool().get_nowait()
+    assert smtp._start_tls_on_connect is expected
+
+
+def test_starttls_setting_defaults_to_auto():
+    from app.core.config import Settings
+    assert Settings.model_fields["MAIL_STARTTLS"].default is None
@@ -0,0 +1,126 @@
+# tests/test_metrics.py
+"""
+MetricsMiddleware driven as a bare ASGI app; counters are read back from
+the default registry as deltas, so the tests don't depend on order.
+"""
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from starlette.routing import Route
+
+from app.core.metrics import MetricsMiddleware, route_label, track_background
+
+DEFECT_ROUTE = Route("/defects/{defect_id}", endpoint=lambda request: None)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def requests_total(route: str, status: str, method: str = "GET") -> float:
+    return sample("drs_http_requests_total", method=method, route=route, status=status)
+
+
+def latency_count(route: str, method: str = "GET") -> float:
+    return sample("drs_http_request_duration_seconds_count", method=method, route=route)
+
+
+def call(app, path="/api/v1/defects/42", route=DEFECT_ROUTE):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    if route is not None:
+        scope["route"] = route
+        scope["path_params"] = {"defect_id": "42"}
+    asyncio.run(app(scope, receive, send))
+
+
+def responding(status: int, chunks: int = 1, after_body=None):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        for i in range(chunks):
+            await send({"type": "http.response.body", "body": b"x", "more_body": i < chunks - 1})
+        if after_body:
+            after_body()
+    return app
+
+
+# --- 1. MIDDLEWARE ---
+def test_one_counter_and_one_histogram_observation_per_request():
+    route = "/api/v1/defects/{defect_id}"
+    before = requests_total(route, "200"), latency_count(route)
+
+    call(MetricsMiddleware(responding(200, chunks=3)))
+
+    assert requests_total(route, "200") == before[0] + 1
+    assert latency_count(route) == before[1] + 1
+
+
+def test_status_code_is_the_label():
+    route = "/api/v1/defects/{defect_id}"
+    before = requests_total(route, "404")
+
+    call(MetricsMiddleware(responding(404)))
+
+    assert requests_total(route, "404") == before + 1
+
+
+def test_work_after_the_last_byte_is_not_billed_to_the_route():
+    route = "/api/v1/defects/{defect_id}"
+    seen = []
+    app = MetricsMiddleware(responding(200, after_body=lambda: seen.append(latency_count(route))))
+    before = latency_count(route)
+
+    call(app)
+
+    assert seen == [before + 1] and latency_count(route) == before + 1
+
+
+def test_exception_counts_as_500_and_in_progress_returns_to_zero():
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+    before = requests_total("unmatched", "500")
+
+    with pytest.raises(RuntimeError):
+        call(MetricsMiddleware(broken), route=None)
+
+    assert requests_total("unmatched", "500") == before + 1
+    assert sample("drs_http_requests_in_progress") == 0
+
+
+# --- 2. ROUTE LABELS ---
+def test_route_label_without_a_route_is_unmatched():
+    assert route_label({"path": "/nope"}) == "unmatched"
+
+
+def test_route_label_restores_the_prefix_of_nested_routers():
+    scope = {"route": DEFECT_ROUTE, "path": "/api/v1/defects/42", "path_params": {"defect_id": "42"}}
+    assert route_label(scope) == "/api/v1/defects/{defect_id}"
+
+    scope = {"route": DEFECT_ROUTE, "path": "/defects/42", "path_params": {"defect_id": "42"}}
+    assert route_label(scope) == "/defects/{defect_id}"
+
+
+# --- 3. BACKGROUND TASKS ---
+def test_track_background_counts_failures_and_durations():
+    @track_background("test_job")
+    async def job(fail: bool):
+        if fail:
+            raise ValueError("bad")
+        return "done"
+    failures = sample("drs_background_task_failures_total", task="test_job")
+    runs = sample("drs_background_task_duration_seconds_count", task="test_job")
+
+    assert asyncio.run(job(False)) == "done"
+    with pytest.raises(ValueError):
+        asyncio.run(job(True))
+
+    assert sample("drs_background_task_failures_total", task="test_job") == failures + 1
+    assert sample("drs_background_task_duration_seconds_count", task="test_job") == runs + 2
+    assert sample("drs_background_tasks_in_progress", task="test_job") == 0
+    assert job.__name__ == "job"
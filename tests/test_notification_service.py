@@ -0,0 +1,87 @@
+# tests/test_notification_service.py
+"""
+Notification coalescing: the ON CONFLICT upsert Postgres receives, and
+event_count reaching the API response.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.tasks import Notification, NotificationType
+from app.schemas.user import NotificationResponse
+from app.services.notification_service import upsert_coalesced_notifications, current_coalesce_bucket
+
+
+class CapturingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+
+
+def compiled(stmt) -> tuple[str, dict]:
+    compiled_stmt = stmt.compile(dialect=postgresql.dialect())
+    return str(compiled_stmt), compiled_stmt.params
+
+
+def alert(user_id, defect_id, title="Defect updated") -> dict:
+    return {
+        "user_id": user_id, "defect_id": defect_id, "type": NotificationType.ALERT,
+        "title": title, "message": "[MV Test] status changed", "link": f"/defects/{defect_id}",
+    }
+
+
+def test_upsert_merges_into_the_open_bucket():
+    db = CapturingSession()
+    user_id, defect_id = uuid.uuid4(), uuid.uuid4()
+
+    asyncio.run(upsert_coalesced_notifications(db, [alert(user_id, defect_id)], window_seconds=300))
+
+    sql, params = compiled(db.statements[0])
+    assert "ON CONFLICT (user_id, defect_id, coalesce_bucket) DO UPDATE" in sql
+    assert "event_count = (notifications.event_count + " in sql
+    assert "is_read = " in sql and "is_seen = " in sql  # A merged row shows up as new again
+    assert params["coalesce_bucket_m0"] == current_coalesce_bucket(300)
+    assert params["event_count_m0"] == 1
+
+
+def test_upsert_sends_one_statement_for_many_rows():
+    db = CapturingSession()
+    defect_id = uuid.uuid4()
+    rows = [alert(uuid.uuid4(), defect_id) for _ in range(3)]
+
+    asyncio.run(upsert_coalesced_notifications(db, rows, window_seconds=300))
+
+    assert len(db.statements) == 1
+    assert "user_id_m2" in compiled(db.statements[0])[1]
+
+
+def test_no_rows_no_statement():
+    db = CapturingSession()
+    asyncio.run(upsert_coalesced_notifications(db, [], window_seconds=300))
+    assert db.statements == []
+
+
+def test_bucket_is_stable_within_a_window(monkeypatch):
+    import app.services.notification_service as service
+
+    monkeypatch.setattr(service.time, "time", lambda: 600.0)
+    assert current_coalesce_bucket(300) == 2
+    monkeypatch.setattr(service.time, "time", lambda: 899.9)
+    assert current_coalesce_bucket(300) == 2
+
+
+def test_response_exposes_event_count():
+    row = Notification(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), type=NotificationType.ALERT, title="Defect updated",
+        message="x", link=None, is_read=False, is_seen=False, created_at=datetime(2026, 1, 1),
+        defect_id=uuid.uuid4(), event_count=4, coalesce_bucket=7,
+    )
+
+    body = NotificationResponse.model_validate(row).model_dump(mode="json")
+
+    assert body["event_count"] == 4 and body["type"] == "ALERT"
+    assert "coalesce_bucket" not in body
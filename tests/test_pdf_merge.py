@@ -0,0 +1,60 @@
+# tests/test_pdf_merge.py
+"""
+Merge engine on tiny generated PDFs: order, volumes, skipped inputs and
+resume from the manifest.
+"""
+import os
+
+from pypdf import PdfReader, PdfWriter
+
+from app.services.pdf_merge import concatenate_pdfs, merge_pdfs
+
+
+def make_pdf(path: str, pages: int, width: int = 200) -> str:
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=width, height=200)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def page_widths(path: str) -> list[int]:
+    return [int(page.mediabox.width) for page in PdfReader(path).pages]
+
+
+def test_concatenate_keeps_order(tmp_path):
+    a = make_pdf(str(tmp_path / "a.pdf"), 2, width=100)
+    b = make_pdf(str(tmp_path / "b.pdf"), 1, width=300)
+    out = str(tmp_path / "out.pdf")
+
+    assert concatenate_pdfs([a, b], out) == 3
+    assert page_widths(out) == [100, 100, 300]
+    assert not os.path.exists(f"{out}.tmp")
+
+
+def test_merge_skips_unreadable_and_splits_volumes(tmp_path):
+    inputs = [make_pdf(str(tmp_path / f"in_{i}.pdf"), 2, width=100 + i) for i in range(5)]
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"%PDF-1.4 not really")
+    out = str(tmp_path / "merged.pdf")
+
+    result = merge_pdfs(inputs[:2] + [str(broken)] + inputs[2:], out, chunk_size=2, workers=2, volume_pages=4)
+
+    assert list(result.skipped) == [str(broken)]
+    assert result.pages == 10 and result.files_merged == 5
+    assert [os.path.basename(p) for p in result.outputs] == ["merged_001.pdf", "merged_002.pdf", "merged_003.pdf"]
+    widths = [w for p in result.outputs for w in page_widths(p)]
+    assert widths == [w for i in range(5) for w in (100 + i, 100 + i)]
+    assert not os.path.exists(f"{out}.parts")
+
+
+def test_merge_resumes_finished_chunks(tmp_path):
+    inputs = [make_pdf(str(tmp_path / f"in_{i}.pdf"), 1) for i in range(4)]
+    out = str(tmp_path / "merged.pdf")
+
+    merge_pdfs(inputs, out, chunk_size=2, workers=1, keep_parts=True)
+    result = merge_pdfs(inputs, out, chunk_size=2, workers=1)
+
+    assert result.resumed_chunks == 2
+    assert result.outputs == [out] and len(PdfReader(out).pages) == 4
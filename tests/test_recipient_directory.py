@@ -0,0 +1,81 @@
+# tests/test_recipient_directory.py
+"""RecipientDirectory caching with the loaders stubbed (no database)."""
+import asyncio
+
+import pytest
+
+import app.services.recipient_directory as recipient_module
+from app.services.recipient_directory import RecipientDirectory, resolve_digest_minutes, _merge
+
+
+class NoSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class ScriptedDirectory(RecipientDirectory):
+    """Shore/vessel loads return the current `shore` / `crew` dicts; `during_load` runs mid-load."""
+
+    def __init__(self):
+        super().__init__(ttl_seconds=300)
+        self.shore = {"ops@fleet.io": 0}
+        self.crew = {"master@vessel.io": 0}
+        self.during_load = None
+        self.loads = 0
+
+    async def _load_shore(self, db):
+        return dict(self.shore)
+
+    async def _load_vessel(self, db, vessel_imo):
+        self.loads += 1
+        await asyncio.sleep(0)
+        if self.during_load:
+            hook, self.during_load = self.during_load, None
+            hook(self)
+        return dict(self.crew)
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    monkeypatch.setattr(recipient_module, "SessionLocal", NoSession)
+
+
+def test_profiles_are_cached_per_vessel():
+    directory = ScriptedDirectory()
+
+    async def run():
+        await directory.get_recipient_profiles("9000001")
+        directory.crew["new@vessel.io"] = 0   # Not visible until invalidated
+        return await directory.get_recipient_profiles("9000001")
+
+    assert asyncio.run(run()) == {"ops@fleet.io": 0, "master@vessel.io": 0}
+    assert directory.loads == 1 and directory.hits == 1
+
+
+def test_invalidate_during_load_is_not_overwritten():
+    directory = ScriptedDirectory()
+
+    def user_created(d):
+        d.crew["new@vessel.io"] = 60
+        d.invalidate("9000001")
+
+    directory.during_load = user_created
+
+    async def run():
+        await directory.get_recipient_profiles("9000001")  # Straddles the invalidate: not cached
+        return await directory.get_recipient_profiles("9000001")
+
+    assert asyncio.run(run())["new@vessel.io"] == 60
+    assert directory.loads == 2
+
+
+def test_most_urgent_delivery_wins_and_role_defaults(monkeypatch):
+    monkeypatch.setattr(recipient_module.settings, "EMAIL_DIGEST_ROLE_MINUTES", {"SHORE": 30})
+
+    assert _merge({"a@x.io": 60}, {"a@x.io": 0, "b@x.io": 15}) == {"a@x.io": 0, "b@x.io": 15}
+    assert resolve_digest_minutes("SHORE", None) == 30
+    assert resolve_digest_minutes("SHORE", 0) == 0
+    assert resolve_digest_minutes(None, None) == 0
@@ -0,0 +1,51 @@
+# tests/test_report_render.py
+"""
+Report rendering with real (tiny) images: every thumbnail must land
+inside the A4 frame, however many a thread carries.
+"""
+import io
+
+from PIL import Image as PILImage
+from pypdf import PdfReader
+from reportlab.platypus import Image
+
+from app.services.report_render import _thumb_row, render_defects_pdf, FRAME_WIDTH, THUMBS_PER_ROW
+
+
+def png(shade: int) -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (40, 30), (shade, 90, 160)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_thumbnails_wrap_to_the_frame_width():
+    images = [(f"photo {i}.jpg", png(i * 20)) for i in range(12)]
+
+    table = _thumb_row(images)
+
+    drawn = [cell for row in table._cellvalues for cell in row if isinstance(cell, Image)]
+    assert len(drawn) == 12
+    assert len(table._cellvalues[0]) == THUMBS_PER_ROW
+    assert len(table._cellvalues) == 2 * -(-12 // THUMBS_PER_ROW)  # Image row + label row per group
+    assert sum(table._colWidths) <= FRAME_WIDTH
+
+
+def test_short_row_keeps_its_own_width():
+    table = _thumb_row([("a.jpg", png(10)), ("b.jpg", None), ("c.jpg", png(30))])
+
+    assert len(table._cellvalues) == 2 and len(table._cellvalues[0]) == 2
+
+
+def test_thread_with_many_images_renders(tmp_path):
+    defect = {
+        "vessel_imo": "9876543", "vessel_name": "MV Test", "title": "Bilge pump", "priority": "HIGH",
+        "status": "OPEN", "description": "Leaking seal", "pr_entries": [], "images": [],
+        "threads": [{
+            "created_at": "2026-01-01 10:00", "author": "Chief Engineer", "body": "Photos attached",
+            "images": [(f"photo {i}.jpg", png(i * 20)) for i in range(12)], "files": [],
+        }],
+    }
+    path, count = render_defects_pdf([defect], "Defect Report", str(tmp_path / "part.pdf"))
+
+    assert count == 1
+    assert len(PdfReader(path).pages) >= 1
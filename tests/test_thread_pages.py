@@ -0,0 +1,127 @@
+# tests/test_thread_pages.py
+"""
+Keyset pagination boundaries. The stand-in session applies the query's
+own (created_at, id) comparison, order and LIMIT to an in-memory list,
+so limit+1 look-ahead, page reversal and cursors run for real.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.defect import Thread
+from app.services.thread_pages import fetch_thread_page, InvalidCursor
+
+DEFECT_ID = uuid.uuid4()
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class PageStore:
+    def __init__(self, threads: list[Thread]):
+        self.threads = threads
+
+    async def execute(self, stmt):
+        names = [c["name"] for c in stmt.column_descriptions]
+        params = stmt.compile().params
+        if names == ["created_at", "id"]:  # Cursor anchor lookup
+            return Result([
+                (t.created_at, t.id) for t in self.threads
+                if t.id == params["id_1"] and t.defect_id == params["defect_id_1"]
+            ])
+
+        rows = [t for t in self.threads if t.defect_id == params["defect_id_1"]]
+        where = str(stmt.whereclause)
+        if "(threads.created_at, threads.id)" in where:
+            anchor = (params["param_1"], params["param_2"])
+            if ") > (" in where:
+                rows = [t for t in rows if (t.created_at, t.id) > anchor]
+            else:
+                rows = [t for t in rows if (t.created_at, t.id) < anchor]
+        descending = "DESC" in str(stmt._order_by_clauses[0])
+        rows.sort(key=lambda t: (t.created_at, t.id), reverse=descending)
+        return Result([(t, "Chief Engineer") for t in rows[:stmt._limit]])
+
+
+def make_threads(count: int, same_time: bool = False) -> list[Thread]:
+    threads = []
+    for i in range(count):
+        threads.append(Thread(
+            id=uuid.UUID(int=i + 1), defect_id=DEFECT_ID, user_id=uuid.uuid4(), author_role="VESSEL",
+            body=f"m{i}", created_at=START if same_time else START + timedelta(minutes=i),
+            is_system_message=False, tagged_user_ids=[], attachments=[],
+        ))
+    return threads
+
+
+def page(store, limit, **cursor):
+    return asyncio.run(fetch_thread_page(store, DEFECT_ID, limit, **cursor))
+
+
+def bodies(p) -> list[str]:
+    return [t.body for t in p.threads]
+
+
+# --- 1. BACKWARDS (before=) ---
+def test_latest_page_is_oldest_first_with_older_cursor():
+    p = page(PageStore(make_threads(5)), 2)
+
+    assert bodies(p) == ["m3", "m4"]
+    assert p.older_cursor == p.threads[0].id and p.newer_cursor is None
+
+
+def test_walking_back_visits_every_message_once():
+    store = PageStore(make_threads(7, same_time=True))  # Ties on created_at: id breaks them
+    seen, cursor = [], None
+    while True:
+        p = page(store, 3, before=cursor) if cursor else page(store, 3)
+        seen = bodies(p) + seen
+        cursor = p.older_cursor
+        if cursor is None:
+            break
+
+    assert seen == [f"m{i}" for i in range(7)]
+
+
+def test_exact_multiple_has_no_phantom_page():
+    store = PageStore(make_threads(4))
+    first = page(store, 2)
+    second = page(store, 2, before=first.older_cursor)
+
+    assert bodies(second) == ["m0", "m1"] and second.older_cursor is None
+
+
+# --- 2. FORWARDS (after=) ---
+def test_polling_after_returns_newer_messages_oldest_first():
+    threads = make_threads(6)
+    p = page(PageStore(threads), 2, after=threads[1].id)
+
+    assert bodies(p) == ["m2", "m3"]
+    assert p.newer_cursor == p.threads[-1].id and p.older_cursor is None
+
+
+def test_polling_at_the_head_is_empty():
+    threads = make_threads(3)
+    p = page(PageStore(threads), 5, after=threads[-1].id)
+
+    assert p.threads == [] and p.newer_cursor is None
+
+
+# --- 3. CURSOR VALIDATION ---
+def test_cursor_from_another_defect_is_rejected():
+    other = make_threads(1)[0]
+    other.id, other.defect_id = uuid.uuid4(), uuid.uuid4()
+
+    with pytest.raises(InvalidCursor):
+        page(PageStore(make_threads(3) + [other]), 2, before=other.id)
@@ -0,0 +1,135 @@
+# tests/test_thread_sync.py
+"""
+Offline batch sync against an in-memory stand-in for the three statements
+sync_threads issues for threads (defect lookup, multi-row insert, owner
+check). Attachments are left out: they need blob_contents.
+"""
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app.models.defect import Defect
+from app.models.enums import UserRole
+from app.schemas.defect import ThreadSyncItem
+from app.services.thread_sync import sync_threads, CREATED, EXISTING, REJECTED, CONFLICT
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class ThreadStore:
+    """threads: id -> row dict. Answers by the statement's shape."""
+
+    def __init__(self, defects, threads=None):
+        self.defects = {d.id: d for d in defects}
+        self.threads = dict(threads or {})
+        self.inserted_batches = []
+
+    async def execute(self, stmt):
+        if stmt.is_insert:
+            rows = [{column.key: value for column, value in row.items()} for row in stmt._multi_values[0]]
+            self.inserted_batches.append(rows)
+            new_ids = []
+            for row in rows:
+                if row["id"] not in self.threads:
+                    self.threads[row["id"]] = row
+                    new_ids.append(row["id"])
+            return Result(new_ids)
+
+        columns = [c.get("name") for c in stmt.column_descriptions]
+        if columns == ["Defect"]:
+            return Result(list(self.defects.values()))
+        return Result([(t["id"], t["defect_id"], t["user_id"]) for t in self.threads.values()])
+
+
+def defect(imo="9000001") -> Defect:
+    return Defect(id=uuid.uuid4(), vessel_imo=imo, title="Bilge pump", is_deleted=False)
+
+
+def user(role=UserRole.SHORE, imos=()):
+    return SimpleNamespace(id=uuid.uuid4(), role=role, vessels=[SimpleNamespace(imo=i) for i in imos])
+
+
+def item(defect_id, thread_id=None, body="msg") -> ThreadSyncItem:
+    return ThreadSyncItem(id=thread_id or uuid.uuid4(), defect_id=defect_id, author="SHORE", body=body)
+
+
+def run(store, items, current_user):
+    results, _ = asyncio.run(sync_threads(store, items, current_user))
+    return results
+
+
+# --- 1. ORDER + IDEMPOTENCY ---
+def test_batch_gets_increasing_created_at_in_request_order():
+    d = defect()
+    store = ThreadStore([d])
+    items = [item(d.id, body=f"m{i}") for i in range(5)]
+
+    results = run(store, items, user())
+
+    assert [r.status for r in results] == [CREATED] * 5
+    (batch,) = store.inserted_batches
+    assert [row["body"] for row in batch] == ["m0", "m1", "m2", "m3", "m4"]
+    stamps = [row["created_at"] for row in batch]
+    assert stamps == sorted(stamps) and len(set(stamps)) == 5
+
+
+def test_replay_is_reported_existing():
+    d = defect()
+    store = ThreadStore([d])
+    me = user()
+    items = [item(d.id), item(d.id)]
+
+    run(store, items, me)
+    results = run(store, items, me)
+
+    assert [r.status for r in results] == [EXISTING, EXISTING]
+    assert len(store.threads) == 2
+
+
+def test_one_result_per_id_in_request_order():
+    d = defect()
+    same = uuid.uuid4()
+
+    results = run(ThreadStore([d]), [item(d.id, same), item(uuid.uuid4()), item(d.id, same)], user())
+
+    assert [r.status for r in results] == [CREATED, REJECTED]
+    assert results[1].error == "defect not found"
+
+
+# --- 2. ID COLLISIONS + ACCESS ---
+def test_other_users_thread_id_is_a_conflict():
+    d = defect()
+    taken = uuid.uuid4()
+    store = ThreadStore([d], {taken: {"id": taken, "defect_id": d.id, "user_id": uuid.uuid4()}})
+
+    (result,) = run(store, [item(d.id, taken)], user())
+
+    assert result.status == CONFLICT and "another user" in result.error
+
+
+def test_thread_id_on_another_defect_is_a_conflict():
+    d, other = defect(), defect()
+    me = user()
+    taken = uuid.uuid4()
+    store = ThreadStore([d, other], {taken: {"id": taken, "defect_id": other.id, "user_id": me.id}})
+
+    (result,) = run(store, [item(d.id, taken)], me)
+
+    assert result.status == CONFLICT and "another defect" in result.error
+
+
+def test_vessel_user_cannot_sync_to_other_vessels():
+    d = defect(imo="9000002")
+
+    (result,) = run(ThreadStore([d]), [item(d.id)], user(UserRole.VESSEL, imos=["9000001"]))
+
+    assert result.status == REJECTED and result.error == "not authorized for this vessel"